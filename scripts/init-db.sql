@@ -1,5 +1,7 @@
 -- Database initialization script for WebGenie
--- This script sets up the initial database structure
+-- This script sets up the initial database structure.
+-- It only creates missing tables: a database created by an earlier version
+-- is brought up to date with `alembic upgrade head` (webgenie-backend/alembic).
 
 -- Create extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
@@ -26,12 +28,12 @@ CREATE INDEX IF NOT EXISTS idx_datasets_tissue ON datasets(tissue);
 
 -- Create tables for jobs
 CREATE TABLE IF NOT EXISTS jobs (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id VARCHAR(64) PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     description TEXT,
-    dataset_id UUID NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    dataset_id VARCHAR(255) NOT NULL,
     algorithm VARCHAR(255) NOT NULL,
-    status VARCHAR(50) DEFAULT 'PENDING',
+    status VARCHAR(50) DEFAULT 'pending',
     parameters JSONB,
     progress FLOAT DEFAULT 0.0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -40,20 +42,33 @@ CREATE TABLE IF NOT EXISTS jobs (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     error_message TEXT,
     celery_task_id VARCHAR(255),
+    result_path VARCHAR(1024),
+    log_file VARCHAR(1024),
+    cpu_request INTEGER,
+    memory_request BIGINT,
+    queue VARCHAR(50),
+    cache_key VARCHAR(64),
+    attached_to VARCHAR(64),
     logs TEXT
 );
 
--- Create indexes for jobs
-CREATE INDEX IF NOT EXISTS idx_jobs_dataset_id ON jobs(dataset_id);
-CREATE INDEX IF NOT EXISTS idx_jobs_algorithm ON jobs(algorithm);
-CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
-CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at);
+-- Create indexes for jobs (listings sort and page on created_at, id)
+CREATE INDEX IF NOT EXISTS idx_jobs_dataset_id_created_at ON jobs(dataset_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_algorithm_created_at ON jobs(algorithm, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at ON jobs(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at, id);
 CREATE INDEX IF NOT EXISTS idx_jobs_celery_task_id ON jobs(celery_task_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue_status ON jobs(queue, status, completed_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_cache_key_status ON jobs(cache_key, status);
+-- One active, unattached job per result cache key (identical submissions attach to it)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_jobs_active_cache_key ON jobs(cache_key)
+    WHERE status IN ('pending', 'submitted', 'running') AND attached_to IS NULL;
+CREATE INDEX IF NOT EXISTS idx_jobs_attached_to ON jobs(attached_to);
 
 -- Create tables for results
 CREATE TABLE IF NOT EXISTS results (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    job_id UUID NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    job_id VARCHAR(64) NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
     network_file VARCHAR(1024),
     metrics JSONB,
     format VARCHAR(50) DEFAULT 'graphml',
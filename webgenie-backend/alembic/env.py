@@ -0,0 +1,47 @@
+"""
+Alembic environment.
+
+Migrations run against ``settings.DATABASE_URL``, the database the
+application itself uses, rather than the URL in alembic.ini.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.core.config import settings
+from app.core.database import Base, create_database_engine
+from app.services import job_repository  # noqa: F401 (registers the jobs table)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit migration SQL without a database connection."""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations on a database connection."""
+    engine = create_database_engine(settings.DATABASE_URL)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,183 @@
+"""Job store schema
+
+Brings a ``jobs`` table created by an older ``scripts/init-db.sql`` (UUID
+ids, a foreign key to ``datasets``, upper-case statuses) or by an earlier
+release of the job store up to the schema of ``app.services.job_repository``.
+Each step checks the live table first, so the revision also applies cleanly
+to a database that already has some or all of it, and creates the table if
+it is missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Dict, List, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_PRIMARY = "status IN ('pending', 'submitted', 'running') AND attached_to IS NULL"
+
+
+def _new_columns() -> List[sa.Column]:
+    """Columns added to the original table (fresh objects for each use)."""
+    return [
+        sa.Column("result_path", sa.String(1024)),
+        sa.Column("log_file", sa.String(1024)),
+        sa.Column("cpu_request", sa.Integer()),
+        sa.Column("memory_request", sa.BigInteger()),
+        sa.Column("queue", sa.String(50)),
+        sa.Column("cache_key", sa.String(64)),
+        sa.Column("attached_to", sa.String(64)),
+    ]
+
+
+# Index name -> columns (listings sort and page on created_at, id)
+INDEXES: Dict[str, List[str]] = {
+    "idx_jobs_dataset_id_created_at": ["dataset_id", "created_at", "id"],
+    "idx_jobs_algorithm_created_at": ["algorithm", "created_at", "id"],
+    "idx_jobs_status_created_at": ["status", "created_at", "id"],
+    "idx_jobs_created_at": ["created_at", "id"],
+    "idx_jobs_celery_task_id": ["celery_task_id"],
+    "idx_jobs_queue_status": ["queue", "status", "completed_at"],
+    "idx_jobs_cache_key_status": ["cache_key", "status"],
+    "idx_jobs_attached_to": ["attached_to"],
+}
+LEGACY_INDEXES: Dict[str, List[str]] = {
+    "idx_jobs_dataset_id": ["dataset_id"],
+    "idx_jobs_algorithm": ["algorithm"],
+    "idx_jobs_status": ["status"],
+    "idx_jobs_created_at": ["created_at"],
+}
+
+
+def _create_jobs_table() -> None:
+    """Create the jobs table from scratch."""
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("dataset_id", sa.String(255), nullable=False),
+        sa.Column("algorithm", sa.String(255), nullable=False),
+        sa.Column("status", sa.String(50), server_default="pending"),
+        sa.Column("parameters", sa.JSON()),
+        sa.Column("progress", sa.Float(), server_default="0"),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("completed_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("error_message", sa.Text()),
+        sa.Column("celery_task_id", sa.String(255)),
+        *_new_columns(),
+    )
+
+
+def _convert_uuid_ids(inspector: sa.engine.Inspector) -> None:
+    """PostgreSQL: turn UUID job ids into strings and drop the datasets FK."""
+    referencing = []
+    if inspector.has_table("results"):
+        referencing = [
+            fk
+            for fk in inspector.get_foreign_keys("results")
+            if fk["referred_table"] == "jobs"
+        ]
+    for fk in referencing:
+        op.drop_constraint(fk["name"], "results", type_="foreignkey")
+    for fk in inspector.get_foreign_keys("jobs"):
+        op.drop_constraint(fk["name"], "jobs", type_="foreignkey")
+
+    op.alter_column("jobs", "id", server_default=None)
+    op.alter_column(
+        "jobs",
+        "id",
+        type_=sa.String(64),
+        postgresql_using="id::text",
+    )
+    op.alter_column(
+        "jobs",
+        "dataset_id",
+        type_=sa.String(255),
+        postgresql_using="dataset_id::text",
+    )
+    if referencing:
+        op.alter_column(
+            "results",
+            "job_id",
+            type_=sa.String(64),
+            postgresql_using="job_id::text",
+        )
+        op.create_foreign_key(
+            "results_job_id_fkey",
+            "results",
+            "jobs",
+            ["job_id"],
+            ["id"],
+            ondelete="CASCADE",
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    is_postgres = bind.dialect.name == "postgresql"
+
+    if not inspector.has_table("jobs"):
+        _create_jobs_table()
+    else:
+        columns = {column["name"]: column for column in inspector.get_columns("jobs")}
+        if is_postgres and isinstance(columns["id"]["type"], sa.Uuid):
+            _convert_uuid_ids(inspector)
+        elif is_postgres:
+            for fk in inspector.get_foreign_keys("jobs"):
+                if fk["referred_table"] == "datasets":
+                    op.drop_constraint(fk["name"], "jobs", type_="foreignkey")
+
+        # Statuses are the lower-case JobStatusEnum values
+        if is_postgres:
+            op.alter_column("jobs", "status", server_default="pending")
+        op.execute(
+            "UPDATE jobs SET status = lower(status) WHERE status <> lower(status)"
+        )
+
+        for column in _new_columns():
+            if column.name not in columns:
+                op.add_column("jobs", column)
+
+    existing = {
+        index["name"]: index["column_names"] for index in inspector.get_indexes("jobs")
+    }
+    for name, legacy_columns in LEGACY_INDEXES.items():
+        if existing.get(name) == legacy_columns:
+            op.drop_index(name, table_name="jobs")
+            del existing[name]
+    for name, index_columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "jobs", index_columns)
+    if "uq_jobs_active_cache_key" not in existing:
+        op.create_index(
+            "uq_jobs_active_cache_key",
+            "jobs",
+            ["cache_key"],
+            unique=True,
+            postgresql_where=sa.text(ACTIVE_PRIMARY),
+            sqlite_where=sa.text(ACTIVE_PRIMARY),
+        )
+
+
+def downgrade() -> None:
+    # Job ids stay strings: "job-..." ids cannot be converted back to UUIDs
+    op.drop_index("uq_jobs_active_cache_key", table_name="jobs")
+    for name in INDEXES:
+        op.drop_index(name, table_name="jobs")
+    for name, index_columns in LEGACY_INDEXES.items():
+        op.create_index(name, "jobs", index_columns)
+    for column in reversed(_new_columns()):
+        op.drop_column("jobs", column.name)
@@ -2,8 +2,12 @@
 API endpoints for job management.
 """
 
-from typing import Optional
-from fastapi import APIRouter, Query, HTTPException, status
+import asyncio
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Query, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 import logging
 
 from app.models.job import (
@@ -13,12 +17,26 @@ from app.models.job import (
     JobStatusEnum,
     JobLogResponse,
     JobCancellationResponse,
+    QueueStatus,
+    QueueStatusResponse,
 )
+from app.services.job_events import TERMINAL_STATUSES, job_event_broker
+from app.services.job_logs import LOG_MAX_BYTES, follow_log
 from app.services.jobs_service import job_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+SSE_HEARTBEAT_SECONDS = 15.0
+
+
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    """Encode one server-sent event."""
+    message = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n{message}"
+    return message.encode()
+
 
 @router.post("", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
 async def submit_job(job: JobCreate) -> JobResponse:
@@ -47,8 +65,15 @@ async def list_jobs(
     status_filter: Optional[JobStatusEnum] = Query(None, alias="status"),
     dataset_id: Optional[str] = None,
     algorithm: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    view: str = Query("full", regex="^(full|summary)$"),
 ) -> JobListResponse:
-    """List jobs with optional filters."""
+    """
+    List jobs with optional filters.
+
+    Pass the previous page's ``next_cursor`` to page through jobs without
+    offsets; ``view=summary`` returns a lightweight projection.
+    """
     try:
         result = await job_service.list_jobs(
             skip=skip,
@@ -56,8 +81,15 @@ async def list_jobs(
             status=status_filter,
             dataset_id=dataset_id,
             algorithm=algorithm,
+            cursor=cursor,
+            summary=view == "summary",
         )
         return JobListResponse(**result)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
     except Exception as e:
         logger.error(f"Failed to list jobs: {str(e)}")
         raise HTTPException(
@@ -66,6 +98,71 @@ async def list_jobs(
         )
 
 
+@router.get("/queues", response_model=QueueStatusResponse)
+async def get_queue_status() -> QueueStatusResponse:
+    """Queue depth and expected wait of each worker lane."""
+    try:
+        queues = await job_service.get_queue_status()
+        return QueueStatusResponse(queues=[QueueStatus(**queue) for queue in queues])
+    except Exception as e:
+        logger.error(f"Failed to get queue status: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to get queue status",
+        )
+
+
+@router.get("/stream")
+async def stream_jobs(
+    request: Request,
+    job_ids: Optional[List[str]] = Query(None, alias="job_id"),
+) -> StreamingResponse:
+    """
+    Server-sent events with status and progress updates.
+
+    Repeat ``job_id`` to watch specific jobs (all jobs if omitted). Each
+    watched job is first sent as a ``snapshot`` event, then every change
+    as a ``job`` event. A stream watching only specific jobs closes once
+    they have all finished.
+    """
+    queue = job_event_broker.subscribe(job_ids)
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            pending = set(job_ids or [])
+            for job_id in job_ids or []:
+                job = await job_service.get_job(job_id)
+                if job is None:
+                    pending.discard(job_id)
+                    yield _sse("error", {"job_id": job_id, "detail": "Job not found"})
+                    continue
+                yield _sse("snapshot", job.model_dump(mode="json"))
+                if job.status.value in TERMINAL_STATUSES:
+                    pending.discard(job_id)
+
+            while job_ids is None or pending:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=SSE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield _sse("job", event)
+                if event["status"] in TERMINAL_STATUSES:
+                    pending.discard(event["job_id"])
+        finally:
+            job_event_broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job(job_id: str) -> JobResponse:
     """Get job by ID."""
@@ -88,8 +185,19 @@ async def get_job(job_id: str) -> JobResponse:
 
 
 @router.get("/{job_id}/logs", response_model=JobLogResponse)
-async def get_job_logs(job_id: str) -> JobLogResponse:
-    """Get job execution logs."""
+async def get_job_logs(
+    job_id: str,
+    offset: Optional[int] = Query(None, ge=0, description="Read from this byte offset"),
+    tail: Optional[int] = Query(None, ge=0, description="Return the last N lines"),
+    max_bytes: int = Query(LOG_MAX_BYTES, ge=1, le=16 * LOG_MAX_BYTES),
+) -> JobLogResponse:
+    """
+    Get job execution logs.
+
+    Reads at most ``max_bytes``: forward from ``offset`` (pass the previous
+    ``next_offset`` to continue), the last ``tail`` lines, or by default the
+    end of the log.
+    """
     try:
         job = await job_service.get_job(job_id)
         if not job:
@@ -98,14 +206,17 @@ async def get_job_logs(job_id: str) -> JobLogResponse:
                 detail=f"Job {job_id} not found",
             )
 
-        logs = await job_service.get_job_logs(job_id)
+        logs = await job_service.get_job_logs(
+            job_id, offset=offset, tail=tail, max_bytes=max_bytes
+        )
         if logs is None:
-            logs = "No logs available"
+            logs = {"content": "No logs available"}
 
         return JobLogResponse(
             job_id=job_id,
-            logs=logs,
-            timestamp=job.updated_at or job.started_at,
+            logs=logs.pop("content"),
+            timestamp=job.updated_at or job.started_at or datetime.utcnow(),
+            **logs,
         )
     except HTTPException:
         raise
@@ -117,6 +228,46 @@ async def get_job_logs(job_id: str) -> JobLogResponse:
         )
 
 
+@router.get("/{job_id}/logs/stream")
+async def stream_job_logs(
+    request: Request,
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Start from this byte offset"),
+) -> StreamingResponse:
+    """
+    Follow a job log as server-sent ``log`` events.
+
+    Each event carries newly appended lines; its id is the byte offset to
+    resume from, so reconnecting clients continue via ``Last-Event-ID``.
+    The stream ends once the job has finished and the log is drained.
+    """
+    log_file = await asyncio.to_thread(job_service.get_log_file, job_id)
+    if log_file is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found",
+        )
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        offset = int(last_event_id)
+
+    def is_finished() -> bool:
+        job = job_service.repository.get(job_id)
+        return job is None or job["status"] in TERMINAL_STATUSES
+
+    async def events() -> AsyncIterator[bytes]:
+        async for chunk in follow_log(log_file, offset, is_finished):
+            if await request.is_disconnected():
+                break
+            yield _sse("log", chunk, event_id=chunk["next_offset"])
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.delete("/{job_id}", response_model=JobCancellationResponse)
 async def cancel_job(job_id: str) -> JobCancellationResponse:
     """Cancel a job."""
@@ -2,19 +2,47 @@
 API endpoints for result management.
 """
 
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 from fastapi import APIRouter, Query, HTTPException, status
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
 import logging
-from pathlib import Path
 
 from app.models.result import (
     ResultResponse,
     ResultListResponse,
     NetworkComparison,
     ResultSummary,
+    BatchComparisonRequest,
+    BatchComparisonStatus,
+    EdgePage,
+    EvaluationStatus,
+    ResultMetrics,
+)
+from app.services.network_compare import compare_stores
+from app.services.network_evaluation import (
+    find_reference,
+    matches_options,
+    read_evaluation,
+    write_evaluation,
+)
+from app.services.network_export import iter_json
+from app.services.network_query import DEFAULT_PAGE_SIZE, query_edges
+from app.services.network_store import (
+    NetworkStore,
+    find_network_file,
+    load_job_network,
+    load_network,
+)
+from app.services.network_summary import load_summary
+from app.core.tasks import celery_app
+from app.workers.tasks import (
+    compute_metrics,
+    compare_networks,
+    compare_many_networks,
+    evaluate_result,
+    export_results,
 )
-from app.workers.tasks import compute_metrics, compare_networks, export_results
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/results", tags=["results"])
@@ -34,24 +62,20 @@ async def get_job_result(job_id: str) -> ResultResponse:
             )
 
         # Find network file
-        network_file = None
-        for f in job_dir.glob("*_network.*"):
-            if f.is_file():
-                network_file = f
-                break
-
+        network_file = find_network_file(job_dir)
         if not network_file:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Network file not found",
             )
 
-        result_data = {
+        result_data: Dict[str, Any] = {
             "id": job_id,
             "job_id": job_id,
             "dataset_id": "unknown",
             "algorithm": "unknown",
             "network_file": str(network_file),
+            "metrics": read_evaluation(network_file),
             "created_at": datetime.utcnow(),
         }
 
@@ -72,49 +96,16 @@ async def get_result_summary(job_id: str) -> ResultSummary:
     """Get result summary."""
     try:
         from app.core.config import settings
-        import pandas as pd
-
-        job_dir = settings.RESULTS_DIR / job_id
-
-        # Find network file
-        network_file = None
-        for f in job_dir.glob("*_network.*"):
-            if f.is_file():
-                network_file = f
-                break
 
+        network_file = find_network_file(settings.RESULTS_DIR / job_id)
         if not network_file:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Network file not found",
             )
 
-        # Compute metrics
-        network = pd.read_csv(network_file, sep="\t", header=None)
-        num_edges = len(network)
-        nodes = set(network[0]) | set(network[1])
-        num_nodes = len(nodes)
-
-        # Compute density
-        density = (2 * num_edges) / (num_nodes * (num_nodes - 1)) if num_nodes > 1 else 0
-
-        # Compute degree statistics
-        degree_dict = {}
-        for _, row in network.iterrows():
-            degree_dict[row[0]] = degree_dict.get(row[0], 0) + 1
-            degree_dict[row[1]] = degree_dict.get(row[1], 0) + 1
-
-        degrees = list(degree_dict.values())
-        avg_degree = sum(degrees) / len(degrees) if degrees else 0
-        max_degree = max(degrees) if degrees else 0
-
-        summary = ResultSummary(
-            total_edges=num_edges,
-            num_nodes=num_nodes,
-            density=float(density),
-            avg_degree=float(avg_degree),
-            max_degree=int(max_degree),
-        )
+        # Precomputed at job completion; built once here for older results
+        summary = ResultSummary(**await run_in_threadpool(load_summary, network_file))
 
         return summary
 
@@ -128,6 +119,149 @@ async def get_result_summary(job_id: str) -> ResultSummary:
         )
 
 
+@router.post(
+    "/job/{job_id}/evaluate",
+    response_model=ResultMetrics,
+    responses={status.HTTP_202_ACCEPTED: {"description": "Bootstrap task started"}},
+)
+async def evaluate_job_result(
+    job_id: str,
+    dataset_id: str,
+    bootstrap: int = Query(0, ge=0, le=10000, description="Bootstrap replicates"),
+    confidence: float = Query(0.95, gt=0, lt=1),
+    seed: int = Query(0, ge=0),
+) -> Union[ResultMetrics, JSONResponse]:
+    """
+    Evaluate a result network against a dataset's reference network.
+
+    Stored metrics with the same options are returned at once. A new
+    evaluation with ``bootstrap`` replicates runs as a worker task: the
+    response is 202 with a ``task_id`` to poll at ``/evaluate/{task_id}``.
+    """
+    try:
+        from app.core.config import settings
+
+        network_file = find_network_file(settings.RESULTS_DIR / job_id)
+        if not network_file:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Network file not found",
+            )
+
+        reference_file = find_reference(settings.DATASETS_DIR / dataset_id / "data.csv")
+        if not reference_file:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Reference network for dataset {dataset_id} not found",
+            )
+
+        options: Dict[str, Any] = {
+            "n_bootstrap": bootstrap,
+            "confidence": confidence,
+            "seed": seed,
+        }
+        stored = read_evaluation(network_file, reference_file)
+        if stored is not None and matches_options(stored, **options):
+            return ResultMetrics(**stored)
+
+        if bootstrap:
+            # Replicates run in a process pool; keep them off the API nodes
+            task = evaluate_result.delay(
+                network_file=str(network_file),
+                reference_file=str(reference_file),
+                **options,
+            )
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"task_id": task.id, "job_id": job_id, "status": "processing"},
+            )
+
+        metrics = await run_in_threadpool(
+            write_evaluation, network_file, reference_file, **options
+        )
+        return ResultMetrics(**metrics)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to evaluate result: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to evaluate result",
+        )
+
+
+@router.get("/evaluate/{task_id}", response_model=EvaluationStatus)
+async def get_evaluation(task_id: str) -> EvaluationStatus:
+    """Get the state or metrics of a bootstrap evaluation task."""
+    try:
+        task = celery_app.AsyncResult(task_id)
+        details = {}
+
+        if task.state == "SUCCESS":
+            details["result"] = task.result
+        elif task.state == "FAILURE":
+            details["error"] = str(task.info)
+
+        return EvaluationStatus(task_id=task_id, status=task.state, **details)
+
+    except Exception as e:
+        logger.error(f"Failed to get evaluation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to get evaluation",
+        )
+
+
+@router.get("/job/{job_id}/edges", response_model=EdgePage)
+async def get_result_edges(
+    job_id: str,
+    cursor: int = Query(0, ge=0, description="Cursor from a previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=10000),
+    min_score: Optional[float] = Query(None, allow_inf_nan=False),
+    top_k: Optional[int] = Query(None, ge=1),
+    source: Optional[str] = Query(None, description="Regulator gene"),
+    target: Optional[str] = Query(None, description="Target gene"),
+    gene: Optional[str] = Query(None, description="Gene at either end"),
+) -> EdgePage:
+    """Get a page of result edges, strongest first."""
+    try:
+        from app.core.config import settings
+
+        # Building the store of an older result reads the whole network file
+        network = await run_in_threadpool(
+            load_job_network, settings.RESULTS_DIR / job_id
+        )
+        if network is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Network file not found",
+            )
+
+        page = await run_in_threadpool(
+            query_edges,
+            network,
+            cursor=cursor,
+            limit=limit,
+            min_score=min_score,
+            top_k=top_k,
+            source=source,
+            target=target,
+            gene=gene,
+        )
+
+        return EdgePage(job_id=job_id, **page)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to query edges: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to query edges",
+        )
+
+
 @router.post("/compare", response_model=NetworkComparison)
 async def compare_result_networks(
     job_id_1: str,
@@ -136,39 +270,24 @@ async def compare_result_networks(
     """Compare two result networks."""
     try:
         from app.core.config import settings
-        import pandas as pd
-
-        # Find network files
-        def get_network_file(job_id: str) -> Path:
-            job_dir = settings.RESULTS_DIR / job_id
-            for f in job_dir.glob("*_network.*"):
-                if f.is_file():
-                    return f
-            raise FileNotFoundError(f"Network file for job {job_id}")
-
-        network_file_1 = get_network_file(job_id_1)
-        network_file_2 = get_network_file(job_id_2)
 
         # Load networks
-        net1 = pd.read_csv(network_file_1, sep="\t", header=None)
-        net2 = pd.read_csv(network_file_2, sep="\t", header=None)
+        def get_network(job_id: str) -> NetworkStore:
+            network = load_job_network(settings.RESULTS_DIR / job_id)
+            if network is None:
+                raise FileNotFoundError(f"Network file for job {job_id}")
+            return network
 
-        # Convert to edge sets
-        edges1 = set(zip(net1[0], net1[1]))
-        edges2 = set(zip(net2[0], net2[1]))
+        # Integer-encoded set and rank comparison
+        def compare() -> Dict[str, Any]:
+            return compare_stores(get_network(job_id_1), get_network(job_id_2))
 
-        # Compute metrics
-        intersection = edges1 & edges2
-        union = edges1 | edges2
-        jaccard_index = len(intersection) / len(union) if len(union) > 0 else 0
+        metrics = await run_in_threadpool(compare)
 
         comparison = NetworkComparison(
             network1_id=job_id_1,
             network2_id=job_id_2,
-            jaccard_index=float(jaccard_index),
-            overlap_edges=len(intersection),
-            edges_only_in_1=len(edges1 - edges2),
-            edges_only_in_2=len(edges2 - edges1),
+            **metrics,
         )
 
         return comparison
@@ -181,6 +300,51 @@ async def compare_result_networks(
         )
 
 
+@router.post("/compare/batch", status_code=status.HTTP_202_ACCEPTED)
+async def compare_many_result_networks(request: BatchComparisonRequest):
+    """Start an all-pairs comparison of several result networks."""
+    try:
+        task = compare_many_networks.delay(job_ids=request.job_ids)
+
+        return {
+            "task_id": task.id,
+            "job_ids": request.job_ids,
+            "status": "processing",
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to start batch comparison: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to start batch comparison",
+        )
+
+
+@router.get("/compare/batch/{task_id}", response_model=BatchComparisonStatus)
+async def get_batch_comparison(task_id: str) -> BatchComparisonStatus:
+    """Get progress or result of an all-pairs comparison."""
+    try:
+        task = celery_app.AsyncResult(task_id)
+        details = {}
+
+        if task.state == "PROGRESS" and isinstance(task.info, dict):
+            details["current"] = task.info.get("current")
+            details["total"] = task.info.get("total")
+        elif task.state == "SUCCESS":
+            details["result"] = task.result
+        elif task.state == "FAILURE":
+            details["error"] = str(task.info)
+
+        return BatchComparisonStatus(task_id=task_id, status=task.state, **details)
+
+    except Exception as e:
+        logger.error(f"Failed to get batch comparison: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to get batch comparison",
+        )
+
+
 @router.get("/job/{job_id}/network/download")
 async def download_network(job_id: str, format: str = "tsv"):
     """Download network file."""
@@ -190,12 +354,7 @@ async def download_network(job_id: str, format: str = "tsv"):
         job_dir = settings.RESULTS_DIR / job_id
 
         # Find network file
-        network_file = None
-        for f in job_dir.glob("*_network.*"):
-            if f.is_file():
-                network_file = f
-                break
-
+        network_file = find_network_file(job_dir)
         if not network_file:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -203,33 +362,13 @@ async def download_network(job_id: str, format: str = "tsv"):
             )
 
         if format.lower() == "json":
-            import pandas as pd
-            import json
-
-            network = pd.read_csv(network_file, sep="\t", header=None)
-            data = {
-                "edges": [
-                    {
-                        "source": row[0],
-                        "target": row[1],
-                        "weight": float(row[2]) if len(row) > 2 else 1.0,
-                    }
-                    for _, row in network.iterrows()
-                ]
-            }
-
-            from io import BytesIO
-
-            output = BytesIO()
-            output.write(json.dumps(data).encode())
-            output.seek(0)
-
+            # Building the store of an older result reads the whole network
+            # file; then it is serialized batch by batch straight from it
+            network = await run_in_threadpool(load_network, network_file)
             return StreamingResponse(
-                iter([output.getvalue()]),
+                iter_json(network),
                 media_type="application/json",
-                headers={
-                    "Content-Disposition": f"attachment; filename=network.json"
-                },
+                headers={"Content-Disposition": f"attachment; filename=network.json"},
             )
         else:
             return FileResponse(
@@ -251,16 +390,20 @@ async def download_network(job_id: str, format: str = "tsv"):
 @router.post("/job/{job_id}/export")
 async def export_job_results(
     job_id: str,
-    export_format: str = Query("json", regex="^(json|graphml|csv)$"),
+    export_format: str = Query("json", regex="^(json|graphml|csv|gml)$"),
+    compress: bool = Query(False, description="Gzip the exported file"),
 ):
     """Export job results in specified format."""
     try:
-        task = export_results.delay(job_id=job_id, export_format=export_format)
+        task = export_results.delay(
+            job_id=job_id, export_format=export_format, compress=compress
+        )
 
         return {
             "task_id": task.id,
             "job_id": job_id,
             "export_format": export_format,
+            "compress": compress,
             "status": "processing",
         }
 
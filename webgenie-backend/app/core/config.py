@@ -3,7 +3,7 @@ Configuration management using Pydantic BaseSettings.
 Supports environment variables and .env files.
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from pathlib import Path
@@ -62,11 +62,29 @@ class Settings(BaseSettings):
     RESULTS_DIR: Path = Field(default=Path("/data/results"), env="RESULTS_DIR")
     DATASETS_DIR: Path = Field(default=Path("/data/datasets"), env="DATASETS_DIR")
     TEMP_DIR: Path = Field(default=Path("/tmp/webgenie"), env="TEMP_DIR")
+    DATASET_CACHE_DIR: Path = Path("/data/cache/datasets")
+    DATASET_CACHE_ENABLED: bool = True
+    RESULT_CACHE_DIR: Path = Path("/data/results/.cache")  # same volume as RESULTS_DIR, for hard links
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_SIZE: str = "50g"
 
     # Job Configuration
     MAX_CONCURRENT_JOBS: int = Field(default=4, env="MAX_CONCURRENT_JOBS")
     JOB_TIMEOUT_SECONDS: int = Field(default=86400, env="JOB_TIMEOUT_SECONDS")  # 24 hours
     POLL_INTERVAL_SECONDS: int = 5
+    JOB_COUNT_LIMIT: int = 10_000  # exact count cap
+
+    # Scheduler Configuration (cluster-wide admission)
+    SCHEDULER_CPU_CAPACITY: Optional[int] = None  # defaults to the node's CPUs; 0 = unlimited
+    SCHEDULER_MEMORY_CAPACITY: Optional[str] = None  # defaults to the node's memory minus the headroom
+    SCHEDULER_MEMORY_HEADROOM: str = "2g"  # kept free for the API, workers and OS
+    SCHEDULER_BACKFILL_WINDOW: int = 600  # seconds before the queue head blocks backfill
+
+    # Queue Routing Configuration (cost = genes x cells x algorithm complexity)
+    ROUTING_PRIORITY_MAX_COST: float = 1e8
+    ROUTING_INFERENCE_MIN_COST: float = 5e9
+    # Worker slots per lane, as deployed; admission caps each lane at it
+    QUEUE_CONCURRENCY: Dict[str, int] = {"priority": 4, "default": 2, "inference": 1}
 
     # API Configuration
     MAX_UPLOAD_SIZE: int = Field(
@@ -77,6 +95,19 @@ class Settings(BaseSettings):
     ALGORITHM_TIMEOUT: int = Field(default=86400, env="ALGORITHM_TIMEOUT")
     ALGORITHM_MEMORY_LIMIT: str = Field(default="8g", env="ALGORITHM_MEMORY_LIMIT")
 
+    # Pairwise Kernel Configuration
+    CORRELATION_TILE_SIZE: int = 2048
+    CORRELATION_MEMORY_BUDGET: Optional[str] = None  # defaults to ALGORITHM_MEMORY_LIMIT
+    PAIRWISE_WORKERS: int = 0  # 0 = one per CPU
+    READER_CHUNK_CELLS: int = 8192
+
+    # Network Comparison Configuration
+    SKETCH_SIZE: int = 1024
+    SKETCH_EXACT_MAX_EDGES: int = 100_000
+
+    # Evaluation Configuration
+    EVALUATION_BOOTSTRAP: int = 0  # replicates
+
     # HuggingFace Configuration
     HF_TOKEN: Optional[str] = Field(default=None, env="HF_TOKEN")
     HF_DATASET_ORG: str = "cskokgibbs"
@@ -107,4 +138,6 @@ settings.DATA_DIR.mkdir(parents=True, exist_ok=True)
 settings.RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 settings.DATASETS_DIR.mkdir(parents=True, exist_ok=True)
 settings.TEMP_DIR.mkdir(parents=True, exist_ok=True)
+settings.DATASET_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+settings.RESULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 settings.LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,76 @@
+"""
+Database engine and session configuration.
+
+``DATABASE_URL`` selects the backend: SQLite locally (WAL journal, so API
+readers never block on a writer) or PostgreSQL in production, where the
+tables come from ``scripts/init-db.sql`` and existing databases are
+migrated with ``alembic upgrade head``.
+"""
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import logging
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SQLITE_BUSY_TIMEOUT_MS = 30000
+
+
+class Base(DeclarativeBase):
+    """Declarative base for database tables."""
+
+
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+def _configure_sqlite(dbapi_connection, connection_record) -> None:
+    """Per-connection SQLite pragmas."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def create_database_engine(url: str) -> Engine:
+    """Create an engine for a database URL."""
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        event.listen(engine, "connect", _configure_sqlite)
+    else:
+        engine = create_engine(url, pool_pre_ping=True)
+    return engine
+
+
+def get_engine() -> Engine:
+    """Process-wide engine, created on first use."""
+    global _engine, _session_factory
+    if _engine is None:
+        _engine = create_database_engine(settings.DATABASE_URL)
+        _session_factory = sessionmaker(bind=_engine, expire_on_commit=False)
+        logger.info(f"Database engine created: {_engine.url.render_as_string()}")
+    return _engine
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Transactional session: commit on success, roll back on error."""
+    get_engine()
+    assert _session_factory is not None  # set together with the engine
+    session = _session_factory()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -14,6 +14,7 @@ celery_app = Celery(
     settings.PROJECT_NAME.lower().replace(" ", "-"),
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.workers.tasks"],
 )
 
 # Configure Celery
@@ -41,6 +42,11 @@ celery_app.conf.update(
     ),
     task_default_exchange="tasks",
     task_default_exchange_type="topic",
+    # Inference jobs are sent to a lane picked by size (app.services.job_routing);
+    # scheduling passes are short and should not wait behind exports
+    task_routes={
+        "app.workers.tasks.schedule_pending_jobs": {"queue": "priority"},
+    },
     # Retry configuration
     task_acks_late=True,
     task_reject_on_worker_lost=True,
@@ -55,6 +61,10 @@ celery_app.conf.beat_schedule = {
         "schedule": timedelta(hours=6),  # Every 6 hours
         "kwargs": {"days": 7},  # Clean results older than 7 days
     },
+    "schedule-pending-jobs": {
+        "task": "app.workers.tasks.schedule_pending_jobs",
+        "schedule": timedelta(seconds=30),  # Backstop for missed admissions
+    },
 }
 
 logger = get_task_logger(__name__)
@@ -12,6 +12,7 @@ import logging
 from app.core.config import settings
 from app.core.logging import setup_logging, get_logger
 from app.api import datasets, jobs, results, algorithms
+from app.services.job_events import job_event_broker
 
 # Setup logging
 setup_logging()
@@ -36,6 +37,7 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    await job_event_broker.stop()
     logger.info(f"Shutting down {settings.PROJECT_NAME}")
 
 
@@ -3,7 +3,7 @@ Pydantic models for Job management.
 """
 
 from enum import Enum
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from pydantic import BaseModel, Field
 
@@ -50,12 +50,25 @@ class JobResponse(JobBase):
     id: str = Field(..., description="Job unique identifier")
     status: JobStatusEnum = Field(..., description="Current job status")
     progress: float = Field(default=0.0, description="Progress percentage (0-100)")
+    created_at: Optional[datetime] = Field(default=None, description="Job creation timestamp")
+    updated_at: Optional[datetime] = Field(default=None, description="Last update timestamp")
     started_at: Optional[datetime] = Field(default=None, description="Job start timestamp")
     ended_at: Optional[datetime] = Field(default=None, description="Job end timestamp")
     error_message: Optional[str] = Field(default=None, description="Error message if failed")
     celery_task_id: Optional[str] = Field(default=None, description="Celery task ID")
     result_path: Optional[str] = Field(default=None, description="Path to result files")
     log_file: Optional[str] = Field(default=None, description="Path to log file")
+    cpu_request: Optional[int] = Field(default=None, description="Estimated CPUs reserved")
+    memory_request: Optional[int] = Field(
+        default=None, description="Estimated memory reserved, in bytes"
+    )
+    queue: Optional[str] = Field(default=None, description="Worker lane the job runs on")
+    cache_key: Optional[str] = Field(
+        default=None, description="Result cache key of the job's inputs"
+    )
+    attached_to: Optional[str] = Field(
+        default=None, description="Identical job whose result this job waits for"
+    )
 
     class Config:
         """Model config."""
@@ -63,13 +76,35 @@ class JobResponse(JobBase):
         from_attributes = True
 
 
+class JobSummary(BaseModel):
+    """Lightweight job projection for listings."""
+
+    id: str = Field(..., description="Job unique identifier")
+    name: Optional[str] = Field(default=None, description="Human-readable job name")
+    dataset_id: str = Field(..., description="Dataset identifier")
+    algorithm: str = Field(..., description="Algorithm name")
+    status: JobStatusEnum = Field(..., description="Current job status")
+    progress: float = Field(default=0.0, description="Progress percentage (0-100)")
+    created_at: Optional[datetime] = Field(default=None, description="Job creation timestamp")
+    started_at: Optional[datetime] = Field(default=None, description="Job start timestamp")
+    ended_at: Optional[datetime] = Field(default=None, description="Job end timestamp")
+
+
 class JobListResponse(BaseModel):
     """Model for job list response."""
 
     total: int = Field(..., description="Total number of jobs")
-    items: List[JobResponse] = Field(..., description="Job list")
-    page: int = Field(..., description="Current page")
+    total_is_estimate: bool = Field(
+        default=False, description="Whether total is an estimate (large result sets)"
+    )
+    items: List[Union[JobResponse, JobSummary]] = Field(..., description="Job list")
+    page: Optional[int] = Field(
+        ..., description="Current page (None when paging with a cursor)"
+    )
     per_page: int = Field(..., description="Items per page")
+    next_cursor: Optional[str] = Field(
+        default=None, description="Cursor for the next page, if any"
+    )
 
 
 class JobLogResponse(BaseModel):
@@ -78,6 +113,34 @@ class JobLogResponse(BaseModel):
     job_id: str = Field(..., description="Job ID")
     logs: str = Field(..., description="Log content")
     timestamp: datetime = Field(..., description="Log timestamp")
+    offset: int = Field(default=0, description="Byte offset of the returned content")
+    next_offset: int = Field(default=0, description="Byte offset to continue reading from")
+    size: int = Field(default=0, description="Log size in bytes")
+
+
+class QueueStatus(BaseModel):
+    """Load of one worker lane."""
+
+    queue: str = Field(..., description="Queue name")
+    pending: int = Field(..., description="Jobs waiting for admission")
+    submitted: int = Field(..., description="Admitted jobs waiting for a worker")
+    running: int = Field(..., description="Jobs running")
+    broker_depth: Optional[int] = Field(
+        default=None, description="Messages in the broker queue (None if unreachable)"
+    )
+    workers: int = Field(..., description="Worker slots serving the lane")
+    avg_runtime_seconds: Optional[float] = Field(
+        default=None, description="Mean runtime of recently completed jobs"
+    )
+    expected_wait_seconds: Optional[int] = Field(
+        default=None, description="Estimated wait before a new job starts"
+    )
+
+
+class QueueStatusResponse(BaseModel):
+    """Model for queue status response."""
+
+    queues: List[QueueStatus] = Field(..., description="Worker lanes")
 
 
 class JobCancellationResponse(BaseModel):
@@ -12,11 +12,36 @@ class ResultMetrics(BaseModel):
 
     auc_roc: Optional[float] = Field(default=None, description="AUC-ROC score")
     auc_pr: Optional[float] = Field(default=None, description="AUC-PR score")
-    mcc: Optional[float] = Field(default=None, description="Matthew's correlation coefficient")
+    mcc: Optional[float] = Field(
+        default=None, description="Matthew's correlation coefficient"
+    )
     precision: Optional[float] = Field(default=None, description="Precision")
     recall: Optional[float] = Field(default=None, description="Recall")
     f1_score: Optional[float] = Field(default=None, description="F1 score")
-    execution_time: Optional[float] = Field(default=None, description="Execution time in seconds")
+    early_precision: Optional[float] = Field(
+        default=None, description="Precision of the top-k edges (k = reference size)"
+    )
+    early_precision_ratio: Optional[float] = Field(
+        default=None, description="Early precision relative to a random predictor"
+    )
+    auc_roc_ci: Optional[List[float]] = Field(
+        default=None, description="Bootstrap confidence interval of AUC-ROC"
+    )
+    auc_pr_ci: Optional[List[float]] = Field(
+        default=None, description="Bootstrap confidence interval of AUC-PR"
+    )
+    early_precision_ci: Optional[List[float]] = Field(
+        default=None, description="Bootstrap confidence interval of early precision"
+    )
+    bootstrap_replicates: Optional[int] = Field(
+        default=None, description="Bootstrap replicates behind the intervals"
+    )
+    confidence_level: Optional[float] = Field(
+        default=None, description="Confidence level of the intervals"
+    )
+    execution_time: Optional[float] = Field(
+        default=None, description="Execution time in seconds"
+    )
 
 
 class ResultBase(BaseModel):
@@ -31,8 +56,12 @@ class ResultCreate(ResultBase):
     """Model for creating a result."""
 
     network_file: str = Field(..., description="Path to network file")
-    summary: Optional[Dict[str, Any]] = Field(default=None, description="Result summary")
-    metrics: Optional[ResultMetrics] = Field(default=None, description="Computed metrics")
+    summary: Optional[Dict[str, Any]] = Field(
+        default=None, description="Result summary"
+    )
+    metrics: Optional[ResultMetrics] = Field(
+        default=None, description="Computed metrics"
+    )
 
 
 class ResultResponse(ResultBase):
@@ -40,11 +69,19 @@ class ResultResponse(ResultBase):
 
     id: str = Field(..., description="Result unique identifier")
     network_file: str = Field(..., description="Path to network file")
-    summary: Optional[Dict[str, Any]] = Field(default=None, description="Result summary")
-    metrics: Optional[ResultMetrics] = Field(default=None, description="Computed metrics")
+    summary: Optional[Dict[str, Any]] = Field(
+        default=None, description="Result summary"
+    )
+    metrics: Optional[ResultMetrics] = Field(
+        default=None, description="Computed metrics"
+    )
     created_at: datetime = Field(..., description="Creation timestamp")
-    file_size: Optional[int] = Field(default=None, description="Network file size in bytes")
-    metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
+    file_size: Optional[int] = Field(
+        default=None, description="Network file size in bytes"
+    )
+    metadata: Dict[str, Any] = Field(
+        default_factory=dict, description="Additional metadata"
+    )
 
     class Config:
         """Model config."""
@@ -61,6 +98,34 @@ class ResultListResponse(BaseModel):
     per_page: int = Field(..., description="Items per page")
 
 
+class NetworkEdge(BaseModel):
+    """One edge of a result network."""
+
+    source: str = Field(..., description="Regulator gene")
+    target: str = Field(..., description="Target gene")
+    score: Optional[float] = Field(..., description="Edge score; null if not finite")
+    rank: int = Field(..., description="Position in descending score order")
+
+
+class EdgePage(BaseModel):
+    """A page of edges matching a query."""
+
+    job_id: str = Field(..., description="Job ID")
+    total: int = Field(..., description="Number of edges matching the filters")
+    next_cursor: Optional[int] = Field(
+        default=None, description="Cursor of the next page, if any"
+    )
+    edges: List[NetworkEdge] = Field(..., description="Edges, strongest first")
+
+
+class OverlapAtK(BaseModel):
+    """Overlap of the top-k edges of two networks."""
+
+    k: int = Field(..., description="Number of top-ranked edges considered")
+    overlap: int = Field(..., description="Edges in the top k of both networks")
+    fraction: float = Field(..., description="Overlap divided by k")
+
+
 class NetworkComparison(BaseModel):
     """Network comparison result."""
 
@@ -70,6 +135,70 @@ class NetworkComparison(BaseModel):
     overlap_edges: int = Field(..., description="Number of overlapping edges")
     edges_only_in_1: int = Field(..., description="Edges only in first network")
     edges_only_in_2: int = Field(..., description="Edges only in second network")
+    total_edges_1: Optional[int] = Field(
+        default=None, description="Distinct edges in first network"
+    )
+    total_edges_2: Optional[int] = Field(
+        default=None, description="Distinct edges in second network"
+    )
+    shared_genes: Optional[int] = Field(
+        default=None, description="Genes present in both networks"
+    )
+    overlap_at_k: Optional[List[OverlapAtK]] = Field(
+        default=None, description="Top-k overlap curve"
+    )
+    spearman_correlation: Optional[float] = Field(
+        default=None, description="Spearman correlation of shared edge scores"
+    )
+
+
+class BatchComparisonRequest(BaseModel):
+    """Request for an all-pairs network comparison."""
+
+    job_ids: List[str] = Field(
+        ..., min_length=2, description="Jobs whose networks to compare"
+    )
+
+
+class BatchComparison(BaseModel):
+    """All-pairs comparison of several networks."""
+
+    job_ids: List[str] = Field(..., description="Compared jobs, in matrix order")
+    missing: List[str] = Field(
+        default_factory=list, description="Requested jobs without a network"
+    )
+    jaccard: List[List[float]] = Field(..., description="Pairwise Jaccard index")
+    overlap_edges: List[List[int]] = Field(
+        ..., description="Pairwise shared edge counts"
+    )
+    exact: List[List[bool]] = Field(
+        ..., description="Whether each pair was counted exactly or estimated"
+    )
+    total_edges: List[int] = Field(..., description="Distinct edges per network")
+
+
+class BatchComparisonStatus(BaseModel):
+    """Progress of an all-pairs comparison task."""
+
+    task_id: str = Field(..., description="Comparison task ID")
+    status: str = Field(..., description="Celery task state")
+    current: Optional[int] = Field(default=None, description="Pairs compared")
+    total: Optional[int] = Field(default=None, description="Pairs to compare")
+    result: Optional[BatchComparison] = Field(
+        default=None, description="Comparison result once finished"
+    )
+    error: Optional[str] = Field(default=None, description="Failure message")
+
+
+class EvaluationStatus(BaseModel):
+    """Progress of a bootstrap evaluation task."""
+
+    task_id: str = Field(..., description="Evaluation task ID")
+    status: str = Field(..., description="Celery task state")
+    result: Optional[ResultMetrics] = Field(
+        default=None, description="Metrics once finished"
+    )
+    error: Optional[str] = Field(default=None, description="Failure message")
 
 
 class ResultSummary(BaseModel):
@@ -80,3 +209,24 @@ class ResultSummary(BaseModel):
     density: float = Field(..., description="Network density")
     avg_degree: float = Field(..., description="Average degree")
     max_degree: int = Field(..., description="Maximum degree")
+    num_regulators: Optional[int] = Field(
+        default=None, description="Genes with at least one outgoing edge"
+    )
+    num_targets: Optional[int] = Field(
+        default=None, description="Genes with at least one incoming edge"
+    )
+    degree_histogram: Optional[Dict[str, List[int]]] = Field(
+        default=None, description="Degree counts over power-of-two bins"
+    )
+    in_degree_histogram: Optional[Dict[str, List[int]]] = Field(
+        default=None, description="In-degree counts over power-of-two bins"
+    )
+    out_degree_histogram: Optional[Dict[str, List[int]]] = Field(
+        default=None, description="Out-degree counts over power-of-two bins"
+    )
+    score_quantiles: Optional[Dict[str, float]] = Field(
+        default=None, description="Edge score quantiles keyed by quantile"
+    )
+    score_histogram: Optional[Dict[str, List[float]]] = Field(
+        default=None, description="Edge score histogram (edges and counts)"
+    )
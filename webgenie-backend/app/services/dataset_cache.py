@@ -0,0 +1,318 @@
+"""
+Binary cache for parsed expression matrices.
+Each dataset file is parsed once and stored as a memory-mappable ``.npy``
+matrix plus its gene and cell index, keyed by the file's SHA-256.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from typing import Callable, Optional, Union
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+DELIMITED_CHUNK_ROWS = 2048
+
+
+def compute_file_hash(file_path: Union[str, Path]) -> str:
+    """Compute SHA256 hash of file."""
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for byte_block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+
+def count_data_rows(file_path: Union[str, Path]) -> int:
+    """Number of lines after the header, counted in binary blocks."""
+    lines = 0
+    last = b"\n"
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+class DatasetCache:
+    """Content-addressed cache of expression matrices."""
+
+    VALUES_FILE = "values.npy"
+    INDEX_FILE = "index.json"
+    META_FILE = "meta.json"
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """Initialize dataset cache."""
+        self.cache_dir = Path(cache_dir or settings.DATASET_CACHE_DIR)
+        self.sources_dir = self.cache_dir / "sources"
+
+    def _entry_dir(self, content_hash: str) -> Path:
+        """Directory holding one cached matrix."""
+        return self.cache_dir / content_hash
+
+    def _source_marker(self, file_path: Path) -> Path:
+        """Marker file remembering the hash of an unchanged source file."""
+        stat = file_path.stat()
+        key = f"{file_path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        return self.sources_dir / hashlib.sha1(key.encode()).hexdigest()
+
+    def file_hash(self, file_path: Union[str, Path]) -> str:
+        """
+        SHA-256 of a dataset file.
+
+        The digest is remembered per (path, size, mtime) so unchanged files
+        are hashed only once.
+        """
+        file_path = Path(file_path)
+        marker = self._source_marker(file_path)
+        if marker.exists():
+            return marker.read_text().strip()
+
+        content_hash = compute_file_hash(file_path)
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.write_text(content_hash)
+        return content_hash
+
+    def contains(self, content_hash: str) -> bool:
+        """Whether a complete entry exists for this hash."""
+        return (self._entry_dir(content_hash) / self.META_FILE).exists()
+
+    def get(self, content_hash: str) -> Optional[pd.DataFrame]:
+        """Open a cached matrix as a read-only memory-mapped DataFrame."""
+        entry_dir = self._entry_dir(content_hash)
+        if not self.contains(content_hash):
+            return None
+
+        try:
+            values = np.load(entry_dir / self.VALUES_FILE, mmap_mode="r")
+            with open(entry_dir / self.INDEX_FILE, "r") as f:
+                index = json.load(f)
+
+            return pd.DataFrame(
+                values,
+                index=pd.Index(index["genes"], name=index.get("index_name")),
+                columns=pd.Index(index["cells"]),
+                copy=False,
+            )
+        except Exception as e:
+            logger.warning(
+                f"Discarding unreadable cache entry {content_hash}: {str(e)}"
+            )
+            self.evict(content_hash)
+            return None
+
+    def _new_entry(self, content_hash: str) -> Path:
+        """Scratch directory for an entry that is still being written."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return Path(
+            tempfile.mkdtemp(prefix=f".{content_hash[:12]}-", dir=self.cache_dir)
+        )
+
+    def _commit_entry(
+        self,
+        tmp_dir: Path,
+        content_hash: str,
+        genes: pd.Index,
+        cells: pd.Index,
+        shape,
+        dtype,
+        source: Optional[Union[str, Path]] = None,
+    ) -> Path:
+        """Write the index and metadata, then move the entry into place."""
+        entry_dir = self._entry_dir(content_hash)
+
+        with open(tmp_dir / self.INDEX_FILE, "w") as f:
+            json.dump(
+                {
+                    "index_name": genes.name,
+                    "genes": [str(g) for g in genes],
+                    "cells": [str(c) for c in cells],
+                },
+                f,
+            )
+
+        with open(tmp_dir / self.META_FILE, "w") as f:
+            json.dump(
+                {
+                    "sha256": content_hash,
+                    "source": str(source) if source else None,
+                    "shape": list(shape),
+                    "dtype": str(np.dtype(dtype)),
+                    "created_at": datetime.utcnow().isoformat(),
+                },
+                f,
+            )
+
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Another worker cached the same content first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        logger.info(f"Dataset cached: {content_hash} {tuple(shape)}")
+        return entry_dir
+
+    def put(
+        self,
+        content_hash: str,
+        frame: pd.DataFrame,
+        source: Optional[Union[str, Path]] = None,
+    ) -> Path:
+        """Store a genes x cells matrix under ``content_hash``."""
+        # Build in a scratch directory and rename, so readers never see a
+        # partially written entry
+        tmp_dir = self._new_entry(content_hash)
+        try:
+            values = np.ascontiguousarray(frame.to_numpy())
+            np.save(tmp_dir / self.VALUES_FILE, values)
+            return self._commit_entry(
+                tmp_dir,
+                content_hash,
+                frame.index,
+                frame.columns,
+                frame.shape,
+                values.dtype,
+                source,
+            )
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def put_delimited(
+        self,
+        content_hash: str,
+        file_path: Union[str, Path],
+        sep: str = ",",
+        chunk_rows: int = DELIMITED_CHUNK_ROWS,
+    ) -> Path:
+        """
+        Convert a delimited genes x cells file without loading it whole.
+
+        Rows are parsed ``chunk_rows`` at a time and written straight into
+        a float64 ``.npy`` memmap.
+        """
+        columns = pd.read_csv(file_path, sep=sep, index_col=0, nrows=0).columns
+        n_rows = count_data_rows(file_path)
+
+        tmp_dir = self._new_entry(content_hash)
+        try:
+            out = np.lib.format.open_memmap(
+                tmp_dir / self.VALUES_FILE,
+                mode="w+",
+                dtype=np.float64,
+                shape=(n_rows, len(columns)),
+            )
+            genes = []
+            index_name = None
+            start = 0
+            for chunk in pd.read_csv(
+                file_path, sep=sep, index_col=0, chunksize=chunk_rows
+            ):
+                if not all(pd.api.types.is_numeric_dtype(t) for t in chunk.dtypes):
+                    raise ValueError("non-numeric values")
+                stop = start + len(chunk)
+                if stop > n_rows:
+                    raise ValueError("row count changed while parsing")
+                out[start:stop] = chunk.to_numpy(dtype=np.float64)
+                genes.extend(chunk.index)
+                index_name = chunk.index.name
+                start = stop
+
+            if start != n_rows:
+                raise ValueError(f"parsed {start} of {n_rows} rows")
+            out.flush()
+            del out
+
+            return self._commit_entry(
+                tmp_dir,
+                content_hash,
+                pd.Index(genes, name=index_name),
+                columns,
+                (n_rows, len(columns)),
+                np.float64,
+                file_path,
+            )
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def evict(self, content_hash: str) -> None:
+        """Remove a cached matrix."""
+        shutil.rmtree(self._entry_dir(content_hash), ignore_errors=True)
+
+    def load(
+        self,
+        file_path: Union[str, Path],
+        reader: Callable[[str], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """
+        Load a dataset through the cache.
+
+        On a miss the file is parsed with ``reader`` and stored; numeric
+        matrices are then served from the memory-mapped copy.
+        """
+        content_hash = self.file_hash(file_path)
+        cached = self.get(content_hash)
+        if cached is not None:
+            logger.debug(f"Dataset cache hit: {file_path} ({content_hash})")
+            return cached
+
+        frame = reader(str(file_path))
+        if not all(pd.api.types.is_numeric_dtype(t) for t in frame.dtypes):
+            logger.warning(f"Not caching non-numeric dataset: {file_path}")
+            return frame
+
+        try:
+            self.put(content_hash, frame, source=file_path)
+        except Exception as e:
+            logger.warning(f"Failed to cache dataset {file_path}: {str(e)}")
+            return frame
+
+        cached = self.get(content_hash)
+        return cached if cached is not None else frame
+
+    def load_delimited(
+        self,
+        file_path: Union[str, Path],
+        sep: str = ",",
+        chunk_rows: int = DELIMITED_CHUNK_ROWS,
+    ) -> pd.DataFrame:
+        """
+        Load a CSV/TSV dataset through the cache, converting it in chunks.
+
+        Files that cannot be converted (non-numeric values, ragged rows)
+        fall back to a regular in-memory parse.
+        """
+        content_hash = self.file_hash(file_path)
+        cached = self.get(content_hash)
+        if cached is not None:
+            logger.debug(f"Dataset cache hit: {file_path} ({content_hash})")
+            return cached
+
+        def reader(path: str) -> pd.DataFrame:
+            return pd.read_csv(path, sep=sep, index_col=0)
+
+        try:
+            self.put_delimited(content_hash, file_path, sep, chunk_rows)
+        except Exception as e:
+            logger.warning(f"Chunked conversion failed for {file_path}: {str(e)}")
+            return self.load(file_path, reader)
+
+        cached = self.get(content_hash)
+        return cached if cached is not None else reader(str(file_path))
+
+
+# Global cache instance
+dataset_cache = DatasetCache()
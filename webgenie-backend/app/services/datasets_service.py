@@ -14,6 +14,7 @@ import logging
 
 from app.core.config import settings
 from app.models.dataset import DatasetResponse, DatasetSchema, DatasetSource
+from app.services.dataset_cache import dataset_cache
 
 logger = logging.getLogger(__name__)
 
@@ -50,11 +51,7 @@ class DatasetService:
 
     def _compute_file_hash(self, file_path: Path) -> str:
         """Compute SHA256 hash of file."""
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+        return dataset_cache.file_hash(file_path)
 
     async def register_dataset(
         self,
@@ -4,13 +4,19 @@ Inference service for running GRN algorithms.
 
 import os
 import json
+import asyncio
 import subprocess
 import logging
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 from pathlib import Path
 from datetime import datetime
 
 from app.core.config import settings
+from app.services.network_evaluation import find_reference, write_evaluation
+from app.services.network_store import NetworkStore, build_network_store
+from app.services.network_sketch import write_sketch
+from app.services.network_summary import write_summary
+from app.services.process_supervisor import ProcessTimeout, run_process
 
 logger = logging.getLogger(__name__)
 
@@ -43,8 +49,19 @@ class InferenceService:
         algorithm: str,
         dataset_path: str,
         parameters: Dict[str, Any],
+        on_progress: Optional[Callable[[float, str], None]] = None,
     ) -> Dict[str, Any]:
-        """Run a GRN inference algorithm."""
+        """
+        Run a GRN inference algorithm.
+
+        ``on_progress(percent, message)`` is called at each stage.
+        """
+
+        async def report(percent: float, message: str) -> None:
+            # Callbacks may block on I/O; keep them off the event loop
+            if on_progress is not None:
+                await asyncio.to_thread(on_progress, percent, message)
+
         try:
             job_dir = self._create_job_directory(job_id)
             log_file = job_dir / "execution.log"
@@ -65,8 +82,9 @@ class InferenceService:
             )
 
             # Run algorithm
-            with open(log_file, "w") as lf:
-                process = await self._execute_command(cmd, lf)
+            await report(10, f"Running {algorithm}")
+            log_file.write_bytes(b"")
+            process = await self._execute_command(cmd, log_file)
 
             if process.returncode != 0:
                 error_msg = f"Algorithm execution failed with code {process.returncode}"
@@ -80,6 +98,11 @@ class InferenceService:
             if not output_file.exists():
                 raise RuntimeError(f"Output file not created: {output_file}")
 
+            # Binary copy of the network for fast downstream reads
+            await report(80, "Storing network")
+            network = await asyncio.to_thread(self._store_network, output_file)
+            await report(90, "Computing metrics")
+
             # Generate result summary
             result = {
                 "job_id": job_id,
@@ -89,7 +112,9 @@ class InferenceService:
                 "output_file": str(output_file),
                 "log_file": str(log_file),
                 "completed_at": datetime.utcnow().isoformat(),
-                "metrics": await self._compute_metrics(output_file, dataset_path),
+                "metrics": await self._compute_metrics(
+                    network, dataset_path, output_file
+                ),
             }
 
             logger.info(
@@ -142,8 +167,8 @@ class InferenceService:
             f"{job_dir}:/data/logs",
         ]
 
-        # Base docker command
-        cmd = ["docker", "run", "--rm"]
+        # Base docker command; named so a timeout can stop the container
+        cmd = ["docker", "run", "--rm", "--name", self._container_name(job_dir)]
 
         # Add volume mounts
         for volume in volumes:
@@ -215,37 +240,84 @@ class InferenceService:
         
         return runner_map.get(algorithm.upper(), "app.services.runners.generic_runner")
 
-    async def _execute_command(self, cmd: list, log_file) -> subprocess.CompletedProcess:
-        """Execute command and capture output."""
+    def _container_name(self, job_dir: str) -> str:
+        """Docker container name for a job."""
+        return f"webgenie-{Path(job_dir).name}"
+
+    async def _execute_command(self, cmd: list, log_file: Path) -> subprocess.CompletedProcess:
+        """Execute command with output streamed into the log file."""
+
+        async def stop_container() -> None:
+            # Killing the docker client does not stop its container
+            kill = await asyncio.create_subprocess_exec(
+                "docker",
+                "kill",
+                self._container_name(str(log_file.parent)),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            await kill.wait()
+
         try:
-            process = subprocess.run(
+            returncode = await run_process(
                 cmd,
-                stdout=log_file,
-                stderr=subprocess.STDOUT,
+                log_file,
                 timeout=settings.ALGORITHM_TIMEOUT,
+                on_stop=stop_container if cmd[0] == "docker" else None,
             )
-            return process
-        except subprocess.TimeoutExpired:
+            return subprocess.CompletedProcess(cmd, returncode)
+        except ProcessTimeout:
             logger.error("Algorithm execution timeout")
             raise RuntimeError("Algorithm execution timed out")
 
+    def _store_network(self, output_file: Path) -> Optional[NetworkStore]:
+        """Write the binary network store, summary and sketch next to the TSV output."""
+        try:
+            network = NetworkStore(build_network_store(output_file))
+        except Exception as e:
+            logger.warning(f"Failed to write network store: {str(e)}")
+            return None
+
+        try:
+            write_summary(output_file, network)
+        except Exception as e:
+            logger.warning(f"Failed to write network summary: {str(e)}")
+
+        try:
+            write_sketch(output_file, network)
+        except Exception as e:
+            logger.warning(f"Failed to write network sketch: {str(e)}")
+        return network
+
     async def _compute_metrics(
         self,
-        output_file: Path,
+        network: Optional[NetworkStore],
         dataset_path: str,
+        output_file: Path,
     ) -> Dict[str, Any]:
         """Compute metrics for result."""
         try:
-            # Parse network file
-            import pandas as pd
-            
-            network_df = pd.read_csv(output_file, sep="\t", header=None)
-            
+            if network is None:
+                return {}
+
             metrics = {
-                "total_edges": len(network_df),
-                "num_unique_genes": len(set(network_df[0]) | set(network_df[1])),
+                "total_edges": len(network),
+                "num_unique_genes": network.num_genes,
             }
-            
+
+            # Benchmark against the dataset's reference network, if it has one
+            reference_file = find_reference(dataset_path)
+            if reference_file is not None:
+                metrics.update(
+                    await asyncio.to_thread(
+                        write_evaluation,
+                        output_file,
+                        reference_file,
+                        network,
+                        n_bootstrap=settings.EVALUATION_BOOTSTRAP,
+                    )
+                )
+
             return metrics
         except Exception as e:
             logger.warning(f"Failed to compute metrics: {str(e)}")
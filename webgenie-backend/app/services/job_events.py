@@ -0,0 +1,166 @@
+"""
+Job event bus over Redis pub/sub.
+
+Status and progress transitions are applied to the job store and then
+published on one channel. Each API process runs a single subscriber that
+fans events out to its stream clients, filtered by the jobs they watch, so
+clients are pushed updates instead of polling.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Iterable, Optional, Set
+from datetime import datetime
+import logging
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.models.job import JobStatusEnum
+from app.services.job_repository import job_repository
+
+logger = logging.getLogger(__name__)
+
+JOB_EVENTS_CHANNEL = "webgenie:job-events"
+SUBSCRIBER_QUEUE_SIZE = 256
+RECONNECT_DELAY_SECONDS = 1.0
+
+TERMINAL_STATUSES = {
+    JobStatusEnum.COMPLETED.value,
+    JobStatusEnum.FAILED.value,
+    JobStatusEnum.CANCELLED.value,
+}
+
+_publisher: Optional[redis.Redis] = None
+
+
+def _get_publisher() -> redis.Redis:
+    """Process-wide Redis client for publishing."""
+    global _publisher
+    if _publisher is None:
+        _publisher = redis.Redis.from_url(settings.REDIS_URL)
+    return _publisher
+
+
+def apply_job_event(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Update the job row from an event; returns the updated job, or None.
+
+    Events for a job that has already finished are ignored (None), so a
+    late progress report cannot revive a cancelled job.
+    """
+    timestamp = datetime.fromisoformat(event["timestamp"])
+    fields: Dict[str, Any] = {"status": event["status"], "updated_at": timestamp}
+    if event.get("progress") is not None:
+        fields["progress"] = max(0, min(100, event["progress"]))
+    if event.get("error_message"):
+        fields["error_message"] = event["error_message"]
+    if event["status"] == JobStatusEnum.RUNNING.value and event.get("started"):
+        fields["started_at"] = timestamp
+    if event["status"] in TERMINAL_STATUSES:
+        fields["ended_at"] = timestamp
+    return job_repository.update_where(
+        event["job_id"], status_not_in=TERMINAL_STATUSES, **fields
+    )
+
+
+def publish_job_event(
+    job_id: str,
+    status: JobStatusEnum,
+    progress: Optional[float] = None,
+    message: Optional[str] = None,
+    error_message: Optional[str] = None,
+    started: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    Record a job transition and publish it to stream subscribers.
+
+    The store is updated first, so a lost publish only delays clients until
+    their next snapshot. Returns the updated job, or None if it is unknown
+    or already finished, in which case nothing is published.
+    """
+    event = {
+        "job_id": job_id,
+        "status": status.value,
+        "progress": progress,
+        "message": message,
+        "error_message": error_message,
+        "started": started,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+    job = apply_job_event(event)
+    if job is None:
+        logger.warning(f"Job not found or already finished for event: {job_id}")
+        return None
+
+    try:
+        _get_publisher().publish(JOB_EVENTS_CHANNEL, json.dumps(event))
+    except Exception as e:
+        logger.error(f"Failed to publish job event: {str(e)}")
+    return job
+
+
+class JobEventBroker:
+    """Fans the Redis event channel out to in-process subscriber queues."""
+
+    def __init__(self):
+        """Initialize event broker."""
+        self._subscribers: Dict[asyncio.Queue, Optional[Set[str]]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, job_ids: Optional[Iterable[str]] = None) -> asyncio.Queue:
+        """Queue receiving events for ``job_ids`` (all jobs if None)."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[queue] = set(job_ids) if job_ids else None
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Stop delivering events to a queue."""
+        self._subscribers.pop(queue, None)
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        """Deliver an event to every matching subscriber."""
+        for queue, job_ids in list(self._subscribers.items()):
+            if job_ids is not None and event.get("job_id") not in job_ids:
+                continue
+            if queue.full():
+                # Slow client: drop its oldest event rather than block the bus
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _listen(self) -> None:
+        """Relay channel messages while anyone is subscribed; reconnect on error."""
+        while self._subscribers:
+            client = aioredis.Redis.from_url(settings.REDIS_URL)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(JOB_EVENTS_CHANNEL)
+                while self._subscribers:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job event subscription failed: {str(e)}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+    async def stop(self) -> None:
+        """Cancel the listener task."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+
+
+# Global broker instance
+job_event_broker = JobEventBroker()
@@ -0,0 +1,130 @@
+"""
+Seeking reads over job execution logs.
+
+Logs of long runs reach hundreds of MB, so reads never load the whole
+file: byte ranges seek to an offset, tails scan backwards block by block,
+and follow mode polls the file size and yields only appended bytes.
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Union
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BLOCK_SIZE = 64 * 1024
+LOG_FOLLOW_INTERVAL = 0.5
+
+
+def _decode(data: bytes) -> str:
+    """Decode log bytes; a read may split a multi-byte character."""
+    return data.decode("utf-8", errors="replace")
+
+
+def read_log_range(
+    log_file: Union[str, Path], offset: int = 0, max_bytes: int = LOG_MAX_BYTES
+) -> Dict[str, Any]:
+    """
+    Up to ``max_bytes`` of the log starting at byte ``offset``.
+
+    ``next_offset`` is where the following read should start.
+    """
+    with open(log_file, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = min(max(offset, 0), size)
+        f.seek(offset)
+        data = f.read(max_bytes)
+    return {
+        "content": _decode(data),
+        "offset": offset,
+        "next_offset": offset + len(data),
+        "size": size,
+    }
+
+
+def read_log_tail(
+    log_file: Union[str, Path],
+    lines: Optional[int] = None,
+    max_bytes: int = LOG_MAX_BYTES,
+) -> Dict[str, Any]:
+    """
+    The last ``lines`` lines of the log (or last ``max_bytes`` if None).
+
+    Reads backwards in blocks and never more than ``max_bytes``.
+    """
+    with open(log_file, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        start = size
+        data = b""
+        while start > 0 and len(data) < max_bytes:
+            # A trailing newline ends the last line, it does not start one
+            if lines is not None and data.count(b"\n", 0, len(data) - 1) >= lines:
+                break
+            step = min(LOG_BLOCK_SIZE, start, max_bytes - len(data))
+            start -= step
+            f.seek(start)
+            data = f.read(step) + data
+
+    if lines is not None:
+        kept = data.splitlines(keepends=True)[-lines:] if lines > 0 else []
+        start += len(data) - sum(len(line) for line in kept)
+        data = b"".join(kept)
+    return {
+        "content": _decode(data),
+        "offset": start,
+        "next_offset": size,
+        "size": size,
+    }
+
+
+async def follow_log(
+    log_file: Union[str, Path],
+    offset: int = 0,
+    is_finished: Optional[Callable[[], bool]] = None,
+    interval: float = LOG_FOLLOW_INTERVAL,
+    max_bytes: int = LOG_MAX_BYTES,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield appended log text from ``offset`` as it is written.
+
+    Polls the file size every ``interval`` seconds and yields whole lines
+    only; an over-long line is cut at ``max_bytes``. Stops once
+    ``is_finished()`` is true and the file is drained, the final partial
+    line included. ``is_finished`` may block (e.g. query the database): it
+    runs in a worker thread, and only when no new output arrived.
+    """
+    log_file = Path(log_file)
+    pending = b""
+    while True:
+        size = log_file.stat().st_size if log_file.exists() else 0
+        # Check before reading, so output written before the end is drained
+        finished = False
+        if is_finished is not None and size == offset + len(pending):
+            finished = await asyncio.to_thread(is_finished)
+            size = log_file.stat().st_size if log_file.exists() else 0
+        if size < offset + len(pending):
+            # Truncated or rewritten (e.g. a restarted run): start over
+            offset, pending = 0, b""
+        if size > offset + len(pending):
+            with open(log_file, "rb") as f:
+                f.seek(offset + len(pending))
+                pending += f.read(max_bytes)
+        if finished or len(pending) >= max_bytes:
+            cut = len(pending)
+        else:
+            cut = pending.rfind(b"\n") + 1
+        if cut > 0:
+            chunk, pending = pending[:cut], pending[cut:]
+            offset += len(chunk)
+            yield {
+                "content": _decode(chunk),
+                "offset": offset - len(chunk),
+                "next_offset": offset,
+            }
+            continue
+        if finished:
+            return
+        await asyncio.sleep(interval)
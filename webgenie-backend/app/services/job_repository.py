@@ -0,0 +1,528 @@
+"""
+Job persistence on the relational database.
+
+Every status change is a single-row UPDATE, so the cost of writing a job
+no longer grows with the number of jobs, and concurrent API workers and
+Celery workers update different rows without overwriting each other.
+"""
+
+import base64
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from datetime import datetime
+from pathlib import Path
+import logging
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    DateTime,
+    Float,
+    Index,
+    Insert,
+    Integer,
+    Select,
+    String,
+    Text,
+    and_,
+    func,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from app.core.config import settings
+from app.core.database import Base, get_engine, session_scope
+
+logger = logging.getLogger(__name__)
+
+# Job dict key -> column attribute, where they differ
+_RENAMED = {"ended_at": "completed_at"}
+_RENAMED_COLUMNS = {column: key for key, column in _RENAMED.items()}
+_DATETIME_FIELDS = ("created_at", "updated_at", "started_at", "ended_at")
+# Attempts to insert a deduplicated job before giving up on a busy key
+_DEDUPLICATE_ATTEMPTS = 3
+# Jobs that own a result cache key: at most one per key
+_ACTIVE_PRIMARY = text(
+    "status IN ('pending', 'submitted', 'running') AND attached_to IS NULL"
+)
+
+
+class Job(Base):
+    """A job row; mirrors the ``jobs`` table of ``scripts/init-db.sql``."""
+
+    __tablename__ = "jobs"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    name: Mapped[str] = mapped_column(String(255))
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    dataset_id: Mapped[str] = mapped_column(String(255))
+    algorithm: Mapped[str] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(50), default="pending")
+    parameters: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    progress: Mapped[float] = mapped_column(Float, default=0.0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    error_message: Mapped[Optional[str]] = mapped_column(Text)
+    celery_task_id: Mapped[Optional[str]] = mapped_column(String(255))
+    result_path: Mapped[Optional[str]] = mapped_column(String(1024))
+    log_file: Mapped[Optional[str]] = mapped_column(String(1024))
+    cpu_request: Mapped[Optional[int]] = mapped_column(Integer)
+    memory_request: Mapped[Optional[int]] = mapped_column(BigInteger)
+    queue: Mapped[Optional[str]] = mapped_column(String(50))
+    cache_key: Mapped[Optional[str]] = mapped_column(String(64))
+    attached_to: Mapped[Optional[str]] = mapped_column(String(64))
+
+    # Listing indexes end in (created_at, id): the sort key and keyset cursor
+    __table_args__ = (
+        Index("idx_jobs_dataset_id_created_at", "dataset_id", "created_at", "id"),
+        Index("idx_jobs_algorithm_created_at", "algorithm", "created_at", "id"),
+        Index("idx_jobs_status_created_at", "status", "created_at", "id"),
+        Index("idx_jobs_created_at", "created_at", "id"),
+        Index("idx_jobs_celery_task_id", "celery_task_id"),
+        Index("idx_jobs_queue_status", "queue", "status", "completed_at"),
+        Index("idx_jobs_cache_key_status", "cache_key", "status"),
+        Index(
+            "uq_jobs_active_cache_key",
+            "cache_key",
+            unique=True,
+            postgresql_where=_ACTIVE_PRIMARY,
+            sqlite_where=_ACTIVE_PRIMARY,
+        ),
+        Index("idx_jobs_attached_to", "attached_to"),
+    )
+
+
+# Columns of the lightweight listing projection
+_SUMMARY_COLUMNS = (
+    Job.id,
+    Job.name,
+    Job.dataset_id,
+    Job.algorithm,
+    Job.status,
+    Job.progress,
+    Job.created_at,
+    Job.started_at,
+    Job.completed_at,
+)
+
+
+def _to_columns(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Map job dict fields onto column attributes."""
+    columns = {}
+    for key, value in fields.items():
+        if key in _DATETIME_FIELDS and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        columns[_RENAMED.get(key, key)] = value
+    return columns
+
+
+def _insert_new(dialect: str, values: Dict[str, Any]) -> Insert:
+    """INSERT of a job row that does nothing if the job already exists."""
+    if dialect == "postgresql":
+        statement: Insert = postgresql_insert(Job).on_conflict_do_nothing(
+            index_elements=["id"]
+        )
+    else:
+        statement = sqlite_insert(Job).on_conflict_do_nothing(index_elements=["id"])
+    return statement.values(**values)
+
+
+def _to_dict(job: Job) -> Dict[str, Any]:
+    """Job row as the dict shape used by the job service."""
+    return {
+        "id": job.id,
+        "name": job.name,
+        "description": job.description,
+        "dataset_id": job.dataset_id,
+        "algorithm": job.algorithm,
+        "status": job.status,
+        "parameters": job.parameters or {},
+        "progress": job.progress,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "ended_at": job.completed_at,
+        "updated_at": job.updated_at,
+        "error_message": job.error_message,
+        "celery_task_id": job.celery_task_id,
+        "result_path": job.result_path,
+        "log_file": job.log_file,
+        "cpu_request": job.cpu_request,
+        "memory_request": job.memory_request,
+        "queue": job.queue,
+        "cache_key": job.cache_key,
+        "attached_to": job.attached_to,
+    }
+
+
+def encode_cursor(created_at: datetime, job_id: str) -> str:
+    """Opaque keyset cursor for the job after which a page starts."""
+    raw = f"{created_at.isoformat()}|{job_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of ``encode_cursor``; raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, job_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), job_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class JobRepository:
+    """Row-level job storage."""
+
+    def __init__(self):
+        """Initialize job repository."""
+        self._ready = False
+
+    def _ensure_schema(self) -> None:
+        """Create missing tables and indexes (SQLite; a no-op on a prepared DB)."""
+        if not self._ready:
+            tables = [Base.metadata.tables[Job.__tablename__]]
+            Base.metadata.create_all(get_engine(), tables=tables)
+            self._ready = True
+
+    def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a new job."""
+        self._ensure_schema()
+        with session_scope() as session:
+            row = Job(**_to_columns(job))
+            session.add(row)
+            session.flush()
+            return _to_dict(row)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch one job by ID."""
+        self._ensure_schema()
+        with session_scope() as session:
+            row = session.get(Job, job_id)
+            return _to_dict(row) if row is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Update columns of one job; returns the updated job, or None."""
+        self._ensure_schema()
+        fields.setdefault("updated_at", datetime.utcnow())
+        with session_scope() as session:
+            row = session.get(Job, job_id, with_for_update=True)
+            if row is None:
+                return None
+            for key, value in _to_columns(fields).items():
+                setattr(row, key, value)
+            session.flush()
+            return _to_dict(row)
+
+    def update_where(
+        self,
+        job_id: str,
+        status_in: Optional[Iterable[str]] = None,
+        status_not_in: Optional[Iterable[str]] = None,
+        **fields: Any,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update one job only if its current status matches.
+
+        The status check and the write are one UPDATE, so a transition
+        another process makes in between is not overwritten. Returns the
+        updated job, or None if it is unknown or its status did not match.
+        """
+        self._ensure_schema()
+        fields.setdefault("updated_at", datetime.utcnow())
+        conditions = [Job.id == job_id]
+        if status_in is not None:
+            conditions.append(Job.status.in_(list(status_in)))
+        if status_not_in is not None:
+            conditions.append(Job.status.not_in(list(status_not_in)))
+        statement = (
+            update(Job)
+            .where(*conditions)
+            .values(**_to_columns(fields))
+            .execution_options(synchronize_session=False)
+        )
+        with session_scope() as session:
+            if session.execute(statement).rowcount == 0:
+                return None
+            row = session.get(Job, job_id)
+            return _to_dict(row) if row is not None else None
+
+    def list_jobs(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        status: Optional[str] = None,
+        dataset_id: Optional[str] = None,
+        algorithm: Optional[str] = None,
+        cursor: Optional[str] = None,
+        summary: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        One page of filtered jobs, newest first.
+
+        With a ``cursor`` (the previous page's ``next_cursor``) the page is
+        an index range scan after that job and ``skip`` is ignored.
+        ``summary`` selects only the listing columns. ``total`` is exact up
+        to ``JOB_COUNT_LIMIT`` matches; past that it is an estimate and
+        ``total_is_estimate`` is set.
+        """
+        self._ensure_schema()
+        conditions = []
+        if status:
+            conditions.append(Job.status == status)
+        if dataset_id:
+            conditions.append(Job.dataset_id == dataset_id)
+        if algorithm:
+            conditions.append(Job.algorithm == algorithm)
+
+        query: Select[Any]
+        if summary:
+            query = select(*_SUMMARY_COLUMNS)
+        else:
+            query = select(Job)
+        query = query.where(*conditions)
+        if cursor:
+            after_created, after_id = decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    Job.created_at < after_created,
+                    and_(Job.created_at == after_created, Job.id < after_id),
+                )
+            )
+        else:
+            query = query.offset(skip)
+        # One extra row tells whether there is a next page
+        query = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1)
+
+        with session_scope() as session:
+            total, estimated = self._count(session, conditions)
+            if summary:
+                items = [
+                    {
+                        _RENAMED_COLUMNS.get(key, key): value
+                        for key, value in row._asdict().items()
+                    }
+                    for row in session.execute(query)
+                ]
+            else:
+                items = [_to_dict(row) for row in session.scalars(query)]
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+
+        return {
+            "total": total,
+            "total_is_estimate": estimated,
+            "items": items,
+            "next_cursor": next_cursor,
+        }
+
+    def pending_jobs(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Oldest pending jobs first (the admission queue)."""
+        self._ensure_schema()
+        query = (
+            select(Job)
+            .where(Job.status == "pending", Job.attached_to.is_(None))
+            .order_by(Job.created_at, Job.id)
+            .limit(limit)
+        )
+        with session_scope() as session:
+            return [_to_dict(row) for row in session.scalars(query)]
+
+    def queue_stats(self, queue: str, sample: int = 50) -> Dict[str, Any]:
+        """
+        Active job counts of a lane and its mean runtime.
+
+        The runtime averages the ``sample`` most recently completed jobs;
+        None without history.
+        """
+        self._ensure_schema()
+        counts = (
+            select(Job.status, func.count())
+            .where(
+                Job.queue == queue,
+                Job.status.in_(["pending", "submitted", "running"]),
+                Job.attached_to.is_(None),
+            )
+            .group_by(Job.status)
+        )
+        recent = (
+            select(Job.started_at, Job.completed_at)
+            .where(
+                Job.queue == queue,
+                Job.status == "completed",
+                Job.started_at.is_not(None),
+                Job.completed_at.is_not(None),
+            )
+            .order_by(Job.completed_at.desc())
+            .limit(sample)
+        )
+        with session_scope() as session:
+            by_status: Dict[str, int] = {
+                status: count for status, count in session.execute(counts)
+            }
+            runtimes = [
+                (ended - started).total_seconds()
+                for started, ended in session.execute(recent)
+            ]
+        return {
+            "pending": by_status.get("pending", 0),
+            "submitted": by_status.get("submitted", 0),
+            "running": by_status.get("running", 0),
+            "avg_runtime": sum(runtimes) / len(runtimes) if runtimes else None,
+        }
+
+    def find_active(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """The oldest unfinished job running under a result cache key."""
+        self._ensure_schema()
+        query = (
+            select(Job)
+            .where(
+                Job.cache_key == cache_key,
+                Job.status.in_(["pending", "submitted", "running"]),
+                Job.attached_to.is_(None),
+            )
+            .order_by(Job.created_at, Job.id)
+            .limit(1)
+        )
+        with session_scope() as session:
+            row = session.scalars(query).first()
+            return _to_dict(row) if row is not None else None
+
+    def create_deduplicated(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a job, attached to the active job with the same ``cache_key``.
+
+        Without such a job it is inserted as the one that runs. A unique
+        index allows one active, unattached job per key, so of concurrent
+        identical submissions only one runs and the others attach to it.
+        """
+        for _ in range(_DEDUPLICATE_ATTEMPTS):
+            attempt = dict(job)
+            if attempt.get("cache_key") and not attempt.get("attached_to"):
+                primary = self.find_active(attempt["cache_key"])
+                if primary is not None:
+                    attempt["attached_to"] = primary["id"]
+            try:
+                return self.create(attempt)
+            except IntegrityError:
+                if not attempt.get("cache_key") or attempt.get("attached_to"):
+                    raise
+                # An identical job was inserted since the lookup; attach to it
+                logger.info(f"Job {attempt['id']} lost a race for its cache key")
+        raise RuntimeError(f"Failed to insert job {job['id']}: cache key is contended")
+
+    def hand_over(self, job_ids: List[str]) -> str:
+        """
+        Let the first of several identical waiting jobs run, the rest wait on it.
+
+        If an identical job became active meanwhile, they all wait on that one
+        instead. Returns the ID of the job they now depend on.
+        """
+        for _ in range(_DEDUPLICATE_ATTEMPTS):
+            head, rest = job_ids[0], job_ids[1:]
+            try:
+                self.update(head, attached_to=None)
+            except IntegrityError:
+                job = self.get(head)
+                primary = self.find_active(job["cache_key"]) if job else None
+                if primary is None:
+                    continue
+                head, rest = primary["id"], job_ids
+            for job_id in rest:
+                self.update(job_id, attached_to=head)
+            return head
+        raise RuntimeError(
+            f"Failed to hand over jobs {job_ids}: cache key is contended"
+        )
+
+    def attached_jobs(self, job_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Pending jobs waiting on another job's result, oldest first.
+
+        Only those attached to ``job_id`` if given, else all of them.
+        """
+        self._ensure_schema()
+        condition = (
+            Job.attached_to == job_id
+            if job_id is not None
+            else Job.attached_to.is_not(None)
+        )
+        query = (
+            select(Job)
+            .where(Job.status == "pending", condition)
+            .order_by(Job.created_at, Job.id)
+        )
+        with session_scope() as session:
+            return [_to_dict(row) for row in session.scalars(query)]
+
+    def _count(self, session: Session, conditions: List[Any]) -> Tuple[int, bool]:
+        """Matching job count, bounded by ``JOB_COUNT_LIMIT``; (count, estimated)."""
+        cap = settings.JOB_COUNT_LIMIT
+        bounded = select(Job.id).where(*conditions).limit(cap + 1).subquery()
+        count = session.scalar(select(func.count()).select_from(bounded)) or 0
+        if count <= cap:
+            return count, False
+
+        if not conditions and session.get_bind().dialect.name == "postgresql":
+            # Planner statistics; refreshed by autovacuum/ANALYZE
+            estimate = session.scalar(
+                text(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = 'jobs'::regclass"
+                )
+            )
+            if estimate is not None:
+                return max(int(estimate), count), True
+        return count, True
+
+    def import_json(self, metadata_file: Union[str, Path]) -> int:
+        """
+        One-time import of a legacy ``jobs_metadata.json``.
+
+        Jobs already in the database are skipped, row by row, so API workers
+        importing the same file at once do not conflict. The file is renamed
+        to ``*.imported`` afterwards so the import does not run again.
+        """
+        metadata_file = Path(metadata_file)
+        self._ensure_schema()
+        try:
+            with open(metadata_file, "r") as f:
+                jobs = json.load(f)
+        except FileNotFoundError:
+            # Never written, or already imported by another process
+            return 0
+
+        dialect = get_engine().dialect.name
+        imported = 0
+        with session_scope() as session:
+            for job in jobs.values():
+                fields = {
+                    key: value
+                    for key, value in job.items()
+                    if _RENAMED.get(key, key) in Job.__table__.c
+                }
+                statement = _insert_new(dialect, _to_columns(fields))
+                if session.scalar(statement.returning(Job.id)) is not None:
+                    imported += 1
+
+        try:
+            metadata_file.rename(
+                metadata_file.with_name(metadata_file.name + ".imported")
+            )
+        except FileNotFoundError:
+            pass
+        logger.info(f"Imported {imported} jobs from {metadata_file}")
+        return imported
+
+
+# Global repository instance
+job_repository = JobRepository()
@@ -0,0 +1,116 @@
+"""
+Size-aware routing of inference jobs onto worker lanes.
+
+Each job is classified by estimated cost, genes x cells x the algorithm's
+relative complexity, and sent to the queue of its lane. Small interactive
+jobs go to ``priority``, day-long runs to ``inference``, and everything in
+between to ``default``. Each lane is served by its own worker pool, so
+short jobs never wait behind long ones.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.core.config import settings
+from app.core.tasks import celery_app
+from app.services.job_repository import job_repository
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_QUEUE = "priority"
+DEFAULT_QUEUE = "default"
+INFERENCE_QUEUE = "inference"
+LANES = (PRIORITY_QUEUE, DEFAULT_QUEUE, INFERENCE_QUEUE)
+
+# Relative cost per expression value (gene x cell)
+ALGORITHM_COMPLEXITY: Dict[str, float] = {
+    "GENIE3": 100.0,
+    "SINGE": 80.0,
+    "JUMP3": 60.0,
+    "SCNS": 50.0,
+    "GRNBOOST2": 40.0,
+    "SCRIBE": 40.0,
+    "PIDC": 30.0,
+    "GRISLI": 30.0,
+    "GRNVBEM": 20.0,
+    "SINCERITIES": 10.0,
+    "SCSGL": 10.0,
+    "LEAP": 5.0,
+    "PPCOR": 5.0,
+    "SCODE": 5.0,
+}
+DEFAULT_COMPLEXITY = 10.0
+
+
+def estimate_cost(algorithm: str, n_genes: int, n_cells: int) -> float:
+    """Relative run cost of an algorithm on a dataset."""
+    complexity = ALGORITHM_COMPLEXITY.get(algorithm.upper(), DEFAULT_COMPLEXITY)
+    return n_genes * n_cells * complexity
+
+
+def select_queue(algorithm: str, n_genes: int, n_cells: int) -> str:
+    """Lane for a job; unknown shapes (0 x 0) stay on the default lane."""
+    if n_genes <= 0 or n_cells <= 0:
+        return DEFAULT_QUEUE
+    cost = estimate_cost(algorithm, n_genes, n_cells)
+    if cost <= settings.ROUTING_PRIORITY_MAX_COST:
+        return PRIORITY_QUEUE
+    if cost >= settings.ROUTING_INFERENCE_MIN_COST:
+        return INFERENCE_QUEUE
+    return DEFAULT_QUEUE
+
+
+def broker_depth(queue: str) -> Optional[int]:
+    """Messages waiting in a broker queue, or None if the broker is unreachable."""
+    try:
+        with celery_app.connection_for_read() as connection:
+            declared = connection.default_channel.queue_declare(
+                queue=queue, passive=True
+            )
+            return declared.message_count
+    except Exception as e:
+        logger.warning(f"Failed to read depth of queue {queue}: {str(e)}")
+        return None
+
+
+def expected_wait(
+    waiting: int, running: int, workers: int, avg_runtime: Optional[float]
+) -> Optional[float]:
+    """
+    Rough wait in seconds before a new job on a lane starts.
+
+    Jobs ahead of it that cannot start immediately must first finish; the
+    lane completes about ``workers / avg_runtime`` jobs per second.
+    """
+    if avg_runtime is None:
+        return None
+    ahead = waiting + running - workers + 1
+    if ahead <= 0:
+        return 0.0
+    return ahead * avg_runtime / max(workers, 1)
+
+
+def queue_status() -> List[Dict[str, Any]]:
+    """Depth, throughput and expected wait of every lane."""
+    lanes = []
+    for queue in LANES:
+        stats = job_repository.queue_stats(queue)
+        workers = settings.QUEUE_CONCURRENCY.get(queue, 1)
+        waiting = stats["pending"] + stats["submitted"]
+        wait = expected_wait(waiting, stats["running"], workers, stats["avg_runtime"])
+        lanes.append(
+            {
+                "queue": queue,
+                "pending": stats["pending"],
+                "submitted": stats["submitted"],
+                "running": stats["running"],
+                "broker_depth": broker_depth(queue),
+                "workers": workers,
+                "avg_runtime_seconds": stats["avg_runtime"],
+                "expected_wait_seconds": (
+                    math.ceil(wait) if wait is not None else None
+                ),
+            }
+        )
+    return lanes
@@ -0,0 +1,445 @@
+"""
+Cluster-wide admission control for inference jobs.
+
+Submitted jobs wait as ``pending`` rows and are handed to Celery only when
+the cluster has room for them. Each job gets a CPU and memory estimate from
+its algorithm and dataset shape; a Redis ledger holds the leases of running
+jobs and admits a job atomically only if its lane has a free worker slot
+(``QUEUE_CONCURRENCY``) and the job slots (``MAX_CONCURRENT_JOBS``), CPUs
+and memory all fit. A job is therefore only sent to Celery when a worker
+of its lane can start it, instead of holding cluster capacity while it
+waits in a busy lane's broker queue.
+"""
+
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
+from datetime import datetime
+from pathlib import Path
+import logging
+
+import redis
+from redis.commands.core import Script
+
+from app.core.config import settings
+from app.core.tasks import celery_app
+from app.models.job import JobStatusEnum
+from app.services.dataset_cache import count_data_rows
+from app.services.job_repository import job_repository
+from app.services.job_routing import DEFAULT_QUEUE
+from app.services.runners.correlation import parse_memory_size
+
+logger = logging.getLogger(__name__)
+
+# Interpreter / container overhead of any run
+BASE_MEMORY_BYTES = 512 * 1024**2
+PENDING_SCAN_LIMIT = 200
+# A lease whose job is still pending this long after it was taken was never
+# launched (crashed launcher)
+LAUNCH_GRACE_SECONDS = 60
+
+# Algorithm -> (CPUs, copies of the expression matrix held, genes x genes state)
+ALGORITHM_PROFILES: Dict[str, Tuple[int, float, bool]] = {
+    "GENIE3": (4, 4.0, True),
+    "GRNBOOST2": (4, 3.0, True),
+    "SINGE": (4, 3.0, True),
+    "PIDC": (2, 2.0, True),
+    "JUMP3": (2, 3.0, True),
+    "SCRIBE": (2, 3.0, True),
+    "GRISLI": (1, 3.0, True),
+    "PPCOR": (1, 2.0, True),
+    "LEAP": (1, 2.0, True),
+    "SINCERITIES": (1, 2.0, True),
+    "GRNVBEM": (1, 2.0, True),
+    "SCSGL": (1, 2.0, True),
+    "SCODE": (1, 2.0, False),
+    "SCNS": (1, 2.0, False),
+}
+DEFAULT_PROFILE = (1, 2.0, True)
+
+
+@dataclass
+class ResourceRequest:
+    """CPUs and memory (bytes) reserved for one job."""
+
+    cpus: int
+    memory: int
+
+
+@dataclass
+class Lease:
+    """Resources a job holds, when it took them (epoch seconds) and its lane."""
+
+    request: ResourceRequest
+    acquired_at: float
+    queue: Optional[str] = None
+
+
+def dataset_shape(dataset_path: Union[str, Path]) -> Tuple[int, int]:
+    """(n_genes, n_cells) of a dataset without parsing its values."""
+    path = Path(dataset_path)
+    name = path.name.lower()
+    if name.endswith(".csv") or name.endswith(".tsv"):
+        sep = "\t" if name.endswith(".tsv") else ","
+        with open(path, "r") as f:
+            n_cells = len(f.readline().rstrip("\r\n").split(sep)) - 1
+        return count_data_rows(path), n_cells
+
+    from app.services.runners.readers import open_dataset
+
+    with open_dataset(path) as reader:
+        return reader.shape
+
+
+def estimate_resources(algorithm: str, n_genes: int, n_cells: int) -> ResourceRequest:
+    """
+    CPU and memory estimate for running ``algorithm`` on a dataset.
+
+    Memory is the base overhead, the float64 expression matrix copies the
+    algorithm holds, and a genes x genes score matrix where it builds one;
+    it is capped at ``ALGORITHM_MEMORY_LIMIT``, which the container enforces.
+    """
+    cpus, copies, pairwise = ALGORITHM_PROFILES.get(algorithm.upper(), DEFAULT_PROFILE)
+    memory = BASE_MEMORY_BYTES + int(copies * n_genes * n_cells * 8)
+    if pairwise:
+        memory += n_genes * n_genes * 8
+    limit = parse_memory_size(settings.ALGORITHM_MEMORY_LIMIT)
+    return ResourceRequest(cpus=cpus, memory=min(memory, limit))
+
+
+def node_memory() -> Optional[int]:
+    """Physical memory of this node in bytes, or None if it cannot be read."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def read_dataset_shape(dataset_path: Union[str, Path]) -> Tuple[int, int]:
+    """``dataset_shape``, or (0, 0) if the dataset can't be read."""
+    try:
+        return dataset_shape(dataset_path)
+    except Exception as e:
+        logger.warning(f"Failed to read dataset shape: {str(e)}")
+        return 0, 0
+
+
+# Admit one job atomically. KEYS: usage hash, leases hash.
+# ARGV: job id, cpus, memory, max jobs, max cpus (0 = unlimited), max memory,
+# acquisition time, lane, lane slots (0 = unlimited). Leases are stored as
+# "cpus:memory:acquired_at:lane"; the usage hash counts jobs per "lane:<name>".
+# Returns 1 if admitted now, 2 if the job already holds a lease, 0 if the
+# cluster is full, 3 if only its lane is. A job larger than the whole cluster
+# is still admitted when it is idle.
+_ACQUIRE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[2], ARGV[1]) == 1 then
+    return 2
+end
+local lane_key = 'lane:' .. ARGV[8]
+local lane_jobs = tonumber(redis.call('HGET', KEYS[1], lane_key) or '0')
+local lane_slots = tonumber(ARGV[9])
+if lane_slots > 0 and lane_jobs + 1 > lane_slots then
+    return 3
+end
+local jobs = tonumber(redis.call('HGET', KEYS[1], 'jobs') or '0')
+local cpus = tonumber(redis.call('HGET', KEYS[1], 'cpus') or '0')
+local memory = tonumber(redis.call('HGET', KEYS[1], 'memory') or '0')
+local want_cpus = tonumber(ARGV[2])
+local want_memory = tonumber(ARGV[3])
+if jobs + 1 > tonumber(ARGV[4]) then
+    return 0
+end
+if jobs > 0 then
+    local max_cpus = tonumber(ARGV[5])
+    if max_cpus > 0 and cpus + want_cpus > max_cpus then
+        return 0
+    end
+    if memory + want_memory > tonumber(ARGV[6]) then
+        return 0
+    end
+end
+redis.call('HINCRBY', KEYS[1], 'jobs', 1)
+redis.call('HINCRBY', KEYS[1], 'cpus', want_cpus)
+redis.call('HINCRBY', KEYS[1], 'memory', want_memory)
+redis.call('HINCRBY', KEYS[1], lane_key, 1)
+redis.call('HSET', KEYS[2], ARGV[1], table.concat({ARGV[2], ARGV[3], ARGV[7], ARGV[8]}, ':'))
+return 1
+"""
+
+# Release a job's lease if it holds one. KEYS: usage hash, leases hash.
+_RELEASE_SCRIPT = """
+local lease = redis.call('HGET', KEYS[2], ARGV[1])
+if not lease then
+    return 0
+end
+local cpus, memory = string.match(lease, '^(%d+):(%d+)')
+redis.call('HINCRBY', KEYS[1], 'jobs', -1)
+redis.call('HINCRBY', KEYS[1], 'cpus', -tonumber(cpus))
+redis.call('HINCRBY', KEYS[1], 'memory', -tonumber(memory))
+local lane = string.match(lease, '^%d+:%d+:%d+:(.+)$')
+if lane then
+    redis.call('HINCRBY', KEYS[1], 'lane:' .. lane, -1)
+end
+redis.call('HDEL', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+class ResourceLedger:
+    """Cluster-wide job slots, CPUs and memory held in Redis."""
+
+    USAGE_KEY = "webgenie:scheduler:usage"
+    LEASES_KEY = "webgenie:scheduler:leases"
+
+    ADMITTED = 1
+    ALREADY_HELD = 2
+    FULL = 0
+    LANE_FULL = 3
+
+    def __init__(self, client: Optional[redis.Redis] = None):
+        """Initialize resource ledger."""
+        self._client = client
+        self._acquire: Optional[Script] = None
+        self._release: Optional[Script] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        """Redis client, connected on first use."""
+        if self._client is None:
+            self._client = redis.Redis.from_url(settings.REDIS_URL)
+        return self._client
+
+    def acquire(
+        self,
+        job_id: str,
+        request: ResourceRequest,
+        capacity: Dict[str, int],
+        queue: str = DEFAULT_QUEUE,
+        lane_slots: int = 0,
+    ) -> int:
+        """
+        Take a lease for ``job_id`` if it fits.
+
+        Returns ADMITTED, ALREADY_HELD, FULL, or LANE_FULL when ``queue``
+        already holds ``lane_slots`` jobs (0 = no lane limit).
+        """
+        if self._acquire is None:
+            self._acquire = self.client.register_script(_ACQUIRE_SCRIPT)
+        return int(
+            self._acquire(
+                keys=[self.USAGE_KEY, self.LEASES_KEY],
+                args=[
+                    job_id,
+                    request.cpus,
+                    request.memory,
+                    capacity["jobs"],
+                    capacity["cpus"],
+                    capacity["memory"],
+                    int(time.time()),
+                    queue,
+                    lane_slots,
+                ],
+            )
+        )
+
+    def release(self, job_id: str) -> bool:
+        """Return a job's lease; False if it held none."""
+        if self._release is None:
+            self._release = self.client.register_script(_RELEASE_SCRIPT)
+        return bool(
+            self._release(keys=[self.USAGE_KEY, self.LEASES_KEY], args=[job_id])
+        )
+
+    def _hash(self, key: str) -> Dict[bytes, bytes]:
+        """A Redis hash (the synchronous client returns it directly)."""
+        return cast(Dict[bytes, bytes], self.client.hgetall(key))
+
+    def leases(self) -> Dict[str, Lease]:
+        """Current leases by job ID."""
+        leases = {}
+        for job_id, value in self._hash(self.LEASES_KEY).items():
+            # Leases taken before acquisition times were recorded count as old
+            cpus, memory, *rest = value.decode().split(":", 3)
+            leases[job_id.decode()] = Lease(
+                request=ResourceRequest(int(cpus), int(memory)),
+                acquired_at=float(rest[0]) if rest else 0.0,
+                queue=rest[1] if len(rest) > 1 else None,
+            )
+        return leases
+
+    def usage(self) -> Dict[str, int]:
+        """Resources currently leased."""
+        usage = self._hash(self.USAGE_KEY)
+        return {
+            key: int(usage.get(key.encode(), 0)) for key in ("jobs", "cpus", "memory")
+        }
+
+
+class JobScheduler:
+    """Admits pending jobs to Celery as cluster capacity frees up."""
+
+    def __init__(self, ledger: Optional[ResourceLedger] = None):
+        """Initialize job scheduler."""
+        self.ledger = ledger or ResourceLedger()
+        self.repository = job_repository
+
+    def capacity(self) -> Dict[str, int]:
+        """
+        Cluster limits from settings.
+
+        CPUs and memory default to this node's: its CPU count, and its
+        physical memory less ``SCHEDULER_MEMORY_HEADROOM``.
+        """
+        cpus = settings.SCHEDULER_CPU_CAPACITY
+        if cpus is None:
+            cpus = os.cpu_count() or 1
+        memory = settings.SCHEDULER_MEMORY_CAPACITY
+        if memory is not None:
+            memory_bytes = parse_memory_size(memory)
+        else:
+            total = node_memory()
+            if total is None:
+                logger.warning(
+                    "Node memory unknown; set SCHEDULER_MEMORY_CAPACITY. "
+                    "Assuming MAX_CONCURRENT_JOBS x ALGORITHM_MEMORY_LIMIT"
+                )
+                total = settings.MAX_CONCURRENT_JOBS * parse_memory_size(
+                    settings.ALGORITHM_MEMORY_LIMIT
+                )
+            headroom = parse_memory_size(settings.SCHEDULER_MEMORY_HEADROOM)
+            memory_bytes = max(total - headroom, 0)
+        return {
+            "jobs": settings.MAX_CONCURRENT_JOBS,
+            "cpus": cpus,
+            "memory": memory_bytes,
+        }
+
+    def _launch(self, job: Dict[str, Any]) -> bool:
+        """
+        Mark an admitted job submitted and send it to the workers.
+
+        Returns False, sending nothing, if the job is no longer pending
+        (e.g. it was cancelled after the pending jobs were read).
+        """
+        # The row is updated before the task exists, so the worker's RUNNING
+        # event cannot be overwritten by this update
+        task_id = str(uuid.uuid4())
+        submitted = self.repository.update_where(
+            job["id"],
+            status_in=[JobStatusEnum.PENDING.value],
+            status=JobStatusEnum.SUBMITTED.value,
+            celery_task_id=task_id,
+        )
+        if submitted is None:
+            return False
+        celery_app.send_task(
+            "app.workers.tasks.run_inference_job",
+            queue=job.get("queue") or DEFAULT_QUEUE,
+            kwargs={
+                "job_id": job["id"],
+                "dataset_id": job["dataset_id"],
+                "algorithm": job["algorithm"],
+                "dataset_path": str(
+                    settings.DATASETS_DIR / job["dataset_id"] / "data.csv"
+                ),
+                "parameters": job["parameters"],
+            },
+            task_id=task_id,
+        )
+        return True
+
+    def _is_stale(self, job: Optional[Dict[str, Any]], lease: Lease) -> bool:
+        """Whether a lease holder no longer needs its resources."""
+        if job is None:
+            return True
+        if job["status"] == JobStatusEnum.PENDING.value:
+            # Timed from the lease, not the row: a job that waited long in
+            # pending is between acquire and launch right after admission
+            return time.time() - lease.acquired_at > LAUNCH_GRACE_SECONDS
+        return job["status"] not in (
+            JobStatusEnum.SUBMITTED.value,
+            JobStatusEnum.RUNNING.value,
+        )
+
+    def reconcile(self) -> List[str]:
+        """Release leases of jobs that are no longer active (e.g. lost workers)."""
+        released = []
+        for job_id, lease in self.ledger.leases().items():
+            if self._is_stale(self.repository.get(job_id), lease):
+                if self.ledger.release(job_id):
+                    released.append(job_id)
+        if released:
+            logger.warning(f"Released stale scheduler leases: {released}")
+        return released
+
+    def admit_pending(self) -> List[str]:
+        """
+        Admit pending jobs, oldest first, while capacity allows.
+
+        Smaller jobs may start ahead of a queue head that does not fit, but
+        only until the head has waited ``SCHEDULER_BACKFILL_WINDOW`` seconds,
+        after which the queue waits for it so large jobs cannot starve. Jobs
+        whose lane has no free worker are skipped and hold up no other lane.
+        """
+        capacity = self.capacity()
+        admitted = []
+        now = datetime.utcnow()
+        for job in self.repository.pending_jobs(PENDING_SCAN_LIMIT):
+            request = ResourceRequest(
+                cpus=job["cpu_request"] or 1,
+                memory=job["memory_request"] or BASE_MEMORY_BYTES,
+            )
+            queue = job.get("queue") or DEFAULT_QUEUE
+            result = self.ledger.acquire(
+                job["id"],
+                request,
+                capacity,
+                queue=queue,
+                lane_slots=settings.QUEUE_CONCURRENCY.get(queue, 0),
+            )
+            if result == ResourceLedger.LANE_FULL:
+                # Every worker of its lane is busy; other lanes may have room
+                continue
+            if result == ResourceLedger.FULL:
+                waited = (now - job["created_at"]).total_seconds()
+                if waited > settings.SCHEDULER_BACKFILL_WINDOW:
+                    break
+                continue
+            if result == ResourceLedger.ALREADY_HELD:
+                # Another process is launching it
+                continue
+
+            try:
+                launched = self._launch(job)
+            except Exception as e:
+                logger.error(f"Failed to launch job {job['id']}: {str(e)}")
+                self.repository.update_where(
+                    job["id"],
+                    status_in=[JobStatusEnum.SUBMITTED.value],
+                    status=JobStatusEnum.PENDING.value,
+                )
+                self.ledger.release(job["id"])
+                break
+            if not launched:
+                # Cancelled since it was read; its lease must not outlive it
+                self.ledger.release(job["id"])
+                continue
+            admitted.append(job["id"])
+
+        if admitted:
+            logger.info(f"Admitted jobs: {admitted}")
+        return admitted
+
+    def release(self, job_id: str) -> None:
+        """Return a finished job's resources and admit waiting jobs."""
+        try:
+            self.ledger.release(job_id)
+            self.admit_pending()
+        except Exception as e:
+            logger.error(f"Failed to release job {job_id}: {str(e)}")
+
+
+# Global scheduler instance
+job_scheduler = JobScheduler()
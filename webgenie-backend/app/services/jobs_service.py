@@ -4,16 +4,25 @@ Handles job lifecycle, persistence, and monitoring.
 """
 
 import os
-import json
 import uuid
+import asyncio
 import logging
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from pathlib import Path
 
 from app.core.config import settings
-from app.models.job import JobStatusEnum, JobResponse
-from app.workers.tasks import run_inference_job
+from app.models.job import JobStatusEnum, JobResponse, JobSummary
+from app.services.job_events import publish_job_event
+from app.services.job_logs import LOG_MAX_BYTES, read_log_range, read_log_tail
+from app.services.job_repository import job_repository
+from app.services.job_routing import queue_status, select_queue
+from app.services.job_scheduler import (
+    estimate_resources,
+    job_scheduler,
+    read_dataset_shape,
+)
+from app.services.result_cache import promote_attached, result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -26,27 +35,23 @@ class JobService:
         self.jobs_dir = settings.RESULTS_DIR
         self.jobs_dir.mkdir(parents=True, exist_ok=True)
         self.metadata_file = self.jobs_dir / "jobs_metadata.json"
-        self._load_jobs_metadata()
-
-    def _load_jobs_metadata(self) -> None:
-        """Load jobs metadata from file."""
-        if self.metadata_file.exists():
-            try:
-                with open(self.metadata_file, "r") as f:
-                    self.jobs = json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load jobs metadata: {str(e)}")
-                self.jobs = {}
-        else:
-            self.jobs = {}
-
-    def _save_jobs_metadata(self) -> None:
-        """Save jobs metadata to file."""
+        self.repository = job_repository
+        self._imported = False
+
+    def _import_legacy_metadata(self) -> None:
+        """Move jobs from the old jobs_metadata.json into the database once."""
+        if self._imported:
+            return
         try:
-            with open(self.metadata_file, "w") as f:
-                json.dump(self.jobs, f, indent=2, default=str)
+            self.repository.import_json(self.metadata_file)
         except Exception as e:
-            logger.error(f"Failed to save jobs metadata: {str(e)}")
+            logger.error(f"Failed to import jobs metadata: {str(e)}")
+        self._imported = True
+
+    async def _ensure_imported(self) -> None:
+        """Run the legacy import off the event loop, once."""
+        if not self._imported:
+            await asyncio.to_thread(self._import_legacy_metadata)
 
     def _generate_job_id(self) -> str:
         """Generate unique job ID."""
@@ -71,15 +76,15 @@ class JobService:
             job_id = self._generate_job_id()
             job_dir = self._create_job_directory(job_id)
 
-            # Create job metadata
-            job_metadata = {
+            # Create job record
+            job_metadata: Dict[str, Any] = {
                 "id": job_id,
                 "dataset_id": dataset_id,
                 "algorithm": algorithm,
                 "parameters": parameters,
                 "name": name or f"{algorithm} on {dataset_id}",
                 "description": description,
-                "status": JobStatusEnum.SUBMITTED.value,
+                "status": JobStatusEnum.PENDING.value,
                 "progress": 0.0,
                 "started_at": None,
                 "ended_at": None,
@@ -87,30 +92,51 @@ class JobService:
                 "celery_task_id": None,
                 "result_path": str(job_dir),
                 "log_file": str(job_dir / "execution.log"),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
             }
 
-            # Store metadata
-            self.jobs[job_id] = job_metadata
-            self._save_jobs_metadata()
-
-            # Submit async task
+            # Size the job from the dataset shape: resources and lane
             dataset_path = settings.DATASETS_DIR / dataset_id / "data.csv"
-
-            task = run_inference_job.delay(
-                job_id=job_id,
-                dataset_id=dataset_id,
-                algorithm=algorithm,
-                dataset_path=str(dataset_path),
-                parameters=parameters,
+            n_genes, n_cells = await asyncio.to_thread(read_dataset_shape, dataset_path)
+            request = estimate_resources(algorithm, n_genes, n_cells)
+            job_metadata["cpu_request"] = request.cpus
+            job_metadata["memory_request"] = request.memory
+            job_metadata["queue"] = select_queue(algorithm, n_genes, n_cells)
+
+            # Reuse the result of an identical run, or wait for one in flight
+            await self._ensure_imported()
+            cache_key = await asyncio.to_thread(
+                result_cache.job_key, dataset_path, algorithm, parameters
             )
-
-            # Update with task ID
-            self.jobs[job_id]["celery_task_id"] = task.id
-            self.jobs[job_id]["status"] = JobStatusEnum.RUNNING.value
-            self.jobs[job_id]["started_at"] = datetime.utcnow().isoformat()
-            self._save_jobs_metadata()
+            job_metadata["cache_key"] = cache_key
+            cached = None
+            if cache_key is not None:
+                cached = await asyncio.to_thread(
+                    result_cache.link_into, cache_key, job_dir
+                )
+            if cached is not None:
+                now = datetime.utcnow()
+                job_metadata["status"] = JobStatusEnum.COMPLETED.value
+                job_metadata["progress"] = 100.0
+                job_metadata["started_at"] = now
+                job_metadata["ended_at"] = now
+                with open(job_metadata["log_file"], "a") as f:
+                    f.write(f"Result reused from job {cached['job_id']}\n")
+                job = await asyncio.to_thread(self.repository.create, job_metadata)
+            else:
+                # Queue the job, or attach it to an identical one in flight;
+                # the scheduler sends it to Celery once it fits
+                job = await asyncio.to_thread(
+                    self.repository.create_deduplicated, job_metadata
+                )
+                if job["attached_to"] is not None:
+                    with open(job["log_file"], "a") as f:
+                        f.write(f"Waiting for identical job {job['attached_to']}\n")
+                else:
+                    await asyncio.to_thread(job_scheduler.admit_pending)
+                    admitted = await asyncio.to_thread(self.repository.get, job_id)
+                    job = admitted or job
 
             logger.info(
                 f"Job submitted",
@@ -118,11 +144,13 @@ class JobService:
                     "job_id": job_id,
                     "algorithm": algorithm,
                     "dataset_id": dataset_id,
-                    "task_id": task.id,
+                    "status": job["status"],
+                    "queue": job["queue"],
+                    "attached_to": job["attached_to"],
                 },
             )
 
-            return JobResponse(**self.jobs[job_id])
+            return JobResponse(**job)
 
         except Exception as e:
             logger.error(f"Failed to submit job: {str(e)}")
@@ -130,18 +158,13 @@ class JobService:
 
     async def get_job(self, job_id: str) -> Optional[JobResponse]:
         """Get job by ID."""
-        if job_id not in self.jobs:
+        await self._ensure_imported()
+        job_data = await asyncio.to_thread(self.repository.get, job_id)
+        if job_data is None:
             logger.warning(f"Job not found: {job_id}")
             return None
 
-        job_data = self.jobs[job_id]
-
-        # Check if associated Celery task exists and update status
-        if job_data.get("celery_task_id"):
-            task_id = job_data["celery_task_id"]
-            # Could check Celery task state here to update status
-            # For now, returning stored metadata
-
+        # Kept current by worker events (see app.services.job_events)
         return JobResponse(**job_data)
 
     async def list_jobs(
@@ -151,40 +174,41 @@ class JobService:
         status: Optional[JobStatusEnum] = None,
         dataset_id: Optional[str] = None,
         algorithm: Optional[str] = None,
+        cursor: Optional[str] = None,
+        summary: bool = False,
     ) -> Dict[str, Any]:
-        """List jobs with optional filters."""
-        all_jobs = list(self.jobs.values())
-
-        # Apply filters
-        if status:
-            all_jobs = [j for j in all_jobs if j["status"] == status.value]
-        if dataset_id:
-            all_jobs = [j for j in all_jobs if j["dataset_id"] == dataset_id]
-        if algorithm:
-            all_jobs = [j for j in all_jobs if j["algorithm"] == algorithm]
-
-        # Sort by creation date (newest first)
-        all_jobs.sort(key=lambda x: x["created_at"], reverse=True)
-
-        total = len(all_jobs)
-        items = [JobResponse(**j) for j in all_jobs[skip : skip + limit]]
-
-        return {
-            "total": total,
-            "items": items,
-            "page": skip // limit + 1,
-            "per_page": limit,
-        }
+        """List jobs with optional filters and keyset pagination."""
+        await self._ensure_imported()
+        result = await asyncio.to_thread(
+            self.repository.list_jobs,
+            skip=skip,
+            limit=limit,
+            status=status.value if status else None,
+            dataset_id=dataset_id,
+            algorithm=algorithm,
+            cursor=cursor,
+            summary=summary,
+        )
+        model = JobSummary if summary else JobResponse
+        result["items"] = [model(**j) for j in result["items"]]
+        # Cursor pages have no page number; skip is ignored for them
+        result["page"] = None if cursor else skip // limit + 1
+        result["per_page"] = limit
+        return result
+
+    async def get_queue_status(self) -> List[Dict[str, Any]]:
+        """Depth and expected wait of each worker lane."""
+        return await asyncio.to_thread(queue_status)
 
     async def cancel_job(self, job_id: str) -> bool:
         """Cancel a job."""
         try:
-            if job_id not in self.jobs:
+            await self._ensure_imported()
+            job_data = await asyncio.to_thread(self.repository.get, job_id)
+            if job_data is None:
                 logger.warning(f"Job not found: {job_id}")
                 return False
 
-            job_data = self.jobs[job_id]
-
             # Check if job is still running
             if job_data["status"] not in [
                 JobStatusEnum.PENDING.value,
@@ -194,16 +218,29 @@ class JobService:
                 logger.warning(f"Cannot cancel job with status: {job_data['status']}")
                 return False
 
-            # Try to revoke Celery task
+            # Update job status first, so the task stopped below sees it was
+            # cancelled rather than failed; jobs attached to it now run on
+            # their own
+            job_data = await asyncio.to_thread(
+                publish_job_event, job_id, JobStatusEnum.CANCELLED
+            )
+            if job_data is None:
+                logger.warning(f"Job finished before it was cancelled: {job_id}")
+                return False
+            await asyncio.to_thread(promote_attached, job_id)
+
+            # Try to revoke Celery task. SIGUSR1 raises SoftTimeLimitExceeded
+            # in the task, which stops the algorithm's process group and
+            # container; SIGTERM would kill the pool process and orphan them
             if job_data.get("celery_task_id"):
                 from celery import current_app
 
-                current_app.control.revoke(job_data["celery_task_id"], terminate=True)
+                current_app.control.revoke(
+                    job_data["celery_task_id"], terminate=True, signal="SIGUSR1"
+                )
 
-            # Update job status
-            self.jobs[job_id]["status"] = JobStatusEnum.CANCELLED.value
-            self.jobs[job_id]["ended_at"] = datetime.utcnow().isoformat()
-            self._save_jobs_metadata()
+            # Hand its resources to waiting jobs
+            await asyncio.to_thread(job_scheduler.release, job_id)
 
             logger.info(f"Job cancelled: {job_id}")
             return True
@@ -212,26 +249,51 @@ class JobService:
             logger.error(f"Failed to cancel job: {str(e)}")
             raise
 
-    async def get_job_logs(self, job_id: str) -> Optional[str]:
-        """Get job execution logs."""
+    async def get_job_logs(
+        self,
+        job_id: str,
+        offset: Optional[int] = None,
+        tail: Optional[int] = None,
+        max_bytes: int = LOG_MAX_BYTES,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read part of a job's execution log.
+
+        ``offset`` reads forward from a byte offset, ``tail`` returns the
+        last N lines; with neither, the last ``max_bytes`` of the log.
+        """
         try:
-            if job_id not in self.jobs:
-                logger.warning(f"Job not found: {job_id}")
+            log_file = await asyncio.to_thread(self.get_log_file, job_id)
+            if log_file is None:
                 return None
 
-            log_file = Path(self.jobs[job_id]["log_file"])
-
             if not log_file.exists():
                 logger.warning(f"Log file not found: {log_file}")
                 return None
 
-            with open(log_file, "r") as f:
-                return f.read()
+            if offset is not None:
+                return await asyncio.to_thread(
+                    read_log_range, log_file, offset, max_bytes
+                )
+            return await asyncio.to_thread(read_log_tail, log_file, tail, max_bytes)
 
         except Exception as e:
             logger.error(f"Failed to retrieve logs: {str(e)}")
             return None
 
+    def get_log_file(self, job_id: str) -> Optional[Path]:
+        """
+        Path of a job's execution log, or None if the job is unknown.
+
+        Reads the job store; run it off the event loop.
+        """
+        self._import_legacy_metadata()
+        job_data = self.repository.get(job_id)
+        if job_data is None:
+            logger.warning(f"Job not found: {job_id}")
+            return None
+        return Path(job_data["log_file"])
+
     async def update_job_status(
         self,
         job_id: str,
@@ -241,28 +303,15 @@ class JobService:
     ) -> bool:
         """Update job status."""
         try:
-            if job_id not in self.jobs:
-                logger.warning(f"Job not found: {job_id}")
-                return False
-
-            self.jobs[job_id]["status"] = status.value
-            self.jobs[job_id]["updated_at"] = datetime.utcnow().isoformat()
-
-            if progress is not None:
-                self.jobs[job_id]["progress"] = max(0, min(100, progress))
-
-            if error_message:
-                self.jobs[job_id]["error_message"] = error_message
-
-            if status in [
-                JobStatusEnum.COMPLETED,
-                JobStatusEnum.FAILED,
-                JobStatusEnum.CANCELLED,
-            ]:
-                self.jobs[job_id]["ended_at"] = datetime.utcnow().isoformat()
-
-            self._save_jobs_metadata()
-            return True
+            await self._ensure_imported()
+            job = await asyncio.to_thread(
+                publish_job_event,
+                job_id,
+                status,
+                progress=progress,
+                error_message=error_message,
+            )
+            return job is not None
 
         except Exception as e:
             logger.error(f"Failed to update job status: {str(e)}")
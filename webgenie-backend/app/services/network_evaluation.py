@@ -0,0 +1,442 @@
+"""
+Evaluation of result networks against a reference network.
+
+Follows the BEELINE conventions: the candidate edges are all ordered pairs
+of distinct genes in the reference network, edges the algorithm did not
+predict are tied at the bottom of the ranking, and early precision looks
+at the top-k predictions with k the number of reference edges.
+
+Edges are integer-encoded over the reference vocabulary. The network store
+is already sorted by descending score, so the ranking needs no sort; only
+the unpredicted candidate edges would be quadratic in the number of genes
+and they are counted, never built.
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import logging
+
+from app.services.network_store import NetworkStore, load_network
+from app.services.runners.parallel import resolve_workers
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_FILE = "refNetwork.csv"
+EVALUATION_SUFFIX = ".metrics.json"
+
+# Replicates per pool task; fixed so results do not depend on worker count
+BOOTSTRAP_CHUNK = 64
+# Upper bound on resampled counts held at once by one vectorized batch
+BOOTSTRAP_BATCH_CELLS = 1 << 22
+
+
+def find_reference(dataset_path: Union[str, Path]) -> Optional[Path]:
+    """Reference network stored next to a dataset file, if any."""
+    path = Path(dataset_path).parent / REFERENCE_FILE
+    return path if path.is_file() else None
+
+
+def evaluation_path(network_file: Union[str, Path]) -> Path:
+    """Evaluation sidecar belonging to a TSV network file."""
+    return Path(network_file).with_suffix(EVALUATION_SUFFIX)
+
+
+def read_reference(reference_file: Union[str, Path]) -> Tuple[np.ndarray, np.ndarray]:
+    """Regulator and target names of a ``Gene1,Gene2[,Type]`` reference."""
+    reference = pd.read_csv(
+        reference_file,
+        sep=None,
+        engine="python",
+        usecols=[0, 1],
+        dtype=str,
+        keep_default_na=False,
+    )
+    return reference.iloc[:, 0].to_numpy(), reference.iloc[:, 1].to_numpy()
+
+
+def _ranked_labels(
+    network: NetworkStore, vocabulary: pd.Index, reference_keys: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores (descending) and true/false labels of the predicted candidates.
+
+    Edges with genes outside the vocabulary, self-loops and NaN scores are
+    dropped; repeated edges keep their best score.
+    """
+    n_genes = len(vocabulary)
+    gene_ids = vocabulary.get_indexer(network.genes).astype(np.int64)
+    sources = gene_ids[network.source]
+    targets = gene_ids[network.target]
+    scores = np.asarray(network.score)
+
+    valid = (sources >= 0) & (targets >= 0) & (sources != targets) & ~np.isnan(scores)
+    positions = np.flatnonzero(valid)
+    keys = sources[positions] * n_genes + targets[positions]
+
+    # First occurrence in store order is the best-scored one
+    _, first = np.unique(keys, return_index=True)
+    first.sort()
+    keys = keys[first]
+
+    idx = np.searchsorted(reference_keys, keys)
+    idx[idx == len(reference_keys)] = 0
+    labels = reference_keys[idx] == keys if len(reference_keys) else keys < 0
+    return scores[positions[first]], labels
+
+
+def _block_counts(
+    scores: np.ndarray, labels: np.ndarray, positives: int, negatives: int
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Positive and negative candidates in every block of tied scores.
+
+    Blocks are ordered strongest first. Unpredicted candidates form one
+    last block; the number of predicted blocks is returned with the counts.
+    """
+    n_predicted = len(scores)
+    block_end = np.flatnonzero(np.append(scores[1:] != scores[:-1], n_predicted > 0))
+    tp_at = np.cumsum(labels, dtype=np.int64)[block_end]
+    fp_at = block_end + 1 - tp_at
+    n_predicted_blocks = len(block_end)
+
+    tp_at = np.append(tp_at, positives)
+    fp_at = np.append(fp_at, negatives)
+    pos = np.diff(tp_at, prepend=0)
+    neg = np.diff(fp_at, prepend=0)
+    if pos[-1] + neg[-1] == 0:
+        # Every candidate was predicted
+        pos, neg = pos[:-1], neg[:-1]
+    return pos, neg, n_predicted_blocks
+
+
+def ranking_metrics(
+    pos: np.ndarray, neg: np.ndarray, n_predicted_blocks: int
+) -> Dict[str, np.ndarray]:
+    """
+    AUROC, AUPRC and early precision from per-block counts.
+
+    ``pos`` and ``neg`` are (replicates, blocks) arrays, or a single row;
+    every metric comes back as one value per row, NaN where undefined.
+    """
+    pos = np.atleast_2d(pos).astype(np.float64)
+    neg = np.atleast_2d(neg).astype(np.float64)
+    rows = np.arange(pos.shape[0])
+    n_pos = pos.sum(axis=1)
+    n_neg = neg.sum(axis=1)
+    tp = np.cumsum(pos, axis=1)
+    fp = np.cumsum(neg, axis=1)
+    predicted = tp + fp
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Trapezoids between consecutive ROC points, starting at (0, 0)
+        tpr = tp / n_pos[:, None]
+        fpr = fp / n_neg[:, None]
+        previous_tpr = np.pad(tpr[:, :-1], ((0, 0), (1, 0)))
+        auc_roc = np.sum(
+            np.diff(fpr, axis=1, prepend=0) * (tpr + previous_tpr) / 2, axis=1
+        )
+
+        precision_at = np.where(predicted > 0, tp / predicted, 0.0)
+        auc_pr = np.sum(pos * precision_at, axis=1) / n_pos
+
+        # First predicted block reaching k = |reference| edges
+        early_precision = np.zeros(len(rows))
+        if n_predicted_blocks:
+            reached = predicted[:, :n_predicted_blocks] >= n_pos[:, None]
+            block = np.where(
+                reached.any(axis=1), reached.argmax(axis=1), n_predicted_blocks - 1
+            )
+            top = predicted[rows, block]
+            early_precision = np.where(top > 0, tp[rows, block] / top, 0.0)
+        early_precision[n_pos == 0] = np.nan
+
+    return {
+        "auc_roc": auc_roc,
+        "auc_pr": auc_pr,
+        "early_precision": early_precision,
+    }
+
+
+def _scalar(value: float) -> Optional[float]:
+    """Float, or None for NaN."""
+    return None if np.isnan(value) else float(value)
+
+
+_bootstrap_state: Dict[str, Any] = {}
+
+
+def _init_bootstrap_worker(pos: np.ndarray, neg: np.ndarray, n_blocks: int) -> None:
+    """Keep the block counts once per worker process."""
+    _bootstrap_state.update(pos=pos, neg=neg, n_blocks=n_blocks)
+
+
+def _bootstrap_chunk(
+    n_replicates: int, seed: np.random.SeedSequence
+) -> Dict[str, np.ndarray]:
+    """
+    Metrics on ``n_replicates`` bootstrap resamples of the candidate edges.
+
+    Metrics only depend on how many positives and negatives fall in each
+    tie block, so resampling every candidate with replacement is one
+    multinomial draw over the blocks per replicate.
+    """
+    pos, neg = _bootstrap_state["pos"], _bootstrap_state["neg"]
+    n_blocks = len(pos)
+    cells = np.concatenate([pos, neg]).astype(np.float64)
+    total = int(cells.sum())
+    rng = np.random.default_rng(seed)
+
+    batch = max(1, BOOTSTRAP_BATCH_CELLS // len(cells))
+    results = []
+    for start in range(0, n_replicates, batch):
+        draws = rng.multinomial(
+            total, cells / total, size=min(batch, n_replicates - start)
+        )
+        results.append(
+            ranking_metrics(
+                draws[:, :n_blocks], draws[:, n_blocks:], _bootstrap_state["n_blocks"]
+            )
+        )
+    return {name: np.concatenate([r[name] for r in results]) for name in results[0]}
+
+
+def bootstrap_intervals(
+    pos: np.ndarray,
+    neg: np.ndarray,
+    n_predicted_blocks: int,
+    n_bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: int = 0,
+    n_workers: Optional[int] = None,
+) -> Dict[str, Optional[List[float]]]:
+    """
+    Percentile bootstrap intervals of the ranking metrics.
+
+    Replicates are split into fixed-size chunks, each with its own child
+    of ``SeedSequence(seed)``, so intervals depend only on the seed and not
+    on how many worker processes run the chunks.
+    """
+    sizes = [
+        min(BOOTSTRAP_CHUNK, n_bootstrap - start)
+        for start in range(0, n_bootstrap, BOOTSTRAP_CHUNK)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    n_workers = min(resolve_workers(n_workers), len(sizes))
+
+    if n_workers <= 1:
+        _init_bootstrap_worker(pos, neg, n_predicted_blocks)
+        chunks = [_bootstrap_chunk(n, s) for n, s in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_bootstrap_worker,
+            initargs=(pos, neg, n_predicted_blocks),
+        ) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, sizes, seeds))
+
+    tail = (1.0 - confidence) / 2 * 100
+    intervals = {}
+    for name in chunks[0]:
+        values = np.concatenate([c[name] for c in chunks])
+        values = values[~np.isnan(values)]
+        intervals[name] = (
+            [float(v) for v in np.percentile(values, [tail, 100 - tail])]
+            if len(values)
+            else None
+        )
+    return intervals
+
+
+def evaluate_network(
+    network: NetworkStore,
+    reference_sources: np.ndarray,
+    reference_targets: np.ndarray,
+    n_bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    AUROC, AUPRC, early precision and top-k confusion metrics.
+
+    Predictions with equal scores form one threshold, so ties are scored
+    the same way as scikit-learn's ``roc_auc_score`` and
+    ``average_precision_score`` over the full candidate set. With
+    ``n_bootstrap`` replicates, ``<metric>_ci`` percentile intervals are
+    added for AUROC, AUPRC and early precision.
+    """
+    codes, vocabulary = pd.factorize(
+        pd.concat(
+            [pd.Series(reference_sources), pd.Series(reference_targets)],
+            ignore_index=True,
+        )
+    )
+    vocabulary = pd.Index(vocabulary)
+    n_genes = len(vocabulary)
+    n_ref = len(reference_sources)
+    ref_src, ref_tgt = codes[:n_ref].astype(np.int64), codes[n_ref:].astype(np.int64)
+    reference_keys = np.unique((ref_src * n_genes + ref_tgt)[ref_src != ref_tgt])
+
+    positives = len(reference_keys)
+    candidates = n_genes * (n_genes - 1)
+    negatives = candidates - positives
+
+    scores, labels = _ranked_labels(network, vocabulary, reference_keys)
+    n_predicted = len(scores)
+
+    pos, neg, n_predicted_blocks = _block_counts(scores, labels, positives, negatives)
+    ranking = ranking_metrics(pos, neg, n_predicted_blocks)
+
+    metrics: Dict[str, Any] = {
+        "reference_edges": int(positives),
+        "candidate_edges": int(candidates),
+        "predicted_edges": int(n_predicted),
+        **{name: _scalar(values[0]) for name, values in ranking.items()},
+    }
+
+    # Top-k predictions, with every edge tied with the k-th one included
+    k = min(positives, n_predicted)
+    top = int(np.searchsorted(-scores, -scores[k - 1], side="right")) if k else 0
+    tp_top = int(labels[:top].sum())
+    fp_top = top - tp_top
+    fn_top = positives - tp_top
+    tn_top = negatives - fp_top
+
+    precision = tp_top / top if top else 0.0
+    recall = tp_top / positives if positives else 0.0
+    denominator = np.sqrt(
+        float(tp_top + fp_top)
+        * float(tp_top + fn_top)
+        * float(tn_top + fp_top)
+        * float(tn_top + fn_top)
+    )
+    early_precision = metrics["early_precision"]
+    metrics.update(
+        {
+            "early_precision_ratio": (
+                early_precision * candidates / positives
+                if early_precision is not None
+                else None
+            ),
+            "precision": precision,
+            "recall": recall,
+            "f1_score": (
+                2 * precision * recall / (precision + recall)
+                if precision + recall
+                else 0.0
+            ),
+            "mcc": (
+                (float(tp_top) * tn_top - float(fp_top) * fn_top) / denominator
+                if denominator
+                else 0.0
+            ),
+        }
+    )
+
+    if n_bootstrap:
+        intervals = bootstrap_intervals(
+            pos,
+            neg,
+            n_predicted_blocks,
+            n_bootstrap=n_bootstrap,
+            confidence=confidence,
+            seed=seed,
+        )
+        metrics.update({f"{name}_ci": ci for name, ci in intervals.items()})
+        metrics["bootstrap_replicates"] = int(n_bootstrap)
+        metrics["bootstrap_seed"] = int(seed)
+        metrics["confidence_level"] = confidence
+    return metrics
+
+
+def _signature(path: Path) -> Dict[str, int]:
+    """Size and mtime of a file."""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_evaluation(
+    network_file: Union[str, Path],
+    reference_file: Union[str, Path],
+    network: Optional[NetworkStore] = None,
+    **options: Any,
+) -> Dict[str, Any]:
+    """
+    Evaluate a network against a reference and persist the metrics.
+
+    ``options`` (bootstrap settings) are passed to ``evaluate_network``.
+    """
+    network_file, reference_file = Path(network_file), Path(reference_file)
+    network = network or load_network(network_file)
+    metrics = evaluate_network(network, *read_reference(reference_file), **options)
+
+    payload = {
+        "network": _signature(network_file),
+        "reference": {"path": str(reference_file), **_signature(reference_file)},
+        "created_at": datetime.utcnow().isoformat(),
+        "metrics": metrics,
+    }
+    path = evaluation_path(network_file)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}-", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    logger.info(
+        f"Network evaluated against {reference_file}: "
+        f"AUPRC={metrics['auc_pr']}, AUROC={metrics['auc_roc']}"
+    )
+    return metrics
+
+
+def read_evaluation(
+    network_file: Union[str, Path],
+    reference_file: Optional[Union[str, Path]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Stored evaluation metrics, or None if missing or stale.
+
+    With ``reference_file``, metrics computed against another reference
+    count as missing.
+    """
+    network_file = Path(network_file)
+    try:
+        with open(evaluation_path(network_file), "r") as f:
+            payload = json.load(f)
+        reference = payload["reference"]
+        if reference_file is not None and reference["path"] != str(reference_file):
+            return None
+        if payload["network"] != _signature(network_file) or {
+            "size": reference["size"],
+            "mtime_ns": reference["mtime_ns"],
+        } != _signature(Path(reference["path"])):
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return payload["metrics"]
+
+
+def matches_options(
+    metrics: Dict[str, Any],
+    n_bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> bool:
+    """Whether stored metrics were computed with these bootstrap settings."""
+    if not n_bootstrap:
+        return not metrics.get("bootstrap_replicates")
+    return (
+        metrics.get("bootstrap_replicates") == n_bootstrap
+        and metrics.get("confidence_level") == confidence
+        and metrics.get("bootstrap_seed") == seed
+    )
@@ -0,0 +1,193 @@
+"""
+Streaming serializers for result networks.
+
+Writers read the binary network store in score-ordered batches and yield
+encoded byte chunks, so memory stays bounded by one batch no matter how
+large the network is. Text formats escape each gene name once and index
+the escaped table with the store's integer ids. Non-finite scores have no
+weight: null in JSON, an empty CSV field, and no weight in GraphML and GML.
+"""
+
+import os
+import csv
+import gzip
+import io
+import json
+import tempfile
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+import logging
+
+from app.services.network_store import NetworkStore, score_values
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_EDGES = 65536
+
+
+def _dumps(obj) -> bytes:
+    """Serialize to compact JSON bytes, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _edge_records(sources, targets, scores) -> List[dict]:
+    """Edge dicts for one batch."""
+    return [
+        {"source": s, "target": t, "weight": w}
+        for s, t, w in zip(sources.tolist(), targets.tolist(), score_values(scores))
+    ]
+
+
+def iter_json(
+    network: NetworkStore, chunk_size: int = EXPORT_CHUNK_EDGES
+) -> Iterator[bytes]:
+    """Yield ``{"edges": [...]}`` as JSON chunks of one batch each."""
+    yield b'{"edges":['
+    first = True
+    for sources, targets, scores in network.iter_edges(chunk_size):
+        if len(scores) == 0:
+            continue
+        # Drop the list brackets; batches are joined into one array
+        body = _dumps(_edge_records(sources, targets, scores))[1:-1]
+        yield body if first else b"," + body
+        first = False
+    yield b"]}"
+
+
+def _id_batches(
+    network: NetworkStore, chunk_size: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray, List[str]]]:
+    """Yield (source ids, target ids, formatted scores) batches ("" if not finite)."""
+    for start in range(0, len(network), chunk_size):
+        stop = min(start + chunk_size, len(network))
+        scores = np.asarray(network.score[start:stop])
+        # float32 -> str gives the shortest round-tripping repr
+        formatted = np.where(np.isfinite(scores), scores.astype(str), "")
+        yield (
+            np.asarray(network.source[start:stop]),
+            np.asarray(network.target[start:stop]),
+            formatted.tolist(),
+        )
+
+
+def _csv_field(value: str) -> str:
+    """Quote a CSV field if needed."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow([value])
+    return buffer.getvalue()
+
+
+def iter_csv(
+    network: NetworkStore, chunk_size: int = EXPORT_CHUNK_EDGES
+) -> Iterator[bytes]:
+    """Yield a ``source,target,weight`` CSV in batches."""
+    labels = np.array([_csv_field(g) for g in network.genes], dtype=object)
+    yield b"source,target,weight\n"
+    for sources, targets, scores in _id_batches(network, chunk_size):
+        yield "".join(
+            f"{s},{t},{w}\n"
+            for s, t, w in zip(
+                labels[sources].tolist(), labels[targets].tolist(), scores
+            )
+        ).encode()
+
+
+def iter_graphml(
+    network: NetworkStore, chunk_size: int = EXPORT_CHUNK_EDGES
+) -> Iterator[bytes]:
+    """Yield a directed GraphML document with a ``weight`` edge attribute."""
+    ids = np.array([quoteattr(g) for g in network.genes], dtype=object)
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        '  <key id="d0" for="edge" attr.name="weight" attr.type="double"/>\n'
+        '  <graph edgedefault="directed">\n'
+    ).encode()
+    for start in range(0, len(ids), chunk_size):
+        yield "".join(
+            f"    <node id={i}/>\n" for i in ids[start : start + chunk_size]
+        ).encode()
+    for sources, targets, scores in _id_batches(network, chunk_size):
+        yield "".join(
+            f'    <edge source={s} target={t}><data key="d0">{w}</data></edge>\n'
+            if w
+            else f"    <edge source={s} target={t}/>\n"
+            for s, t, w in zip(ids[sources].tolist(), ids[targets].tolist(), scores)
+        ).encode()
+    yield b"  </graph>\n</graphml>\n"
+
+
+def iter_gml(
+    network: NetworkStore, chunk_size: int = EXPORT_CHUNK_EDGES
+) -> Iterator[bytes]:
+    """Yield a directed GML graph; node ids are vocabulary ids."""
+    labels = [escape(g, {'"': "&quot;"}) for g in network.genes]
+    yield b"graph [\n  directed 1\n"
+    for start in range(0, len(labels), chunk_size):
+        yield "".join(
+            f'  node [\n    id {start + i}\n    label "{label}"\n  ]\n'
+            for i, label in enumerate(labels[start : start + chunk_size])
+        ).encode()
+    for sources, targets, scores in _id_batches(network, chunk_size):
+        yield "".join(
+            f"  edge [\n    source {s}\n    target {t}\n"
+            + (f"    weight {w}\n" if w else "")
+            + "  ]\n"
+            for s, t, w in zip(sources.tolist(), targets.tolist(), scores)
+        ).encode()
+    yield b"]\n"
+
+
+# Export format -> (file name, chunk writer)
+EXPORT_FORMATS: Dict[str, Tuple[str, Callable[..., Iterator[bytes]]]] = {
+    "json": ("network.json", iter_json),
+    "csv": ("network.csv", iter_csv),
+    "graphml": ("network.graphml", iter_graphml),
+    "gml": ("network.gml", iter_gml),
+}
+
+
+def export_network(
+    network: NetworkStore,
+    export_dir: Union[str, Path],
+    export_format: str,
+    compress: bool = False,
+    chunk_size: int = EXPORT_CHUNK_EDGES,
+) -> Path:
+    """
+    Write a network export batch by batch, optionally gzip-compressed.
+
+    The file is written under a temporary name and renamed into place.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    file_name, writer = EXPORT_FORMATS[export_format]
+
+    export_dir = Path(export_dir)
+    export_file = export_dir / (f"{file_name}.gz" if compress else file_name)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{export_file.name}-", dir=export_dir)
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            out = (
+                gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+                if compress
+                else raw
+            )
+            with out:
+                for chunk in writer(network, chunk_size):
+                    out.write(chunk)
+        os.replace(tmp_path, export_file)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    return export_file
@@ -0,0 +1,104 @@
+"""
+Paged, filtered edge queries over a network store.
+
+The store is sorted by descending score, so a score threshold or a top-k
+limit is a prefix of the edge positions, and gene filters are slices of
+the store's per-gene index. A page only reads the rows it returns.
+"""
+
+from typing import Any, Dict, Optional
+import numpy as np
+import logging
+
+from app.services.network_store import NetworkStore, score_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def _matching_positions(
+    network: NetworkStore,
+    source: Optional[str],
+    target: Optional[str],
+    gene: Optional[str],
+) -> Optional[np.ndarray]:
+    """
+    Sorted store positions of edges passing the gene filters.
+
+    Returns None when no gene filter is set (every edge matches).
+    """
+    if source is None and target is None and gene is None:
+        return None
+
+    selections = []
+    for role, name in (("source", source), ("target", target), (None, gene)):
+        if name is None:
+            continue
+        gene_id = network.gene_id(name)
+        if gene_id is None:
+            return np.empty(0, dtype=np.int64)
+        if role is None:
+            # Either endpoint; self-loops appear in both slices
+            selections.append(
+                np.union1d(
+                    network.gene_edges(gene_id, "source"),
+                    network.gene_edges(gene_id, "target"),
+                )
+            )
+        else:
+            selections.append(np.asarray(network.gene_edges(gene_id, role)))
+
+    positions = selections[0]
+    for other in selections[1:]:
+        positions = np.intersect1d(positions, other, assume_unique=True)
+    return positions
+
+
+def query_edges(
+    network: NetworkStore,
+    cursor: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    min_score: Optional[float] = None,
+    top_k: Optional[int] = None,
+    source: Optional[str] = None,
+    target: Optional[str] = None,
+    gene: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One page of edges in descending score order.
+
+    ``cursor`` is the store position (global rank) to resume from, as
+    returned in ``next_cursor``. ``top_k`` keeps the strongest k edges
+    that pass the other filters.
+    """
+    end = len(network)
+    if min_score is not None:
+        end = network.count_at_least(min_score)
+
+    positions = _matching_positions(network, source, target, gene)
+    if positions is None:
+        total = end if top_k is None else min(end, top_k)
+        start = min(cursor, total)
+        page = np.arange(start, min(start + limit, total))
+        next_cursor = int(page[-1]) + 1 if start + limit < total else None
+    else:
+        positions = positions[: np.searchsorted(positions, end)]
+        if top_k is not None:
+            positions = positions[:top_k]
+        total = len(positions)
+        start = int(np.searchsorted(positions, cursor))
+        page = positions[start : start + limit]
+        next_cursor = int(positions[start + limit]) if start + limit < total else None
+
+    sources = network.genes[network.source[page]]
+    targets = network.genes[network.target[page]]
+    scores = np.asarray(network.score[page])
+    edges = [
+        {"source": s, "target": t, "score": w, "rank": r}
+        for s, t, w, r in zip(
+            sources.tolist(), targets.tolist(), score_values(scores), page.tolist()
+        )
+    ]
+
+    return {"total": int(total), "next_cursor": next_cursor, "edges": edges}
@@ -0,0 +1,268 @@
+"""
+Edge-set sketches for comparing many networks at once.
+
+Every edge is hashed from its gene names to a 64-bit value, so hashes agree
+across networks with different vocabularies. A network's sketch keeps its
+distinct edge hashes, sorted:
+
+    - all of them when the network has at most SKETCH_EXACT_MAX_EDGES
+      distinct edges (an exact sketch), or
+    - the SKETCH_SIZE smallest ones (a bottom-k MinHash sketch).
+
+Sketches are saved as ``<algorithm>_network.sketch.npz`` at job
+completion. Pairs of exact sketches are intersected exactly with packed
+bitsets over their shared edge universe; any other pair gets a bottom-k
+Jaccard estimate.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from pathlib import Path
+import numpy as np
+import logging
+
+from app.core.config import settings
+from app.services.network_store import NetworkStore, find_network_file, load_network
+
+logger = logging.getLogger(__name__)
+
+SKETCH_SUFFIX = ".sketch.npz"
+
+# Bits set in every byte value, for popcounts of packed bitsets
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def sketch_path(network_file: Union[str, Path]) -> Path:
+    """Sketch file belonging to a TSV network file."""
+    return Path(network_file).with_suffix(SKETCH_SUFFIX)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer over a uint64 array."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * _MIX_1
+    x = x ^ (x >> np.uint64(27))
+    x = x * _MIX_2
+    return x ^ (x >> np.uint64(31))
+
+
+def gene_hashes(genes: Union[Sequence[str], np.ndarray]) -> np.ndarray:
+    """Stable 64-bit hash of every gene name."""
+    return np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(str(g).encode(), digest_size=8).digest(), "little"
+            )
+            for g in genes
+        ],
+        dtype=np.uint64,
+    )
+
+
+def edge_hashes(network: NetworkStore) -> np.ndarray:
+    """Sorted distinct 64-bit hashes of a network's directed edges."""
+    genes = gene_hashes(network.genes)
+    with np.errstate(over="ignore"):
+        hashes = _mix64(genes[network.source] ^ _mix64(genes[network.target] + _GOLDEN))
+    return np.unique(hashes)
+
+
+class NetworkSketch:
+    """Sorted edge hashes of one network."""
+
+    def __init__(self, hashes: np.ndarray, n_edges: int, exact: bool):
+        """Initialize sketch."""
+        self.hashes = hashes
+        self.n_edges = int(n_edges)
+        self.exact = bool(exact)
+
+    @classmethod
+    def from_network(
+        cls,
+        network: NetworkStore,
+        size: Optional[int] = None,
+        exact_max_edges: Optional[int] = None,
+    ) -> "NetworkSketch":
+        """Sketch a network; small networks keep every edge hash."""
+        size = size or settings.SKETCH_SIZE
+        if exact_max_edges is None:
+            exact_max_edges = settings.SKETCH_EXACT_MAX_EDGES
+
+        hashes = edge_hashes(network)
+        exact = len(hashes) <= max(exact_max_edges, size)
+        return cls(hashes if exact else hashes[:size], len(hashes), exact)
+
+    def save(self, path: Union[str, Path], signature: Dict[str, int]) -> None:
+        """Write the sketch atomically."""
+        path = Path(path)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}-", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    hashes=self.hashes,
+                    n_edges=self.n_edges,
+                    exact=self.exact,
+                    source_size=signature["source_size"],
+                    source_mtime_ns=signature["source_mtime_ns"],
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+
+def write_sketch(
+    network_file: Union[str, Path],
+    network: Optional[NetworkStore] = None,
+) -> NetworkSketch:
+    """Compute and save the sketch of a network."""
+    network_file = Path(network_file)
+    network = network or load_network(network_file)
+    sketch = NetworkSketch.from_network(network)
+
+    stat = network_file.stat()
+    sketch.save(
+        sketch_path(network_file),
+        {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns},
+    )
+    logger.info(
+        f"Network sketch written: {sketch_path(network_file)} "
+        f"({len(sketch.hashes)} of {sketch.n_edges} edges)"
+    )
+    return sketch
+
+
+def load_sketch(network_file: Union[str, Path]) -> NetworkSketch:
+    """Read a network's sketch, recomputing it if missing or stale."""
+    network_file = Path(network_file)
+    try:
+        stat = network_file.stat()
+        with np.load(sketch_path(network_file)) as data:
+            if (
+                int(data["source_size"]) == stat.st_size
+                and int(data["source_mtime_ns"]) == stat.st_mtime_ns
+            ):
+                return NetworkSketch(
+                    data["hashes"], int(data["n_edges"]), bool(data["exact"])
+                )
+    except (OSError, KeyError, ValueError):
+        pass
+    return write_sketch(network_file)
+
+
+def minhash_jaccard(a: NetworkSketch, b: NetworkSketch) -> float:
+    """Bottom-k estimate of the Jaccard index of two edge sets."""
+    k = min(len(s.hashes) for s in (a, b) if not s.exact)
+    union = np.union1d(a.hashes[:k], b.hashes[:k])[:k]
+    if len(union) == 0:
+        return 0.0
+    in_both = np.isin(union, a.hashes[:k], assume_unique=True) & np.isin(
+        union, b.hashes[:k], assume_unique=True
+    )
+    return float(in_both.sum()) / len(union)
+
+
+def exact_intersections(sketches: List[NetworkSketch]) -> np.ndarray:
+    """
+    Pairwise intersection sizes of exact sketches.
+
+    Each edge set becomes a packed bitset over the union of all edges;
+    an intersection is the popcount of two ANDed bitsets.
+    """
+    n = len(sketches)
+    counts = np.zeros((n, n), dtype=np.int64)
+    if n == 0:
+        return counts
+
+    universe = np.unique(np.concatenate([s.hashes for s in sketches]))
+    bitsets = np.zeros((n, (len(universe) + 7) // 8), dtype=np.uint8)
+    for i, sketch in enumerate(sketches):
+        member = np.zeros(len(universe), dtype=bool)
+        member[np.searchsorted(universe, sketch.hashes)] = True
+        bitsets[i] = np.packbits(member)
+
+    for i in range(n):
+        for j in range(i, n):
+            counts[i, j] = counts[j, i] = int(
+                _POPCOUNT[bitsets[i] & bitsets[j]].sum(dtype=np.int64)
+            )
+    return counts
+
+
+def similarity_matrix(
+    sketches: List[NetworkSketch],
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, list]:
+    """
+    All-pairs Jaccard index and edge overlap.
+
+    Pairs where both sketches are exact are counted exactly; others use
+    the MinHash estimate, with overlap = J * (|A| + |B|) / (1 + J).
+    ``progress(done, total)`` is called as pairs complete.
+    """
+    n = len(sketches)
+    jaccard = np.eye(n)
+    overlap = np.zeros((n, n), dtype=np.int64)
+    exact = np.ones((n, n), dtype=bool)
+    total_pairs = n * (n - 1) // 2
+    done = 0
+
+    exact_ids = [i for i, s in enumerate(sketches) if s.exact]
+    exact_counts = exact_intersections([sketches[i] for i in exact_ids])
+    position = {i: p for p, i in enumerate(exact_ids)}
+
+    for i in range(n):
+        overlap[i, i] = sketches[i].n_edges
+        for j in range(i + 1, n):
+            a, b = sketches[i], sketches[j]
+            if a.exact and b.exact:
+                shared = int(exact_counts[position[i], position[j]])
+                union = a.n_edges + b.n_edges - shared
+                similarity = shared / union if union else 0.0
+            else:
+                similarity = minhash_jaccard(a, b)
+                shared = int(
+                    round(similarity * (a.n_edges + b.n_edges) / (1 + similarity))
+                )
+                exact[i, j] = exact[j, i] = False
+
+            jaccard[i, j] = jaccard[j, i] = similarity
+            overlap[i, j] = overlap[j, i] = shared
+            done += 1
+        if progress is not None:
+            progress(done, total_pairs)
+
+    return {
+        "jaccard": jaccard.tolist(),
+        "overlap_edges": overlap.tolist(),
+        "exact": exact.tolist(),
+        "total_edges": [s.n_edges for s in sketches],
+    }
+
+
+def compare_job_networks(
+    job_ids: Sequence[str],
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """All-pairs similarity of the result networks of several jobs."""
+    found, sketches, missing = [], [], []
+    for job_id in dict.fromkeys(job_ids):
+        network_file = find_network_file(settings.RESULTS_DIR / job_id)
+        if network_file is None:
+            missing.append(job_id)
+            continue
+        found.append(job_id)
+        sketches.append(load_sketch(network_file))
+
+    return {
+        "job_ids": found,
+        "missing": missing,
+        **similarity_matrix(sketches, progress),
+    }
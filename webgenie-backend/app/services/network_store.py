@@ -0,0 +1,350 @@
+"""
+Binary storage for result networks.
+
+Next to every ``<algorithm>_network.tsv`` a ``<algorithm>_network.store``
+directory holds the same edges in a memory-mappable form:
+
+    genes.txt     interned gene vocabulary, one name per line
+    source.npy    int32 regulator ids
+    target.npy    int32 target ids
+    score.npy     float32 scores, sorted in descending order
+    meta.json     counts and the size/mtime of the TSV it was built from
+
+plus a per-gene index (CSR layout) of the edge positions of every
+regulator and every target:
+
+    source_offsets.npy / source_edges.npy
+    target_offsets.npy / target_edges.npy
+
+Positions within a gene are ascending, i.e. in descending score order, so
+a gene's strongest edges are a prefix of its slice.
+
+Readers open the arrays with ``mmap_mode="r"``, so loading a network costs
+a few page faults instead of a full text parse.
+"""
+
+import errno
+import os
+import json
+import shutil
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+STORE_SUFFIX = ".store"
+STORE_VERSION = 2
+NETWORK_PATTERN = "*_network.tsv"
+# Renames tried before giving up on a store path that stays occupied
+STORE_REPLACE_ATTEMPTS = 5
+
+
+def find_network_file(job_dir: Union[str, Path]) -> Optional[Path]:
+    """Find the TSV network file of a job, if any."""
+    job_dir = Path(job_dir)
+    if not job_dir.is_dir():
+        return None
+    for f in sorted(job_dir.glob(NETWORK_PATTERN)):
+        if f.is_file():
+            return f
+    return None
+
+
+def store_path(network_file: Union[str, Path]) -> Path:
+    """Binary store directory belonging to a TSV network file."""
+    return Path(network_file).with_suffix(STORE_SUFFIX)
+
+
+def _source_signature(network_file: Path) -> Dict[str, int]:
+    """Size and mtime identifying the TSV a store was built from."""
+    stat = network_file.stat()
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+def score_values(scores: np.ndarray) -> List[Optional[float]]:
+    """Scores as Python floats, with None for NaN and infinite scores."""
+    values = scores.tolist()
+    for i in np.flatnonzero(~np.isfinite(scores)).tolist():
+        values[i] = None
+    return values
+
+
+class NetworkStore:
+    """Read-only, memory-mapped result network."""
+
+    GENES_FILE = "genes.txt"
+    SOURCE_FILE = "source.npy"
+    TARGET_FILE = "target.npy"
+    SCORE_FILE = "score.npy"
+    META_FILE = "meta.json"
+    INDEX_ROLES = ("source", "target")
+
+    def __init__(self, path: Union[str, Path]):
+        """Open a store directory."""
+        self.path = Path(path)
+        with open(self.path / self.META_FILE, "r") as f:
+            self.meta = json.load(f)
+        with open(self.path / self.GENES_FILE, "r") as f:
+            self.genes = np.array(f.read().splitlines(), dtype=object)
+
+        self.source = np.load(self.path / self.SOURCE_FILE, mmap_mode="r")
+        self.target = np.load(self.path / self.TARGET_FILE, mmap_mode="r")
+        self.score = np.load(self.path / self.SCORE_FILE, mmap_mode="r")
+
+        if not (len(self.source) == len(self.target) == len(self.score)):
+            raise ValueError(f"Inconsistent network store: {self.path}")
+
+        self._gene_ids: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    @property
+    def num_genes(self) -> int:
+        """Size of the gene vocabulary (genes appearing in any edge)."""
+        return len(self.genes)
+
+    def degrees(self) -> np.ndarray:
+        """Total (in + out) degree of every gene in the vocabulary."""
+        n = self.num_genes
+        return np.bincount(self.source, minlength=n) + np.bincount(
+            self.target, minlength=n
+        )
+
+    def gene_id(self, name: str) -> Optional[int]:
+        """Vocabulary id of a gene name, or None if not in the network."""
+        if self._gene_ids is None:
+            self._gene_ids = {g: i for i, g in enumerate(self.genes)}
+        return self._gene_ids.get(name)
+
+    def gene_edges(self, gene_id: int, role: str = "source") -> np.ndarray:
+        """Positions of the edges where a gene is the ``role`` endpoint."""
+        if role not in self.INDEX_ROLES:
+            raise ValueError(f"Unknown edge role: {role}")
+        offsets = np.load(self.path / f"{role}_offsets.npy", mmap_mode="r")
+        edges = np.load(self.path / f"{role}_edges.npy", mmap_mode="r")
+        return edges[offsets[gene_id] : offsets[gene_id + 1]]
+
+    def count_at_least(self, min_score: float) -> int:
+        """Number of leading edges with score >= ``min_score``."""
+        # Binary search over the mmap; NaN scores sort last and never match
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.score[mid] >= min_score:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def iter_edges(
+        self, chunk_size: int = 65536
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (source names, target names, scores) chunks in score order."""
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            yield (
+                self.genes[self.source[start:stop]],
+                self.genes[self.target[start:stop]],
+                np.asarray(self.score[start:stop]),
+            )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Edge table with categorical TF/Target columns."""
+        from app.services.runners.edges import make_edge_table
+
+        return make_edge_table(
+            np.asarray(self.source),
+            np.asarray(self.target),
+            np.asarray(self.score),
+            self.genes,
+        )
+
+    def is_current(self, network_file: Union[str, Path]) -> bool:
+        """Whether the store still matches its TSV."""
+        try:
+            signature = _source_signature(Path(network_file))
+        except OSError:
+            return True
+        return all(self.meta.get(k) == v for k, v in signature.items())
+
+
+def read_network_tsv(network_file: Union[str, Path]) -> pd.DataFrame:
+    """Parse a headerless TF/Target/Score TSV."""
+    network = pd.read_csv(
+        network_file,
+        sep="\t",
+        header=None,
+        dtype={0: str, 1: str},
+        keep_default_na=False,
+    )
+    if network.shape[1] < 2:
+        raise ValueError(f"Network file needs at least 2 columns: {network_file}")
+    if network.shape[1] < 3:
+        network[2] = 1.0
+    return network
+
+
+def _write_gene_index(ids: np.ndarray, n_genes: int, path: Path, role: str) -> None:
+    """Write the CSR index of edge positions grouped by gene."""
+    edges = np.argsort(ids, kind="stable").astype(np.int64)
+    offsets = np.zeros(n_genes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ids, minlength=n_genes), out=offsets[1:])
+    np.save(path / f"{role}_offsets.npy", offsets)
+    np.save(path / f"{role}_edges.npy", edges)
+
+
+def _move_aside(path: Path) -> Optional[Path]:
+    """Rename ``path`` into a scratch directory; None if it is already gone."""
+    aside = Path(tempfile.mkdtemp(prefix=f".{path.name}-old-", dir=path.parent))
+    try:
+        os.rename(path, aside)
+    except FileNotFoundError:
+        os.rmdir(aside)
+        return None
+    return aside
+
+
+def _move_into_place(tmp_dir: Path, path: Path) -> None:
+    """
+    Rename a finished store directory to ``path``, replacing an old store.
+
+    The old store is renamed aside before it is removed, so ``path`` is
+    missing only between two renames (open stores keep their mapped files).
+    If a concurrent build puts its store in place first, that one is kept;
+    a directory there without a store's meta file is moved aside as well.
+    Raises OSError if ``path`` stays occupied after ``STORE_REPLACE_ATTEMPTS``.
+    """
+    moved_aside = []
+    try:
+        for _ in range(STORE_REPLACE_ATTEMPTS):
+            if path.exists():
+                aside = _move_aside(path)
+                if aside is not None:
+                    moved_aside.append(aside)
+            try:
+                os.rename(tmp_dir, path)
+                return
+            except OSError as e:
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                    raise
+                if (path / NetworkStore.META_FILE).exists():
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    return
+            # Occupied by a directory that is not a complete store, or by a
+            # store that was just moved aside in turn; try again
+        raise OSError(errno.EEXIST, "Network store path stays occupied", str(path))
+    finally:
+        for aside in moved_aside:
+            shutil.rmtree(aside, ignore_errors=True)
+
+
+def write_network_store(
+    sources: np.ndarray,
+    targets: np.ndarray,
+    scores: np.ndarray,
+    genes: List[str],
+    path: Union[str, Path],
+    meta: Optional[Dict] = None,
+) -> Path:
+    """
+    Write edges given as gene ids into a store directory.
+
+    Edges are sorted by descending score (stable). The store is built in a
+    scratch directory and renamed into place.
+    """
+    path = Path(path)
+    scores = np.asarray(scores, dtype=np.float32)
+    order = np.argsort(-scores, kind="stable")
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+    try:
+        np.save(
+            tmp_dir / NetworkStore.SOURCE_FILE,
+            np.asarray(sources)[order].astype(np.int32),
+        )
+        np.save(
+            tmp_dir / NetworkStore.TARGET_FILE,
+            np.asarray(targets)[order].astype(np.int32),
+        )
+        np.save(tmp_dir / NetworkStore.SCORE_FILE, scores[order])
+        for role, ids in (("source", sources), ("target", targets)):
+            _write_gene_index(
+                np.asarray(ids)[order].astype(np.int32), len(genes), tmp_dir, role
+            )
+        with open(tmp_dir / NetworkStore.GENES_FILE, "w") as f:
+            f.write("".join(f"{g}\n" for g in genes))
+
+        with open(tmp_dir / NetworkStore.META_FILE, "w") as f:
+            json.dump(
+                {
+                    "version": STORE_VERSION,
+                    "num_edges": int(len(scores)),
+                    "num_genes": len(genes),
+                    "created_at": datetime.utcnow().isoformat(),
+                    **(meta or {}),
+                },
+                f,
+            )
+
+        _move_into_place(tmp_dir, path)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return path
+
+
+def build_network_store(network_file: Union[str, Path]) -> Path:
+    """Convert a TSV network into its binary store."""
+    network_file = Path(network_file)
+    network = read_network_tsv(network_file)
+
+    codes, genes = pd.factorize(
+        pd.concat([network[0], network[1]], ignore_index=True), sort=False
+    )
+    n_edges = len(network)
+    path = write_network_store(
+        codes[:n_edges],
+        codes[n_edges:],
+        pd.to_numeric(network[2], errors="coerce").to_numpy(dtype=np.float32),
+        [str(g) for g in genes],
+        store_path(network_file),
+        meta={"source": network_file.name, **_source_signature(network_file)},
+    )
+
+    logger.info(f"Network store written: {path} ({n_edges} edges)")
+    return path
+
+
+def load_network(network_file: Union[str, Path]) -> NetworkStore:
+    """
+    Open the binary store of a TSV network, building it if missing or stale.
+    """
+    network_file = Path(network_file)
+    path = store_path(network_file)
+    if (path / NetworkStore.META_FILE).exists():
+        try:
+            store = NetworkStore(path)
+            if store.meta.get("version") == STORE_VERSION and store.is_current(
+                network_file
+            ):
+                return store
+            logger.info(f"Network store is stale, rebuilding: {path}")
+        except Exception as e:
+            logger.warning(f"Unreadable network store {path}: {str(e)}")
+
+    return NetworkStore(build_network_store(network_file))
+
+
+def load_job_network(job_dir: Union[str, Path]) -> Optional[NetworkStore]:
+    """Open the network of a job directory, or None if it has none."""
+    network_file = find_network_file(job_dir)
+    if network_file is None:
+        return None
+    return load_network(network_file)
@@ -0,0 +1,164 @@
+"""
+Precomputed result network summaries.
+
+A summary is computed once from the binary network store and saved as a
+``<algorithm>_network.summary.json`` sidecar next to the network, so the
+summary endpoint only reads a small file. Besides the headline numbers it
+holds degree histograms and score quantiles for the frontend.
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Union
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import logging
+
+from app.services.network_store import NetworkStore, load_network
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SUFFIX = ".summary.json"
+SUMMARY_VERSION = 1
+SCORE_QUANTILES = [0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0]
+SCORE_HISTOGRAM_BINS = 20
+
+
+def summary_path(network_file: Union[str, Path]) -> Path:
+    """Summary sidecar belonging to a TSV network file."""
+    return Path(network_file).with_suffix(SUMMARY_SUFFIX)
+
+
+def degree_histogram(degrees: np.ndarray) -> Dict[str, List[int]]:
+    """
+    Histogram of node degrees over power-of-two bins.
+
+    ``bins`` are the lower bin edges (1, 2, 4, ...); degree-0 nodes are
+    not counted.
+    """
+    degrees = degrees[degrees > 0]
+    if len(degrees) == 0:
+        return {"bins": [], "counts": []}
+    bin_index = np.floor(np.log2(degrees)).astype(np.int64)
+    counts = np.bincount(bin_index)
+    return {
+        "bins": [int(2**i) for i in range(len(counts))],
+        "counts": [int(c) for c in counts],
+    }
+
+
+def _descending_quantiles(scores: np.ndarray, quantiles: List[float]) -> List[float]:
+    """Quantiles of scores already sorted in descending order."""
+    n = len(scores)
+    positions = [(n - 1) * (1.0 - q) for q in quantiles]
+    values = []
+    for pos in positions:
+        lo, hi = int(np.floor(pos)), int(np.ceil(pos))
+        frac = pos - lo
+        values.append(float(scores[lo] * (1 - frac) + scores[hi] * frac))
+    return values
+
+
+def compute_summary(network: NetworkStore) -> Dict[str, Any]:
+    """Summary statistics of a network, computed with vectorized counts."""
+    num_edges = len(network)
+    num_nodes = network.num_genes
+    out_degrees = np.bincount(network.source, minlength=num_nodes)
+    in_degrees = np.bincount(network.target, minlength=num_nodes)
+    degrees = out_degrees + in_degrees
+
+    density = (2 * num_edges) / (num_nodes * (num_nodes - 1)) if num_nodes > 1 else 0
+
+    summary = {
+        "total_edges": int(num_edges),
+        "num_nodes": int(num_nodes),
+        "density": float(density),
+        "avg_degree": float(degrees.mean()) if num_nodes else 0.0,
+        "max_degree": int(degrees.max()) if num_nodes else 0,
+        "num_regulators": int(np.count_nonzero(out_degrees)),
+        "num_targets": int(np.count_nonzero(in_degrees)),
+        "degree_histogram": degree_histogram(degrees),
+        "in_degree_histogram": degree_histogram(in_degrees),
+        "out_degree_histogram": degree_histogram(out_degrees),
+        "score_quantiles": None,
+        "score_histogram": None,
+    }
+
+    # The store is sorted by descending score with NaNs last
+    scores = network.score[: np.count_nonzero(~np.isnan(network.score))]
+    if len(scores):
+        summary["score_quantiles"] = {
+            str(q): value
+            for q, value in zip(
+                SCORE_QUANTILES, _descending_quantiles(scores, SCORE_QUANTILES)
+            )
+        }
+        counts, edges = np.histogram(scores, bins=SCORE_HISTOGRAM_BINS)
+        summary["score_histogram"] = {
+            "edges": [float(e) for e in edges],
+            "counts": [int(c) for c in counts],
+        }
+
+    return summary
+
+
+def write_summary(
+    network_file: Union[str, Path],
+    network: Optional[NetworkStore] = None,
+) -> Dict[str, Any]:
+    """Compute and persist the summary sidecar of a network."""
+    network_file = Path(network_file)
+    network = network or load_network(network_file)
+    summary = compute_summary(network)
+
+    stat = network_file.stat()
+    payload = {
+        "version": SUMMARY_VERSION,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "created_at": datetime.utcnow().isoformat(),
+        "summary": summary,
+    }
+
+    path = summary_path(network_file)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}-", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    logger.info(f"Network summary written: {path}")
+    return summary
+
+
+def read_summary(network_file: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """Read a current summary sidecar, or None if missing or stale."""
+    network_file = Path(network_file)
+    path = summary_path(network_file)
+    try:
+        with open(path, "r") as f:
+            payload = json.load(f)
+        stat = network_file.stat()
+    except (OSError, ValueError):
+        return None
+
+    if (
+        payload.get("version") != SUMMARY_VERSION
+        or payload.get("source_size") != stat.st_size
+        or payload.get("source_mtime_ns") != stat.st_mtime_ns
+    ):
+        return None
+    return payload["summary"]
+
+
+def load_summary(network_file: Union[str, Path]) -> Dict[str, Any]:
+    """Summary of a network, computing the sidecar on first use."""
+    summary = read_summary(network_file)
+    if summary is None:
+        summary = write_summary(network_file)
+    return summary
@@ -0,0 +1,146 @@
+"""
+Asynchronous supervision of algorithm processes.
+
+Algorithm processes run under ``asyncio.create_subprocess_exec`` with their
+output written straight into the job log, so no thread pumps their output.
+A timeout or a cancelled run stops the whole process group.
+
+Each worker process has one event loop on a daemon thread. The Celery task
+waits on it for the whole run, and the workers use the prefork pool, so a
+pool process supervises one run at a time; worker concurrency still comes
+from the pool size. The prefork pool is kept because time limits and
+revokes reach a running task only through signals to its pool process.
+"""
+
+import asyncio
+import os
+import signal
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional, Union
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROCESS_KILL_GRACE_SECONDS = 10.0
+# How long an interrupted run may take to stop its processes
+STOP_WAIT_SECONDS = PROCESS_KILL_GRACE_SECONDS + 20.0
+
+
+class ProcessTimeout(RuntimeError):
+    """Raised when a supervised process exceeds its time limit."""
+
+
+def _signal_group(process: asyncio.subprocess.Process, sig: int) -> None:
+    """Send a signal to the process group of a supervised process."""
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+async def _terminate(
+    process: asyncio.subprocess.Process,
+    grace: float = PROCESS_KILL_GRACE_SECONDS,
+) -> None:
+    """SIGTERM the process group, then SIGKILL it after ``grace`` seconds."""
+    if process.returncode is not None:
+        return
+    _signal_group(process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), grace)
+    except asyncio.TimeoutError:
+        _signal_group(process, signal.SIGKILL)
+        await process.wait()
+
+
+async def run_process(
+    cmd: List[str],
+    log_file: Union[str, Path],
+    timeout: Optional[float] = None,
+    on_stop: Optional[Callable[[], Awaitable[None]]] = None,
+) -> int:
+    """
+    Run ``cmd`` with stdout and stderr appended to ``log_file``.
+
+    The process leads its own process group so that helpers it spawns are
+    stopped with it. On timeout or cancellation ``on_stop`` runs first (e.g.
+    to kill a container the process only supervises), then the group is
+    terminated. Returns the exit code; raises ProcessTimeout on timeout.
+    """
+    with open(log_file, "ab") as log:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=log,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+        )
+    logger.info(f"Started process {process.pid}: {cmd[0]}")
+
+    try:
+        return await asyncio.wait_for(process.wait(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        logger.error(f"Stopping process {process.pid} ({type(e).__name__})")
+        if on_stop is not None:
+            try:
+                await on_stop()
+            except Exception as stop_error:
+                logger.error(f"Failed to stop process: {str(stop_error)}")
+        await asyncio.shield(_terminate(process))
+        if isinstance(e, asyncio.TimeoutError):
+            raise ProcessTimeout(f"Process timed out after {timeout} seconds")
+        raise
+
+
+class ExecutionLoop:
+    """A process-wide event loop on a daemon thread."""
+
+    def __init__(self):
+        """Initialize execution loop."""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread on first use (and again after a fork)."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="execution-loop",
+                    daemon=True,
+                ).start()
+            return self._loop
+
+    def run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        """
+        Run a coroutine on the shared loop and wait for its result.
+
+        If the waiting thread is interrupted, e.g. by the
+        SoftTimeLimitExceeded that a soft time limit or a revoke with
+        SIGUSR1 raises, the coroutine is cancelled and its processes are
+        stopped before the exception propagates. A killed pool process
+        cannot do this, so runs must be stopped through that signal.
+        """
+        finished = threading.Event()
+
+        async def supervised() -> Any:
+            try:
+                return await coro
+            finally:
+                finished.set()
+
+        future = asyncio.run_coroutine_threadsafe(supervised(), self._get_loop())
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            if not finished.wait(STOP_WAIT_SECONDS):
+                logger.error("Interrupted run did not stop in time")
+            raise
+
+
+# Global execution loop instance
+execution_loop = ExecutionLoop()
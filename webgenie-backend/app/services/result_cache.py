@@ -0,0 +1,411 @@
+"""
+Content-addressed memoization of inference results.
+
+A run is keyed by the content hash of its dataset, the algorithm, the
+digest of the code that runs it (the Docker image, or the Python runner
+sources) and its parameters as the runner receives them. The outputs of a
+completed run are kept under that key and hard-linked into later jobs with
+the same key, so a re-submission completes at once. Entries are evicted
+least recently used first once the cache exceeds its disk budget.
+
+Sharing files through hard links is safe because a job directory only
+keeps links to a complete entry: a link that fails partway (e.g. the entry
+is evicted meanwhile) removes what it linked, so a job that then runs on
+its own never writes through a link into the cache, and a job that reused
+a result does not run again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+from datetime import datetime
+from pathlib import Path
+import logging
+
+from app.core.config import settings
+from app.models.job import JobStatusEnum
+from app.services.dataset_cache import dataset_cache
+from app.services.inference_service import inference_service
+from app.services.job_events import publish_job_event
+from app.services.job_repository import job_repository
+from app.services.network_store import find_network_file
+from app.services.runners.correlation import parse_memory_size
+
+logger = logging.getLogger(__name__)
+
+RUNNERS_DIR = Path(__file__).resolve().parent / "runners"
+IMAGE_DIGEST_TTL = 300.0
+DOCKER_INSPECT_TIMEOUT = 10
+
+# Per-job files that are never shared between jobs, and the prefix of the
+# per-job export directories (``export_<format>``)
+UNSHARED_FILES = {"execution.log"}
+UNSHARED_PREFIX = "export_"
+
+_image_digests: Dict[str, Tuple[float, Optional[str]]] = {}
+_image_digests_lock = threading.Lock()
+
+
+def canonical_parameters(parameters: Dict[str, Any]) -> str:
+    """Parameters as the runner receives them (``--key str(value)``), key-sorted."""
+    return json.dumps(
+        {str(key): str(value) for key, value in (parameters or {}).items()},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+@lru_cache(maxsize=1)
+def runners_digest() -> str:
+    """SHA-256 over the Python runner sources (fixed for a deployed process)."""
+    digest = hashlib.sha256()
+    for path in sorted(RUNNERS_DIR.rglob("*.py")):
+        digest.update(str(path.relative_to(RUNNERS_DIR)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def image_digest(image: str) -> Optional[str]:
+    """
+    Content digest of a local Docker image, or None if it cannot be read.
+
+    Looked up at most every ``IMAGE_DIGEST_TTL`` seconds, so a re-pulled
+    tag is noticed.
+    """
+    now = time.monotonic()
+    with _image_digests_lock:
+        cached = _image_digests.get(image)
+        if cached is not None and now - cached[0] < IMAGE_DIGEST_TTL:
+            return cached[1]
+
+    digest = None
+    try:
+        inspected = subprocess.run(
+            ["docker", "image", "inspect", "--format", "{{.Id}}", image],
+            capture_output=True,
+            text=True,
+            timeout=DOCKER_INSPECT_TIMEOUT,
+        )
+        if inspected.returncode == 0:
+            digest = inspected.stdout.strip() or None
+        else:
+            logger.warning(
+                f"Failed to inspect image {image}: {inspected.stderr.strip()}"
+            )
+    except Exception as e:
+        logger.warning(f"Failed to inspect image {image}: {str(e)}")
+
+    with _image_digests_lock:
+        _image_digests[image] = (now, digest)
+    return digest
+
+
+def _is_shared(relative: Path) -> bool:
+    """Whether a file of a job directory is shared with identical jobs."""
+    top = relative.parts[0]
+    return top not in UNSHARED_FILES and not top.startswith(UNSHARED_PREFIX)
+
+
+def _link_tree(source_dir: Path, target_dir: Path) -> int:
+    """
+    Hard-link the shared files of ``source_dir`` into ``target_dir``.
+
+    Falls back to copying across filesystems. All or nothing: on failure
+    the files and directories created so far are removed before the error
+    propagates. Returns the bytes linked.
+    """
+    size = 0
+    linked: List[Path] = []
+    created: List[Path] = []
+    try:
+        for path in source_dir.rglob("*"):
+            relative = path.relative_to(source_dir)
+            if not _is_shared(relative) or path.is_dir():
+                continue
+            target = target_dir / relative
+            missing = []
+            directory = target.parent
+            while not directory.exists():
+                missing.append(directory)
+                directory = directory.parent
+            for directory in reversed(missing):
+                directory.mkdir(exist_ok=True)
+                created.append(directory)
+            if target.exists():
+                target.unlink()
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copy2(path, target)
+            linked.append(target)
+            size += path.stat().st_size
+    except BaseException:
+        for target in linked:
+            target.unlink(missing_ok=True)
+        for directory in reversed(created):
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+        raise
+    return size
+
+
+class ResultCache:
+    """Completed inference outputs by content key."""
+
+    META_FILE = "meta.json"
+
+    def __init__(
+        self, cache_dir: Optional[Path] = None, max_size: Optional[str] = None
+    ):
+        """Initialize result cache."""
+        self.cache_dir = Path(cache_dir or settings.RESULT_CACHE_DIR)
+        self.max_size = max_size or settings.RESULT_CACHE_MAX_SIZE
+
+    def _entry_dir(self, key: str) -> Path:
+        """Directory holding one cached result."""
+        return self.cache_dir / key
+
+    def runtime_digest(self, algorithm: str) -> Optional[str]:
+        """Digest of the code that runs an algorithm, or None if unknown."""
+        if settings.USE_DOCKER:
+            return image_digest(inference_service._get_docker_image(algorithm))
+        return runners_digest()
+
+    def job_key(
+        self,
+        dataset_path: Union[str, Path],
+        algorithm: str,
+        parameters: Dict[str, Any],
+    ) -> Optional[str]:
+        """
+        Cache key of a run, or None if it cannot be memoized.
+
+        That is when the cache is disabled, the dataset is missing or the
+        algorithm's image cannot be identified.
+        """
+        if not settings.RESULT_CACHE_ENABLED:
+            return None
+        try:
+            dataset_path = Path(dataset_path)
+            if not dataset_path.exists():
+                return None
+            runtime = self.runtime_digest(algorithm)
+            if runtime is None:
+                return None
+            identity = [
+                dataset_cache.file_hash(dataset_path),
+                algorithm.upper(),
+                runtime,
+                canonical_parameters(parameters),
+            ]
+            return hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+        except Exception as e:
+            logger.warning(f"Failed to compute result cache key: {str(e)}")
+            return None
+
+    def contains(self, key: str) -> bool:
+        """Whether a complete entry exists for this key."""
+        return (self._entry_dir(key) / self.META_FILE).exists()
+
+    def link_into(
+        self, key: str, job_dir: Union[str, Path]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Link a cached result into a job directory.
+
+        Returns the entry's metadata, or None on a miss (including an entry
+        evicted while it was being linked).
+        """
+        entry_dir = self._entry_dir(key)
+        meta_file = entry_dir / self.META_FILE
+        try:
+            with open(meta_file, "r") as f:
+                meta = json.load(f)
+            _link_tree(entry_dir, Path(job_dir))
+            # The meta file's mtime orders entries for eviction
+            os.utime(meta_file)
+            (Path(job_dir) / self.META_FILE).unlink(missing_ok=True)
+            return meta
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to reuse cached result {key}: {str(e)}")
+            return None
+
+    def store(self, key: str, job_dir: Union[str, Path], job_id: str) -> bool:
+        """Keep a completed job's outputs under its key; False if it has none."""
+        job_dir = Path(job_dir)
+        if self.contains(key):
+            os.utime(self._entry_dir(key) / self.META_FILE)
+            return True
+        if find_network_file(job_dir) is None:
+            logger.warning(f"No network to cache for job {job_id}")
+            return False
+
+        tmp_dir = self.cache_dir / f".tmp-{key}-{uuid.uuid4().hex[:8]}"
+        try:
+            size = _link_tree(job_dir, tmp_dir)
+            with open(tmp_dir / self.META_FILE, "w") as f:
+                json.dump(
+                    {
+                        "key": key,
+                        "job_id": job_id,
+                        "size": size,
+                        "created_at": datetime.utcnow().isoformat(),
+                    },
+                    f,
+                )
+            os.rename(tmp_dir, self._entry_dir(key))
+        except OSError as e:
+            # Another worker stored the same key first, or the copy failed
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not self.contains(key):
+                logger.error(f"Failed to cache result of job {job_id}: {str(e)}")
+                return False
+
+        self.evict()
+        return True
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Cached entries with their size and last use, least recent first."""
+        entries = []
+        for meta_file in self.cache_dir.glob(f"*/{self.META_FILE}"):
+            try:
+                with open(meta_file, "r") as f:
+                    meta = json.load(f)
+                meta["last_used"] = meta_file.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            entries.append(meta)
+        entries.sort(key=lambda meta: meta["last_used"])
+        return entries
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits its budget.
+
+        Jobs linked to an evicted entry keep their files. Returns the bytes freed.
+        """
+        budget = parse_memory_size(self.max_size)
+        entries = self.entries()
+        total = sum(meta.get("size", 0) for meta in entries)
+        freed = 0
+        for meta in entries:
+            if total <= budget:
+                break
+            shutil.rmtree(self._entry_dir(meta["key"]), ignore_errors=True)
+            total -= meta.get("size", 0)
+            freed += meta.get("size", 0)
+            logger.info(f"Evicted cached result {meta['key']}")
+        return freed
+
+
+def _append_log(job: Dict[str, Any], message: str) -> None:
+    """Add a line to a job's execution log."""
+    try:
+        with open(job["log_file"], "a") as f:
+            f.write(f"{message}\n")
+    except Exception as e:
+        logger.warning(f"Failed to write log of job {job['id']}: {str(e)}")
+
+
+def finish_job(
+    job_id: str, succeeded: bool, error_message: Optional[str] = None
+) -> None:
+    """
+    Settle the cache entry of a finished job and the jobs attached to it.
+
+    On success the outputs are cached and linked into every attached job;
+    on failure the attached jobs fail too, since they run the same inputs.
+    Never raises, so it cannot fail the job itself.
+    """
+    try:
+        job = job_repository.get(job_id)
+        if job is None or not job.get("cache_key"):
+            return
+        job_dir = Path(job["result_path"])
+        if succeeded:
+            result_cache.store(job["cache_key"], job_dir, job_id)
+
+        unlinked = []
+        for follower in job_repository.attached_jobs(job_id):
+            if not succeeded:
+                publish_job_event(
+                    follower["id"],
+                    JobStatusEnum.FAILED,
+                    error_message=f"Attached job {job_id} failed: {error_message}",
+                )
+                continue
+            try:
+                _link_tree(job_dir, Path(follower["result_path"]))
+            except Exception as e:
+                logger.error(f"Failed to link result into {follower['id']}: {str(e)}")
+                unlinked.append(follower["id"])
+                continue
+            _append_log(follower, f"Result reused from job {job_id}")
+            publish_job_event(
+                follower["id"], JobStatusEnum.RUNNING, progress=0, started=True
+            )
+            publish_job_event(follower["id"], JobStatusEnum.COMPLETED, progress=100)
+
+        # Those run on their own instead, one of them for all
+        if unlinked:
+            job_repository.hand_over(unlinked)
+    except Exception as e:
+        logger.error(f"Failed to settle cached result of job {job_id}: {str(e)}")
+
+
+def promote_attached(job_id: str) -> Optional[str]:
+    """
+    Hand the jobs attached to a cancelled job to the oldest of them.
+
+    That job is queued to run and the rest wait on it, unless an identical
+    job was submitted since, which they all wait on instead. Returns the ID
+    of the job they now depend on.
+    """
+    followers = job_repository.attached_jobs(job_id)
+    if not followers:
+        return None
+    head = job_repository.hand_over([follower["id"] for follower in followers])
+    logger.info(f"Job {head} takes over the jobs attached to {job_id}")
+    return head
+
+
+def settle_attached() -> List[str]:
+    """
+    Resolve attached jobs whose job finished without settling them.
+
+    E.g. when its worker was lost. Returns the IDs of those jobs.
+    """
+    settled = []
+    for primary_id in {job["attached_to"] for job in job_repository.attached_jobs()}:
+        # A job that no longer exists counts as cancelled
+        primary = job_repository.get(primary_id) or {
+            "status": JobStatusEnum.CANCELLED.value
+        }
+        status = primary["status"]
+        if status == JobStatusEnum.COMPLETED.value:
+            finish_job(primary_id, succeeded=True)
+        elif status == JobStatusEnum.FAILED.value:
+            finish_job(
+                primary_id, succeeded=False, error_message=primary.get("error_message")
+            )
+        elif status == JobStatusEnum.CANCELLED.value:
+            promote_attached(primary_id)
+        else:
+            continue
+        settled.append(primary_id)
+    return settled
+
+
+# Global result cache instance
+result_cache = ResultCache()
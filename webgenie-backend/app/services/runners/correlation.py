@@ -0,0 +1,216 @@
+"""
+Tiled Pearson correlation for large expression matrices.
+
+Genes are standardized once so that every correlation block is a single
+BLAS matrix product. Blocks are either streamed into an edge accumulator
+or written to a memory-mapped float32 matrix, so the dense N x N result
+never has to fit in RAM. Sparse inputs are never densified: their blocks
+are sparse products corrected with per-gene means.
+"""
+
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+from pathlib import Path
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.runners.edges import EdgeAccumulator
+from app.services.runners.expression import (
+    ExpressionMatrix,
+    as_expression_matrix,
+    correlation_moments,
+    sparse_correlation_block,
+)
+from app.services.runners.parallel import (
+    iter_pairwise_blocks,
+    pairwise_matrix,
+    resolve_workers,
+)
+
+logger = logging.getLogger(__name__)
+
+# Smallest tile worth dispatching to BLAS
+MIN_TILE_SIZE = 64
+
+# Bytes held per tile cell: the float32 block plus abs/mask temporaries
+_BYTES_PER_TILE_CELL = 12
+
+
+def parse_memory_size(value: Union[str, int]) -> int:
+    """Parse a Docker-style memory size ("8g", "512m", "1024") into bytes."""
+    if isinstance(value, int):
+        return value
+
+    units = {"b": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+    text = value.strip().lower().rstrip("b") or "0"
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
+
+
+def default_memory_budget() -> int:
+    """Memory budget for pairwise kernels, in bytes."""
+    return parse_memory_size(
+        settings.CORRELATION_MEMORY_BUDGET or settings.ALGORITHM_MEMORY_LIMIT
+    )
+
+
+CorrelationInput = Union[ExpressionMatrix, pd.DataFrame, np.ndarray]
+
+
+def prepare_correlation(
+    data: CorrelationInput,
+) -> Tuple[Any, Callable, Dict[str, Any], Sequence, int]:
+    """
+    Return (kernel matrix, kernel, kernel context, gene labels, resident bytes).
+
+    Dense data is standardized up front; sparse data stays in CSR form and
+    is corrected with per-gene moments inside the kernel.
+    """
+    matrix = as_expression_matrix(data)
+    if matrix.is_sparse:
+        values = matrix.values.astype(np.float64)
+        resident = values.data.nbytes + values.indices.nbytes + values.indptr.nbytes
+        return (
+            values,
+            sparse_correlation_block,
+            correlation_moments(values),
+            matrix.genes,
+            resident,
+        )
+
+    z = standardize(matrix.values)
+    return z, correlation_block, {}, matrix.genes, z.nbytes
+
+
+def standardize(
+    values: np.ndarray,
+    dtype: type = np.float32,
+    chunk_rows: int = 4096,
+) -> np.ndarray:
+    """
+    Center and scale each gene (row) to unit norm.
+
+    The dot product of two standardized rows is their Pearson correlation.
+    Constant genes become NaN rows, matching ``DataFrame.corr``.
+    """
+    n_genes = values.shape[0]
+    z: np.ndarray = np.empty(values.shape, dtype=dtype)
+
+    for start in range(0, n_genes, chunk_rows):
+        stop = min(start + chunk_rows, n_genes)
+        x = np.asarray(values[start:stop], dtype=np.float64)
+        x = x - x.mean(axis=1, keepdims=True)
+        norm = np.sqrt(np.einsum("ij,ij->i", x, x))[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z[start:stop] = np.where(norm > 0, x / norm, np.nan)
+
+    return z
+
+
+def plan_tile_size(
+    n_genes: int,
+    n_cells: int,
+    tile_size: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+    n_workers: int = 1,
+    resident_bytes: Optional[int] = None,
+) -> int:
+    """Choose a tile edge length that fits the memory budget."""
+    tile_size = tile_size or settings.CORRELATION_TILE_SIZE
+    memory_budget = memory_budget or default_memory_budget()
+
+    # The input matrix (standardized float32 when dense) is resident for
+    # the whole run
+    if resident_bytes is None:
+        resident_bytes = n_genes * n_cells * 4
+    available = memory_budget - resident_bytes
+    if available <= 0:
+        logger.warning(
+            f"Input matrix ({n_genes}x{n_cells}) exceeds memory budget "
+            f"of {memory_budget} bytes, using minimum tile size"
+        )
+        return min(MIN_TILE_SIZE, max(n_genes, 1))
+
+    # Every worker holds its own tile temporaries
+    fitting = int(math.sqrt(available / (_BYTES_PER_TILE_CELL * max(n_workers, 1))))
+    return max(1, min(tile_size, max(fitting, MIN_TILE_SIZE), n_genes))
+
+
+def correlation_block(z: np.ndarray, rows: slice, cols: slice) -> np.ndarray:
+    """Pairwise kernel: correlation of two gene tiles of standardized data."""
+    return z[rows] @ z[cols].T
+
+
+def stream_correlation_edges(
+    data: CorrelationInput,
+    threshold: Optional[float] = None,
+    top_k: Optional[int] = None,
+    per_target_top_k: Optional[int] = None,
+    absolute: bool = True,
+    tile_size: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+    n_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Compute correlation tile by tile and keep only qualifying edges.
+
+    Selection semantics match ``extract_edges`` on the full matrix.
+    """
+    matrix, kernel, context, genes, resident = prepare_correlation(data)
+    n_genes, n_cells = matrix.shape
+    n_workers = resolve_workers(n_workers)
+    tile = plan_tile_size(
+        n_genes, n_cells, tile_size, memory_budget, n_workers, resident
+    )
+
+    logger.info(f"Streaming correlation edges for {n_genes} genes (tile={tile})")
+
+    accumulator = EdgeAccumulator(
+        n_genes,
+        threshold=threshold,
+        top_k=top_k,
+        per_target_top_k=per_target_top_k,
+        absolute=absolute,
+    )
+    for i0, j0, block in iter_pairwise_blocks(matrix, kernel, tile, n_workers, context):
+        accumulator.add_block(block, i0, j0)
+        if per_target_top_k is not None and i0 != j0:
+            accumulator.add_block(block.T, j0, i0)
+
+    return accumulator.to_table(genes)
+
+
+def correlation_memmap(
+    data: CorrelationInput,
+    path: Union[str, Path],
+    tile_size: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+    n_workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Write the full correlation matrix to a float32 ``.npy`` memmap.
+
+    Returns the matrix reopened read-only.
+    """
+    matrix, kernel, context, _, resident = prepare_correlation(data)
+    n_genes, n_cells = matrix.shape
+    n_workers = resolve_workers(n_workers)
+    tile = plan_tile_size(
+        n_genes, n_cells, tile_size, memory_budget, n_workers, resident
+    )
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    out = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=(n_genes, n_genes)
+    )
+    pairwise_matrix(matrix, kernel, tile, n_workers, context, out=out)
+    out.flush()
+    del out
+
+    logger.info(f"Correlation matrix written: {path}")
+    return np.load(path, mmap_mode="r")
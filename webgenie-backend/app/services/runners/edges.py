@@ -0,0 +1,265 @@
+"""
+Vectorized edge extraction from pairwise score matrices.
+
+Scores are scanned block by block so that only a bounded slice of the
+matrix is expanded into candidate edges at any time. Blocks can come from
+an in-memory matrix or be streamed from a tiled computation.
+"""
+
+from typing import Optional, Sequence, Tuple, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EDGE_COLUMNS = ["TF", "Target", "Score"]
+
+# Gene labels indexed by gene id
+GeneLabels = Union[Sequence[str], np.ndarray, pd.Index]
+
+# Number of matrix cells examined per block (~32 MB of float64)
+DEFAULT_BLOCK_CELLS = 4 * 1024 * 1024
+
+
+def _as_score_array(
+    scores: Union[pd.DataFrame, np.ndarray],
+    genes: Optional[GeneLabels],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Split a score matrix into its values and gene labels."""
+    if isinstance(scores, pd.DataFrame):
+        values = scores.to_numpy(copy=False)
+        if genes is None:
+            genes = scores.index
+    else:
+        values = np.asarray(scores)
+
+    if values.ndim != 2 or values.shape[0] != values.shape[1]:
+        raise ValueError(f"Score matrix must be square, got shape {values.shape}")
+
+    labels = np.arange(values.shape[0]) if genes is None else np.asarray(genes)
+    if len(labels) != values.shape[0]:
+        raise ValueError("Number of gene labels does not match score matrix")
+
+    return values, labels
+
+
+def _block_size(n: int, block_cells: int) -> int:
+    """Number of rows (or columns) to process per block."""
+    return max(1, block_cells // max(n, 1))
+
+
+def _keep_top(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    vals: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Keep the k highest-scoring candidates."""
+    if len(vals) <= k:
+        return rows, cols, vals
+    keep = np.argpartition(-vals, k - 1)[:k]
+    return rows[keep], cols[keep], vals[keep]
+
+
+def make_edge_table(
+    sources: np.ndarray,
+    targets: np.ndarray,
+    scores: np.ndarray,
+    genes: GeneLabels,
+) -> pd.DataFrame:
+    """
+    Build a compact edge table from gene indices.
+
+    TF and Target are categoricals sharing the gene vocabulary and Score is
+    float32. Edges are ordered by descending score.
+    """
+    order = np.argsort(-scores, kind="stable")
+    categories = pd.Index(genes)
+    return pd.DataFrame(
+        {
+            "TF": pd.Categorical.from_codes(
+                np.asarray(sources)[order].astype(np.int32), categories=categories
+            ),
+            "Target": pd.Categorical.from_codes(
+                np.asarray(targets)[order].astype(np.int32), categories=categories
+            ),
+            "Score": np.asarray(scores)[order].astype(np.float32),
+        },
+        columns=EDGE_COLUMNS,
+    )
+
+
+class EdgeAccumulator:
+    """
+    Incrementally select edges from blocks of a gene-by-gene score matrix.
+
+    Blocks may arrive in any order and are addressed by the global index of
+    their first row (regulator) and first column (target). Memory stays
+    bounded by the selected edges, or by ``per_target_top_k`` slots per
+    target when that mode is used.
+    """
+
+    def __init__(
+        self,
+        n_genes: int,
+        threshold: Optional[float] = None,
+        top_k: Optional[int] = None,
+        per_target_top_k: Optional[int] = None,
+        absolute: bool = True,
+        upper_only: bool = True,
+    ):
+        """Initialize accumulator."""
+        self.n_genes = n_genes
+        self.threshold = threshold
+        self.top_k = top_k
+        self.absolute = absolute
+        self.per_target_top_k = per_target_top_k
+        self.upper_only = upper_only and per_target_top_k is None
+
+        self._rows: list = []
+        self._cols: list = []
+        self._vals: list = []
+
+        if per_target_top_k is not None:
+            k = max(0, min(per_target_top_k, n_genes - 1))
+            self._best_vals = np.full((k, n_genes), -np.inf, dtype=np.float32)
+            self._best_rows = np.zeros((k, n_genes), dtype=np.int64)
+
+    def add_block(self, block: np.ndarray, row_start: int, col_start: int) -> None:
+        """Consider every score in ``block`` as a candidate edge."""
+        block = block.astype(np.float32, copy=True)
+        if self.absolute:
+            np.abs(block, out=block)
+
+        rows = np.arange(row_start, row_start + block.shape[0])
+        cols = np.arange(col_start, col_start + block.shape[1])
+
+        if self.per_target_top_k is not None:
+            self._add_per_target(block, rows, cols)
+            return
+
+        mask = ~np.isnan(block)
+        if self.upper_only:
+            mask &= cols[None, :] > rows[:, None]
+        else:
+            mask &= cols[None, :] != rows[:, None]
+        if self.threshold is not None:
+            mask &= block >= self.threshold
+
+        r, c = np.nonzero(mask)
+        self._rows.append(rows[r])
+        self._cols.append(cols[c])
+        self._vals.append(block[r, c])
+
+        if self.top_k is not None:
+            merged = _keep_top(*self._merged(), self.top_k)
+            self._rows, self._cols, self._vals = [merged[0]], [merged[1]], [merged[2]]
+
+    def _add_per_target(
+        self, block: np.ndarray, rows: np.ndarray, cols: np.ndarray
+    ) -> None:
+        """Merge a block into the running per-target top-k slots."""
+        k = self._best_vals.shape[0]
+        if k == 0:
+            return
+
+        # Self-edges and NaNs never win a slot
+        block[rows[:, None] == cols[None, :]] = -np.inf
+        block[np.isnan(block)] = -np.inf
+
+        c0, c1 = cols[0], cols[-1] + 1
+        cand_vals = np.vstack([self._best_vals[:, c0:c1], block])
+        cand_rows = np.vstack(
+            [self._best_rows[:, c0:c1], np.broadcast_to(rows[:, None], block.shape)]
+        )
+        best = np.argpartition(-cand_vals, k - 1, axis=0)[:k]
+        self._best_vals[:, c0:c1] = np.take_along_axis(cand_vals, best, axis=0)
+        self._best_rows[:, c0:c1] = np.take_along_axis(cand_rows, best, axis=0)
+
+    def _merged(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Concatenate collected candidates."""
+        if not self._vals:
+            return (
+                np.empty(0, np.int64),
+                np.empty(0, np.int64),
+                np.empty(0, np.float32),
+            )
+        return (
+            np.concatenate(self._rows),
+            np.concatenate(self._cols),
+            np.concatenate(self._vals),
+        )
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return selected (regulator, target, score) arrays."""
+        if self.per_target_top_k is not None:
+            k = self._best_vals.shape[0]
+            keep = np.isfinite(self._best_vals)
+            if self.threshold is not None:
+                keep &= self._best_vals >= self.threshold
+            targets = np.broadcast_to(np.arange(self.n_genes), (k, self.n_genes))
+            rows, cols, vals = (
+                self._best_rows[keep],
+                targets[keep],
+                self._best_vals[keep],
+            )
+        else:
+            rows, cols, vals = self._merged()
+
+        if self.top_k is not None:
+            rows, cols, vals = _keep_top(rows, cols, vals, self.top_k)
+        return rows, cols, vals
+
+    def to_table(self, genes: GeneLabels) -> pd.DataFrame:
+        """Return selected edges as a compact edge table."""
+        return make_edge_table(*self.result(), genes)
+
+
+def extract_edges(
+    scores: Union[pd.DataFrame, np.ndarray],
+    genes: Optional[GeneLabels] = None,
+    threshold: Optional[float] = None,
+    top_k: Optional[int] = None,
+    per_target_top_k: Optional[int] = None,
+    absolute: bool = True,
+    block_cells: int = DEFAULT_BLOCK_CELLS,
+) -> pd.DataFrame:
+    """
+    Extract edges from a square gene-by-gene score matrix.
+
+    Args:
+        scores: Square score matrix (DataFrame indexed by gene, or ndarray).
+        genes: Gene labels; defaults to the DataFrame index.
+        threshold: Keep edges whose score is at least this value.
+        top_k: Keep only the k strongest edges overall.
+        per_target_top_k: Keep the k strongest regulators of each target.
+            Both directions of a pair may then be reported.
+        absolute: Rank on absolute values (e.g. for signed correlations).
+        block_cells: Matrix cells processed per block.
+
+    Without ``per_target_top_k`` the matrix is treated as symmetric and only
+    the upper triangle is scanned. NaN scores are never reported.
+    """
+    values, labels = _as_score_array(scores, genes)
+    n = values.shape[0]
+    step = _block_size(n, block_cells)
+
+    accumulator = EdgeAccumulator(
+        n,
+        threshold=threshold,
+        top_k=top_k,
+        per_target_top_k=per_target_top_k,
+        absolute=absolute,
+    )
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        if per_target_top_k is not None:
+            accumulator.add_block(values[:, start:stop], 0, start)
+        else:
+            accumulator.add_block(values[start:stop], start, 0)
+
+    edges = accumulator.to_table(labels)
+    logger.debug(f"Extracted {len(edges)} edges from {n}x{n} score matrix")
+    return edges
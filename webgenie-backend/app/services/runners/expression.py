@@ -0,0 +1,223 @@
+"""
+Expression matrix container and sparse-aware statistics.
+
+Single-cell matrices are mostly zeros, so values are kept in
+``scipy.sparse`` CSR form (genes as rows) when they arrive that way, and
+every helper here works in time proportional to the non-zeros.
+"""
+
+from typing import Any, Dict, Optional, Sequence, TypeGuard, Union
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+MatrixValues = Union[np.ndarray, sparse.spmatrix]
+Labels = Union[Sequence, np.ndarray, pd.Index]
+
+
+def is_sparse(values: object) -> TypeGuard[sparse.spmatrix]:
+    """``sparse.issparse``, narrowing the type for static checks."""
+    return sparse.issparse(values)
+
+
+class ExpressionMatrix:
+    """Genes x cells expression values with their labels."""
+
+    def __init__(
+        self,
+        values: MatrixValues,
+        genes: Labels,
+        cells: Labels,
+    ):
+        """Initialize expression matrix."""
+        if is_sparse(values):
+            values = values.tocsr()
+        else:
+            values = np.asarray(values)
+
+        if values.shape != (len(genes), len(cells)):
+            raise ValueError(
+                f"Values shape {values.shape} does not match "
+                f"{len(genes)} genes x {len(cells)} cells"
+            )
+
+        self.values = values
+        self.genes = pd.Index(genes)
+        self.cells = pd.Index(cells)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "ExpressionMatrix":
+        """Wrap a genes x cells DataFrame without copying."""
+        return cls(frame.to_numpy(copy=False), frame.index, frame.columns)
+
+    @property
+    def shape(self):
+        """(n_genes, n_cells)."""
+        return self.values.shape
+
+    @property
+    def is_sparse(self) -> bool:
+        """Whether values are stored sparsely."""
+        return sparse.issparse(self.values)
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored non-zero values."""
+        if self.is_sparse:
+            return int(self.values.nnz)
+        return int(np.count_nonzero(self.values))
+
+    @property
+    def density(self) -> float:
+        """Fraction of non-zero entries."""
+        size = self.shape[0] * self.shape[1]
+        return self.nnz / size if size else 0.0
+
+    def to_frame(self) -> pd.DataFrame:
+        """Dense DataFrame view (densifies sparse values)."""
+        values = self.values.toarray() if self.is_sparse else self.values
+        return pd.DataFrame(values, index=self.genes, columns=self.cells, copy=False)
+
+    def subset_genes(self, mask: np.ndarray) -> "ExpressionMatrix":
+        """Keep genes (rows) selected by a boolean mask."""
+        return ExpressionMatrix(self.values[mask], self.genes[mask], self.cells)
+
+    def __repr__(self) -> str:
+        kind = "sparse" if self.is_sparse else "dense"
+        return (
+            f"ExpressionMatrix({self.shape[0]} genes x {self.shape[1]} cells, {kind})"
+        )
+
+
+def as_expression_matrix(
+    data: Union[ExpressionMatrix, pd.DataFrame, MatrixValues],
+) -> ExpressionMatrix:
+    """Coerce supported inputs to an ``ExpressionMatrix``."""
+    if isinstance(data, ExpressionMatrix):
+        return data
+    if isinstance(data, pd.DataFrame):
+        return ExpressionMatrix.from_frame(data)
+    n_genes, n_cells = data.shape
+    return ExpressionMatrix(data, np.arange(n_genes), np.arange(n_cells))
+
+
+def gene_statistics(data: Union[ExpressionMatrix, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Per-gene mean, variance, non-zero count and dropout rate.
+
+    Variance is the unbiased sample variance, computed from sums and sums of
+    squares so sparse inputs are never densified.
+    """
+    matrix = as_expression_matrix(data)
+    values = matrix.values
+    n_cells = matrix.shape[1]
+
+    if matrix.is_sparse:
+        sums = np.asarray(values.sum(axis=1)).ravel()
+        sq_sums = np.asarray(values.multiply(values).sum(axis=1)).ravel()
+        nnz = np.diff(values.indptr)
+    else:
+        x = np.asarray(values, dtype=np.float64)
+        sums = x.sum(axis=1)
+        sq_sums = np.einsum("ij,ij->i", x, x)
+        nnz = np.count_nonzero(x, axis=1)
+
+    mean = sums / n_cells
+    ddof = n_cells - 1 if n_cells > 1 else 1
+    var = np.maximum(sq_sums - n_cells * mean**2, 0.0) / ddof
+
+    return pd.DataFrame(
+        {
+            "mean": mean,
+            "variance": var,
+            "nnz": nnz.astype(np.int64),
+            "dropout": 1.0 - nnz / n_cells,
+        },
+        index=matrix.genes,
+    )
+
+
+def normalize_total(
+    matrix: ExpressionMatrix,
+    target_sum: Optional[float] = 1e4,
+) -> ExpressionMatrix:
+    """Scale every cell (column) to the same total count."""
+    values = matrix.values
+    totals = np.asarray(values.sum(axis=0), dtype=np.float64).ravel()
+    if target_sum is None:
+        target_sum = float(np.median(totals[totals > 0])) if (totals > 0).any() else 1.0
+
+    with np.errstate(divide="ignore"):
+        scale = np.where(totals > 0, target_sum / totals, 0.0)
+
+    if matrix.is_sparse:
+        scaled = values @ sparse.diags(scale)
+    else:
+        scaled = values * scale[None, :]
+    return ExpressionMatrix(scaled, matrix.genes, matrix.cells)
+
+
+def log1p(matrix: ExpressionMatrix) -> ExpressionMatrix:
+    """Natural log(1 + x); zeros stay zero so sparsity is preserved."""
+    if matrix.is_sparse:
+        values = matrix.values.copy()
+        values.data = np.log1p(values.data)
+    else:
+        values = np.log1p(matrix.values)
+    return ExpressionMatrix(values, matrix.genes, matrix.cells)
+
+
+def filter_genes(matrix: ExpressionMatrix, min_cells: int = 1) -> ExpressionMatrix:
+    """Drop genes expressed in fewer than ``min_cells`` cells."""
+    stats = gene_statistics(matrix)
+    keep = stats["nnz"].to_numpy() >= min_cells
+    logger.info(f"Keeping {int(keep.sum())}/{len(keep)} genes (min_cells={min_cells})")
+    return matrix.subset_genes(keep)
+
+
+def correlation_moments(values: MatrixValues) -> Dict[str, Any]:
+    """
+    Per-gene mean and inverse centered norm for sparse correlation.
+
+    Constant genes get a NaN inverse norm, matching ``DataFrame.corr``.
+    """
+    n_cells = values.shape[1]
+    if is_sparse(values):
+        sums = np.asarray(values.sum(axis=1), dtype=np.float64).ravel()
+        sq_sums = np.asarray(
+            values.multiply(values).sum(axis=1), dtype=np.float64
+        ).ravel()
+    else:
+        x = np.asarray(values, dtype=np.float64)
+        sums = x.sum(axis=1)
+        sq_sums = np.einsum("ij,ij->i", x, x)
+
+    means = sums / n_cells
+    centered = np.maximum(sq_sums - n_cells * means**2, 0.0)
+    with np.errstate(divide="ignore"):
+        inv_norms = np.where(centered > 0, 1.0 / np.sqrt(centered), np.nan)
+    return {"means": means, "inv_norms": inv_norms, "n_cells": n_cells}
+
+
+def sparse_correlation_block(
+    values: sparse.csr_matrix,
+    rows: slice,
+    cols: slice,
+    means: np.ndarray,
+    inv_norms: np.ndarray,
+    n_cells: int,
+) -> np.ndarray:
+    """
+    Pairwise kernel: Pearson correlation of two gene tiles of a CSR matrix.
+
+    Uses r_ij = (x_i . x_j - n m_i m_j) / (|x_i - m_i| |x_j - m_j|), so the
+    work is one sparse product over the stored non-zeros of the tile.
+    """
+    gram = (values[rows] @ values[cols].T).toarray()
+    cov = gram - n_cells * np.outer(means[rows], means[cols])
+    corr = cov * inv_norms[rows][:, None] * inv_norms[cols][None, :]
+    return np.clip(corr, -1.0, 1.0).astype(np.float32)
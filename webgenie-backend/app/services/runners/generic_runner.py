@@ -2,11 +2,14 @@
 Generic algorithm runner that can be extended for specific algorithms.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
+import numpy as np
 import pandas as pd
 import logging
 
-from app.services.runners.utils import BaseRunner, load_expression_data, save_network
+from app.services.runners.expression import ExpressionMatrix
+from app.services.runners.readers import DatasetReader
+from app.services.runners.utils import BaseRunner, save_network
 
 logger = logging.getLogger(__name__)
 
@@ -27,26 +30,22 @@ class GenericGRNRunner(BaseRunner):
     ) -> Dict[str, Any]:
         """Run generic GRN inference."""
         try:
-            # Validate input
-            if not self.validate_input(input_file):
+            # Validate and open input in one pass; data is loaded only if it
+            # fits the budget
+            reader = self.load_input(input_file)
+            if reader is None:
                 raise RuntimeError("Input validation failed")
 
-            # Load data
-            data = load_expression_data(input_file)
-            if data is None:
-                raise RuntimeError("Failed to load expression data")
-
-            self.logger.info(f"Loaded data: {data.shape}")
-
-            # Run inference (basic correlation)
-            network = self._infer_network(data, parameters)
+            with reader:
+                # Run inference (basic correlation)
+                network = self._infer_network(reader, parameters)
 
             # Save output
             if not save_network(network, output_file):
                 raise RuntimeError("Failed to save network")
 
             # Validate output
-            if not self.validate_output(output_file):
+            if not self.validate_output(output_file, network):
                 raise RuntimeError("Output validation failed")
 
             return {
@@ -54,7 +53,9 @@ class GenericGRNRunner(BaseRunner):
                 "output_file": output_file,
                 "metrics": {
                     "num_edges": len(network),
-                    "num_genes": len(set(network[0]) | set(network[1])),
+                    "num_genes": len(
+                        np.union1d(network["TF"].cat.codes, network["Target"].cat.codes)
+                    ),
                 },
             }
 
@@ -64,30 +65,44 @@ class GenericGRNRunner(BaseRunner):
 
     def _infer_network(
         self,
-        data: pd.DataFrame,
+        data: Union[pd.DataFrame, ExpressionMatrix, DatasetReader],
         parameters: Dict[str, Any],
     ) -> pd.DataFrame:
         """Infer GRN using correlation."""
-        from app.services.runners.utils import compute_correlation
-
-        correlation = compute_correlation(data)
-
-        # Get threshold
-        threshold = parameters.get("correlation_threshold", 0.5)
-
-        # Extract edges
-        edges = []
-        for i in range(len(correlation)):
-            for j in range(i + 1, len(correlation)):
-                corr_value = abs(correlation.iloc[i, j])
-                if corr_value >= threshold:
-                    edges.append([
-                        correlation.index[i],
-                        correlation.columns[j],
-                        corr_value,
-                    ])
-
-        return pd.DataFrame(edges, columns=["TF", "Target", "Score"])
+        from app.services.runners.correlation import (
+            default_memory_budget,
+            stream_correlation_edges,
+        )
+        from app.services.runners.streaming import stream_dataset_correlation_edges
+
+        # Edge selection: threshold, global top-k and/or per-target top-k
+        top_k = parameters.get("top_k")
+        per_target_top_k = parameters.get("per_target_top_k")
+        tile_size = parameters.get("tile_size")
+        default_threshold = 0.5 if top_k is None and per_target_top_k is None else None
+        threshold = parameters.get("correlation_threshold", default_threshold)
+
+        selection: Dict[str, Any] = {
+            "threshold": float(threshold) if threshold is not None else None,
+            "top_k": int(top_k) if top_k is not None else None,
+            "per_target_top_k": (
+                int(per_target_top_k) if per_target_top_k is not None else None
+            ),
+        }
+
+        if isinstance(data, DatasetReader):
+            if data.estimated_bytes > default_memory_budget() // 2:
+                # Too large to load: accumulate over streamed cell chunks
+                self.logger.info(f"Streaming {data} in cell chunks")
+                return stream_dataset_correlation_edges(data, **selection)
+            data = data.to_matrix()
+
+        # Correlation is computed tile by tile; only selected edges are kept
+        return stream_correlation_edges(
+            data,
+            tile_size=int(tile_size) if tile_size is not None else None,
+            **selection,
+        )
 
 
 # Convenience function for running
@@ -0,0 +1,176 @@
+"""
+Batched mutual information for expression matrices.
+
+Every gene is discretized once into small integer codes. Joint histograms
+for many gene pairs are then counted together with one offset ``bincount``,
+and the symmetric MI matrix is filled tile by tile.
+"""
+
+from typing import Optional, Union
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.services.runners.expression import (
+    ExpressionMatrix,
+    as_expression_matrix,
+    is_sparse,
+)
+from app.services.runners.parallel import pairwise_matrix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BINS = 10
+DEFAULT_TILE_SIZE = 256
+# Bincount keys (pairs x cells) materialized per batch (~32 MB of int64)
+DEFAULT_MAX_ELEMENTS = 4 * 1024 * 1024
+
+
+def discretize(
+    values: Union[np.ndarray, sparse.spmatrix],
+    n_bins: int = DEFAULT_BINS,
+    clip: float = 3.0,
+    chunk_rows: int = 1024,
+) -> np.ndarray:
+    """
+    Z-score each gene (row) and bin it into ``n_bins`` equal-width codes.
+
+    Bins span [-clip, clip]; values outside fall into the outer bins.
+    Constant genes land in a single bin. Sparse inputs are densified only
+    ``chunk_rows`` genes at a time.
+    """
+    n_genes = values.shape[0]
+    edges = np.linspace(-clip, clip, n_bins + 1)[1:-1]
+    dtype = np.uint8 if n_bins <= 256 else np.uint16
+    codes = np.empty(values.shape, dtype=dtype)
+
+    for start in range(0, n_genes, chunk_rows):
+        stop = min(start + chunk_rows, n_genes)
+        chunk = values[start:stop]
+        x = chunk.toarray() if is_sparse(chunk) else chunk
+        x = np.asarray(x, dtype=np.float64)
+        mean = x.mean(axis=1, keepdims=True)
+        std = x.std(axis=1, keepdims=True)
+        std[std == 0] = 1.0
+        codes[start:stop] = np.digitize((x - mean) / std, edges)
+
+    return codes
+
+
+def _xlogx(counts: np.ndarray) -> np.ndarray:
+    """Elementwise c * log(c) with 0 * log(0) = 0."""
+    out = np.zeros_like(counts, dtype=np.float64)
+    nz = counts > 0
+    out[nz] = counts[nz] * np.log(counts[nz])
+    return out
+
+
+def marginal_xlogx(codes: np.ndarray, n_bins: int) -> np.ndarray:
+    """Per-gene sum of c * log(c) over its bin counts."""
+    n_genes, _ = codes.shape
+    offsets = (np.arange(n_genes) * n_bins)[:, None]
+    counts = np.bincount((codes + offsets).ravel(), minlength=n_genes * n_bins)
+    return _xlogx(counts.reshape(n_genes, n_bins)).sum(axis=1)
+
+
+def joint_counts(
+    codes: np.ndarray,
+    rows: slice,
+    cols: slice,
+    n_bins: int,
+    max_elements: int = DEFAULT_MAX_ELEMENTS,
+) -> np.ndarray:
+    """
+    Joint histograms for every (row gene, col gene) pair of a tile.
+
+    Each pair gets its own range of ``n_bins ** 2`` slots, so a single
+    offset ``bincount`` counts many pairs at once. Returns an array of
+    shape (n_rows, n_cols, n_bins, n_bins).
+    """
+    n_rows = codes[rows].shape[0]
+    n_cols, n_cells = codes[cols].shape
+    slots = n_bins * n_bins
+    step = max(1, max_elements // max(n_cols * n_cells, 1))
+    key_type = np.int32 if step * n_cols * slots < 2**31 else np.int64
+
+    # Fold the pair offset into the column codes and the row offset into
+    # the row codes so each batch of keys is a single broadcast add
+    b = (
+        codes[cols].astype(key_type)
+        + (np.arange(n_cols, dtype=key_type) * slots)[:, None]
+    )
+    a = codes[rows].astype(key_type) * n_bins
+
+    counts = np.empty((n_rows, n_cols * slots), dtype=np.int64)
+    for start in range(0, n_rows, step):
+        stop = min(start + step, n_rows)
+        row_offsets = (np.arange(stop - start, dtype=key_type) * (n_cols * slots))[
+            :, None
+        ]
+        keys = (a[start:stop] + row_offsets)[:, None, :] + b[None]
+        counts[start:stop] = np.bincount(
+            keys.ravel(), minlength=(stop - start) * n_cols * slots
+        ).reshape(stop - start, n_cols * slots)
+
+    return counts.reshape(n_rows, n_cols, n_bins, n_bins)
+
+
+def mutual_information_block(
+    codes: np.ndarray,
+    rows: slice,
+    cols: slice,
+    n_bins: int,
+    marginals: np.ndarray,
+    max_elements: int = DEFAULT_MAX_ELEMENTS,
+) -> np.ndarray:
+    """
+    Mutual information (nats) for a tile of gene pairs.
+
+    ``marginals`` is the output of ``marginal_xlogx`` for all genes.
+    """
+    n_cells = codes.shape[1]
+    joint = _xlogx(joint_counts(codes, rows, cols, n_bins, max_elements)).sum(
+        axis=(2, 3)
+    )
+
+    # MI = log n + (sum c_xy log c_xy - sum c_x log c_x - sum c_y log c_y) / n
+    mi = (
+        np.log(n_cells)
+        + (joint - marginals[rows][:, None] - marginals[cols][None, :]) / n_cells
+    )
+    return np.maximum(mi, 0.0)
+
+
+def mutual_information_matrix(
+    data: Union[ExpressionMatrix, pd.DataFrame, np.ndarray],
+    n_bins: int = DEFAULT_BINS,
+    tile_size: Optional[int] = None,
+    max_elements: int = DEFAULT_MAX_ELEMENTS,
+    n_workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Symmetric gene-by-gene MI matrix with a zero diagonal.
+
+    Args:
+        data: Genes x cells expression matrix.
+        n_bins: Number of equal-width bins per gene.
+        tile_size: Genes per tile.
+        max_elements: Upper bound on bincount keys materialized at once.
+        n_workers: Worker processes; defaults to PAIRWISE_WORKERS.
+    """
+    codes = discretize(as_expression_matrix(data).values, n_bins)
+    n_genes = codes.shape[0]
+    tile_size = tile_size or DEFAULT_TILE_SIZE
+
+    logger.info(f"Computing mutual information for {n_genes} genes (tile={tile_size})")
+
+    context = {
+        "n_bins": n_bins,
+        "marginals": marginal_xlogx(codes, n_bins),
+        "max_elements": max_elements,
+    }
+    mi = pairwise_matrix(codes, mutual_information_block, tile_size, n_workers, context)
+    np.fill_diagonal(mi, 0.0)
+    return mi
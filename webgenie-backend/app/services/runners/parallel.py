@@ -0,0 +1,272 @@
+"""
+Multi-core execution of pairwise gene kernels.
+
+The input matrix is copied once into ``multiprocessing.shared_memory`` and
+every worker process attaches to it by name, so tasks only carry tile
+coordinates. Dense arrays and CSR matrices (as data/indices/indptr
+segments) are supported. A pairwise kernel is any picklable top-level callable
+
+    kernel(matrix, rows: slice, cols: slice, **context) -> np.ndarray
+
+returning the (rows x cols) block of scores. Blocks are yielded back to the
+caller as they complete, which merges them into a dense matrix, a memmap
+or an edge accumulator.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import ExitStack
+from itertools import islice
+from multiprocessing import shared_memory
+import logging
+import os
+
+import numpy as np
+from scipy import sparse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PairwiseKernel = Callable[..., np.ndarray]
+Tile = Tuple[int, int, int, int]
+
+# Tiles per worker; more tiles smooth out uneven tile costs
+TILES_PER_WORKER = 4
+
+# Per-process state populated by the pool initializer
+_worker_state: Dict[str, Any] = {}
+
+
+class SharedMatrix:
+    """A NumPy array stored in a named shared memory segment."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape, dtype, owner: bool):
+        """Wrap an existing segment."""
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = owner
+        self.array: np.ndarray = np.ndarray(
+            self.shape, dtype=self.dtype, buffer=shm.buf
+        )
+
+    @classmethod
+    def create(cls, array: np.ndarray) -> "SharedMatrix":
+        """Copy ``array`` into a new shared segment."""
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = cls(shm, array.shape, array.dtype, owner=True)
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, name: str, shape, dtype) -> "SharedMatrix":
+        """Attach to a segment created by another process."""
+        # Pool workers share the creator's resource tracker, so the segment
+        # stays registered exactly once and is unlinked by the owner only
+        shm = shared_memory.SharedMemory(name=name)
+        shared = cls(shm, shape, dtype, owner=False)
+        shared.array.flags.writeable = False
+        return shared
+
+    @property
+    def name(self) -> str:
+        """Segment name."""
+        return self.shm.name
+
+    def close(self) -> None:
+        """Detach and, for the owner, free the segment."""
+        # Drop the view first; a segment cannot close while it is exported
+        self.array = np.empty(0, dtype=self.dtype)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self) -> "SharedMatrix":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def resolve_workers(n_workers: Optional[int] = None) -> int:
+    """Number of worker processes; 0 or None means one per CPU."""
+    n_workers = settings.PAIRWISE_WORKERS if n_workers is None else n_workers
+    if not n_workers or n_workers < 0:
+        n_workers = os.cpu_count() or 1
+    return n_workers
+
+
+def plan_tiles(n_genes: int, tile_size: int) -> List[Tile]:
+    """
+    Upper block-triangle tiles as (row_start, row_stop, col_start, col_stop).
+
+    Tiles are ordered by decreasing cost so that the largest are scheduled
+    first and stragglers are small.
+    """
+    tiles = []
+    for i0 in range(0, n_genes, tile_size):
+        i1 = min(i0 + tile_size, n_genes)
+        for j0 in range(i0, n_genes, tile_size):
+            tiles.append((i0, i1, j0, min(j0 + tile_size, n_genes)))
+    tiles.sort(key=lambda t: (t[1] - t[0]) * (t[3] - t[2]), reverse=True)
+    return tiles
+
+
+def balanced_tile_size(n_genes: int, tile_size: int, n_workers: int) -> int:
+    """Shrink ``tile_size`` until every worker gets several tiles."""
+    target_tiles = n_workers * TILES_PER_WORKER
+    while tile_size > 64:
+        n_blocks = -(-n_genes // tile_size)
+        if n_blocks * (n_blocks + 1) // 2 >= target_tiles:
+            break
+        tile_size //= 2
+    return max(1, tile_size)
+
+
+def share_matrix(matrix, stack: ExitStack) -> Dict[str, Any]:
+    """
+    Copy a dense or sparse matrix into shared memory.
+
+    Segments are released when ``stack`` closes. Returns a picklable spec
+    for ``attach_matrix``.
+    """
+    if sparse.issparse(matrix):
+        csr = matrix.tocsr()
+        arrays = [csr.data, csr.indices, csr.indptr]
+        kind = "csr"
+    else:
+        arrays = [np.asarray(matrix)]
+        kind = "dense"
+
+    parts = [stack.enter_context(SharedMatrix.create(a)) for a in arrays]
+    return {
+        "kind": kind,
+        "shape": tuple(matrix.shape),
+        "parts": [(p.name, p.shape, p.dtype.str) for p in parts],
+    }
+
+
+def attach_matrix(spec: Dict[str, Any]) -> Tuple[List[SharedMatrix], Any]:
+    """Rebuild a matrix shared by ``share_matrix``; returns (handles, matrix)."""
+    handles = [SharedMatrix.attach(*part) for part in spec["parts"]]
+    if spec["kind"] == "csr":
+        data, indices, indptr = (h.array for h in handles)
+        matrix = sparse.csr_matrix(
+            (data, indices, indptr), shape=spec["shape"], copy=False
+        )
+    else:
+        matrix = handles[0].array
+    return handles, matrix
+
+
+def _init_worker(spec: Dict[str, Any], kernel: PairwiseKernel, context) -> None:
+    """Attach the shared matrix once per worker process."""
+    try:
+        # Parallelism comes from the pool; keep BLAS single-threaded per worker
+        from threadpoolctl import threadpool_limits
+
+        _worker_state["blas_limits"] = threadpool_limits(limits=1)
+    except ImportError:
+        pass
+
+    _worker_state["handles"], _worker_state["matrix"] = attach_matrix(spec)
+    _worker_state["kernel"] = kernel
+    _worker_state["context"] = context
+
+
+def _run_tile(tile: Tile) -> Tuple[int, int, np.ndarray]:
+    """Evaluate the kernel on one tile inside a worker."""
+    i0, i1, j0, j1 = tile
+    kernel = _worker_state["kernel"]
+    matrix = _worker_state["matrix"]
+    return (
+        i0,
+        j0,
+        kernel(matrix, slice(i0, i1), slice(j0, j1), **_worker_state["context"]),
+    )
+
+
+def iter_pairwise_blocks(
+    matrix: Union[np.ndarray, sparse.spmatrix],
+    kernel: PairwiseKernel,
+    tile_size: int,
+    n_workers: Optional[int] = None,
+    context: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    Yield (row_start, col_start, block) for the upper block triangle.
+
+    Blocks arrive in completion order. With a single worker, or a single
+    tile, the kernel runs in-process without shared memory.
+    """
+    context = context or {}
+    n_genes = matrix.shape[0]
+    n_workers = resolve_workers(n_workers)
+    if n_workers > 1:
+        tile_size = balanced_tile_size(n_genes, tile_size, n_workers)
+    tiles = plan_tiles(n_genes, tile_size)
+
+    if n_workers <= 1 or len(tiles) <= 1:
+        for i0, i1, j0, j1 in tiles:
+            yield i0, j0, kernel(matrix, slice(i0, i1), slice(j0, j1), **context)
+        return
+
+    n_workers = min(n_workers, len(tiles))
+    logger.info(
+        f"Running {getattr(kernel, '__name__', 'kernel')} on {len(tiles)} tiles "
+        f"with {n_workers} workers"
+    )
+
+    with ExitStack() as stack:
+        spec = share_matrix(matrix, stack)
+        pool = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=n_workers,
+                initializer=_init_worker,
+                initargs=(spec, kernel, context),
+            )
+        )
+        # Keep a bounded window of tiles in flight so finished blocks
+        # never pile up faster than the caller merges them
+        pending = set()
+        queue = iter(tiles)
+        for tile in queue:
+            pending.add(pool.submit(_run_tile, tile))
+            if len(pending) >= 2 * n_workers:
+                break
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                for tile in islice(queue, 1):
+                    pending.add(pool.submit(_run_tile, tile))
+
+
+def pairwise_matrix(
+    matrix: Union[np.ndarray, sparse.spmatrix],
+    kernel: PairwiseKernel,
+    tile_size: int,
+    n_workers: Optional[int] = None,
+    context: Optional[Dict[str, Any]] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Fill a symmetric (genes x genes) float32 matrix from a pairwise kernel.
+
+    ``out`` may be a preallocated array or memmap.
+    """
+    n_genes = matrix.shape[0]
+    if out is None:
+        out = np.empty((n_genes, n_genes), dtype=np.float32)
+
+    for i0, j0, block in iter_pairwise_blocks(
+        matrix, kernel, tile_size, n_workers, context
+    ):
+        out[i0 : i0 + block.shape[0], j0 : j0 + block.shape[1]] = block
+        if i0 != j0:
+            out[j0 : j0 + block.shape[1], i0 : i0 + block.shape[0]] = block.T
+
+    return out
@@ -0,0 +1,517 @@
+"""
+Lazy readers for expression datasets.
+
+A ``DatasetReader`` exposes a genes x cells dataset without loading it:
+callers read cell (column) or gene (row) ranges on demand, or stream the
+cells chunk by chunk into accumulating kernels (see ``streaming``). Every
+slice comes back as an ``ExpressionMatrix``, sparse where the source is.
+
+Supported sources:
+    - CSV/TSV, served from the memory-mapped dataset cache
+    - ``.h5ad`` opened backed through h5py (dense, CSR or CSC ``X``)
+    - AnnData ``.zarr`` stores (requires ``zarr``)
+    - ``.loom`` files
+    - 10x Genomics MTX directories (matrix.mtx, features.tsv, barcodes.tsv)
+"""
+
+from typing import Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+import gzip
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.core.config import settings
+from app.services.runners.expression import ExpressionMatrix
+
+logger = logging.getLogger(__name__)
+
+# Coordinate entries parsed per chunk when scanning an MTX file
+MTX_CHUNK_ENTRIES = 1_000_000
+
+_MTX_NAMES = ("matrix.mtx.gz", "matrix.mtx")
+_FEATURE_NAMES = ("features.tsv.gz", "features.tsv", "genes.tsv.gz", "genes.tsv")
+_BARCODE_NAMES = ("barcodes.tsv.gz", "barcodes.tsv")
+
+
+def _labels(values) -> pd.Index:
+    """Gene or cell labels as a string index (h5py returns bytes)."""
+    values = np.asarray(values)
+    if values.dtype.kind in ("S", "O"):
+        values = [v.decode() if isinstance(v, bytes) else str(v) for v in values]
+    return pd.Index(values)
+
+
+def _default_chunk(chunk_size: Optional[int]) -> int:
+    """Cells per chunk, defaulting to READER_CHUNK_CELLS."""
+    return max(1, int(chunk_size or settings.READER_CHUNK_CELLS))
+
+
+class DatasetReader:
+    """Genes x cells dataset whose values are read on demand."""
+
+    genes: pd.Index
+    cells: pd.Index
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(n_genes, n_cells)."""
+        return len(self.genes), len(self.cells)
+
+    @property
+    def estimated_bytes(self) -> int:
+        """Approximate memory needed to load the whole dataset."""
+        raise NotImplementedError
+
+    def read_cells(self, start: int, stop: int) -> ExpressionMatrix:
+        """All genes for cells ``start:stop``."""
+        raise NotImplementedError
+
+    def read_genes(self, start: int, stop: int) -> ExpressionMatrix:
+        """Genes ``start:stop`` across all cells."""
+        raise NotImplementedError
+
+    def iter_cell_chunks(
+        self, chunk_size: Optional[int] = None
+    ) -> Iterator[Tuple[int, ExpressionMatrix]]:
+        """Yield (cell_start, chunk) covering every cell in order."""
+        chunk_size = _default_chunk(chunk_size)
+        n_cells = self.shape[1]
+        for start in range(0, n_cells, chunk_size):
+            yield start, self.read_cells(start, min(start + chunk_size, n_cells))
+
+    def iter_gene_chunks(
+        self, chunk_size: Optional[int] = None
+    ) -> Iterator[Tuple[int, ExpressionMatrix]]:
+        """Yield (gene_start, chunk) covering every gene in order."""
+        chunk_size = _default_chunk(chunk_size)
+        n_genes = self.shape[0]
+        for start in range(0, n_genes, chunk_size):
+            yield start, self.read_genes(start, min(start + chunk_size, n_genes))
+
+    def to_matrix(self) -> ExpressionMatrix:
+        """Load the whole dataset."""
+        return self.read_cells(0, self.shape[1])
+
+    def close(self) -> None:
+        """Release file handles."""
+
+    def __enter__(self) -> "DatasetReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.shape[0]} genes x {self.shape[1]} cells)"
+
+
+class ArrayReader(DatasetReader):
+    """Reader over an in-memory or memory-mapped ``ExpressionMatrix``."""
+
+    def __init__(self, matrix: ExpressionMatrix):
+        """Initialize array reader."""
+        self.matrix = matrix
+        self.genes = matrix.genes
+        self.cells = matrix.cells
+
+    @property
+    def estimated_bytes(self) -> int:
+        values = self.matrix.values
+        if self.matrix.is_sparse:
+            return values.data.nbytes + values.indices.nbytes + values.indptr.nbytes
+        return values.nbytes
+
+    def read_cells(self, start: int, stop: int) -> ExpressionMatrix:
+        return ExpressionMatrix(
+            self.matrix.values[:, start:stop], self.genes, self.cells[start:stop]
+        )
+
+    def read_genes(self, start: int, stop: int) -> ExpressionMatrix:
+        return ExpressionMatrix(
+            self.matrix.values[start:stop], self.genes[start:stop], self.cells
+        )
+
+    def to_matrix(self) -> ExpressionMatrix:
+        return self.matrix
+
+
+class AnnDataStoreReader(DatasetReader):
+    """
+    Backed reader for the AnnData on-disk layout (h5ad groups or zarr).
+
+    ``X`` is cells x genes. Dense ``X`` is sliced directly; for CSR ``X``
+    cell ranges are read through ``indptr`` and gene ranges by scanning
+    cell chunks (and the reverse for CSC).
+    """
+
+    def __init__(self, root):
+        """Initialize from an open h5py file or zarr group."""
+        self._root = root
+        self._x = root["X"]
+        self.cells = self._read_index(root["obs"])
+        self.genes = self._read_index(root["var"])
+
+        attrs = self._x.attrs
+        encoding = attrs.get("encoding-type") or attrs.get("h5sparse_format") or ""
+        if encoding in ("csr_matrix", "csr"):
+            self._format = "csr"
+        elif encoding in ("csc_matrix", "csc"):
+            self._format = "csc"
+        else:
+            self._format = "dense"
+
+    @staticmethod
+    def _read_index(group) -> pd.Index:
+        """Read the obs/var index column."""
+        key = group.attrs.get("_index", "_index")
+        return _labels(group[key][...])
+
+    @property
+    def estimated_bytes(self) -> int:
+        if self._format == "dense":
+            return int(np.prod(self._x.shape)) * self._x.dtype.itemsize
+        data = self._x["data"]
+        return int(data.shape[0]) * (data.dtype.itemsize + 4)
+
+    def _read_major(self, start: int, stop: int, n_minor: int) -> sparse.csr_matrix:
+        """Rows ``start:stop`` of the compressed axis as a CSR block."""
+        indptr = np.asarray(self._x["indptr"][start : stop + 1], dtype=np.int64)
+        p0, p1 = int(indptr[0]), int(indptr[-1])
+        return sparse.csr_matrix(
+            (self._x["data"][p0:p1], self._x["indices"][p0:p1], indptr - p0),
+            shape=(stop - start, n_minor),
+        )
+
+    def _scan_minor(self, start: int, stop: int, n_major: int, n_minor: int):
+        """Columns ``start:stop`` of the compressed axis, one major chunk at a time."""
+        step = _default_chunk(None)
+        blocks = [
+            self._read_major(m0, min(m0 + step, n_major), n_minor)[:, start:stop]
+            for m0 in range(0, n_major, step)
+        ]
+        if not blocks:
+            return sparse.csr_matrix((0, stop - start))
+        return sparse.vstack(blocks, format="csr")
+
+    def read_cells(self, start: int, stop: int) -> ExpressionMatrix:
+        n_genes, n_cells = self.shape
+        if self._format == "dense":
+            values = np.ascontiguousarray(self._x[start:stop].T)
+        elif self._format == "csr":
+            values = self._read_major(start, stop, n_genes).T.tocsr()
+        else:
+            values = self._scan_minor(start, stop, n_genes, n_cells)
+        return ExpressionMatrix(values, self.genes, self.cells[start:stop])
+
+    def read_genes(self, start: int, stop: int) -> ExpressionMatrix:
+        n_genes, n_cells = self.shape
+        if self._format == "dense":
+            values = np.ascontiguousarray(self._x[:, start:stop].T)
+        elif self._format == "csc":
+            values = self._read_major(start, stop, n_cells)
+        else:
+            values = self._scan_minor(start, stop, n_cells, n_genes).T.tocsr()
+        return ExpressionMatrix(values, self.genes[start:stop], self.cells)
+
+
+class H5adReader(AnnDataStoreReader):
+    """Backed ``.h5ad`` reader; only requested slices are read from disk."""
+
+    def __init__(self, file_path: Union[str, Path]):
+        """Open the file read-only."""
+        import h5py
+
+        self._file = h5py.File(file_path, "r")
+        try:
+            super().__init__(self._file)
+        except Exception:
+            self._file.close()
+            raise
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ZarrReader(AnnDataStoreReader):
+    """AnnData ``.zarr`` store reader."""
+
+    def __init__(self, store_path: Union[str, Path]):
+        """Open the store read-only."""
+        import zarr
+
+        super().__init__(zarr.open_group(str(store_path), mode="r"))
+
+
+class LoomReader(DatasetReader):
+    """``.loom`` reader; ``/matrix`` is stored genes x cells."""
+
+    def __init__(self, file_path: Union[str, Path]):
+        """Open the file read-only."""
+        import h5py
+
+        self._file = h5py.File(file_path, "r")
+        self._matrix = self._file["matrix"]
+        n_genes, n_cells = self._matrix.shape
+        self.genes = self._attr("row_attrs", ("Gene", "Accession"), n_genes)
+        self.cells = self._attr("col_attrs", ("CellID",), n_cells)
+
+    def _attr(self, group: str, names, size: int) -> pd.Index:
+        """First available label attribute, or positional labels."""
+        attrs = self._file.get(group)
+        for name in names:
+            if attrs is not None and name in attrs:
+                return _labels(attrs[name][...])
+        return pd.Index(np.arange(size))
+
+    @property
+    def estimated_bytes(self) -> int:
+        return int(np.prod(self._matrix.shape)) * self._matrix.dtype.itemsize
+
+    def read_cells(self, start: int, stop: int) -> ExpressionMatrix:
+        return ExpressionMatrix(
+            self._matrix[:, start:stop], self.genes, self.cells[start:stop]
+        )
+
+    def read_genes(self, start: int, stop: int) -> ExpressionMatrix:
+        return ExpressionMatrix(
+            self._matrix[start:stop, :], self.genes[start:stop], self.cells
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _open_text(path: Path):
+    """Open a possibly gzipped text file."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt")
+    return open(path, "r")
+
+
+def _find_file(directory: Path, names) -> Optional[Path]:
+    """First of ``names`` present in ``directory``."""
+    for name in names:
+        if (directory / name).exists():
+            return directory / name
+    return None
+
+
+class MtxReader(DatasetReader):
+    """
+    10x Genomics Matrix Market reader (features x barcodes).
+
+    The coordinate file is scanned in chunks and never held whole.
+    ``iter_cell_chunks`` needs a single pass and relies on entries being
+    sorted by barcode, as Cell Ranger writes them. Every ``read_cells`` and
+    ``read_genes`` call scans the whole file; ``iter_gene_chunks`` scans it
+    once and holds the matrix as CSR.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Locate the matrix, features and barcodes files."""
+        path = Path(path)
+        directory = path if path.is_dir() else path.parent
+        matrix_file = path if path.is_file() else _find_file(directory, _MTX_NAMES)
+        if matrix_file is None:
+            raise FileNotFoundError(f"No matrix.mtx found in {directory}")
+        self.matrix_file = matrix_file
+
+        self._read_header()
+
+        features = _find_file(directory, _FEATURE_NAMES)
+        barcodes = _find_file(directory, _BARCODE_NAMES)
+        if features is not None:
+            table = pd.read_csv(features, sep="\t", header=None, dtype=str)
+            self.genes = _labels(table.iloc[:, 1 if table.shape[1] > 1 else 0])
+        else:
+            self.genes = pd.Index(np.arange(self._n_rows))
+        if barcodes is not None:
+            table = pd.read_csv(barcodes, sep="\t", header=None, dtype=str)
+            self.cells = _labels(table.iloc[:, 0])
+        else:
+            self.cells = pd.Index(np.arange(self._n_cols))
+
+        if self.shape != (self._n_rows, self._n_cols):
+            raise ValueError(
+                f"Labels ({len(self.genes)} x {len(self.cells)}) do not match "
+                f"matrix size ({self._n_rows} x {self._n_cols})"
+            )
+
+    def _read_header(self) -> None:
+        """Parse the banner and size line."""
+        with _open_text(self.matrix_file) as f:
+            banner = f.readline().lower().split()
+            if len(banner) < 5 or banner[1:3] != ["matrix", "coordinate"]:
+                raise ValueError(f"Not a coordinate Matrix Market file: {banner}")
+            if banner[4] != "general":
+                raise ValueError(f"Unsupported Matrix Market symmetry: {banner[4]}")
+
+            skip = 1
+            line = f.readline()
+            while line.startswith("%"):
+                line = f.readline()
+                skip += 1
+
+        self._skip_rows = skip + 1
+        self._pattern = banner[3] == "pattern"
+        self._n_rows, self._n_cols, self._nnz = (int(v) for v in line.split())
+
+    @property
+    def estimated_bytes(self) -> int:
+        # CSR float32 values plus int32 indices
+        return self._nnz * 8 + (self._n_rows + 1) * 8
+
+    def _iter_entries(self) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield zero-based (rows, cols, values) chunks in file order."""
+        names = ["row", "col"] if self._pattern else ["row", "col", "value"]
+        for chunk in pd.read_csv(
+            self.matrix_file,
+            sep=r"\s+",
+            header=None,
+            names=names,
+            skiprows=self._skip_rows,
+            chunksize=MTX_CHUNK_ENTRIES,
+        ):
+            rows = chunk["row"].to_numpy(dtype=np.int64) - 1
+            cols = chunk["col"].to_numpy(dtype=np.int64) - 1
+            if self._pattern:
+                values = np.ones(len(chunk), dtype=np.float32)
+            else:
+                values = chunk["value"].to_numpy(dtype=np.float32)
+            yield rows, cols, values
+
+    def _block(self, rows, cols, values, shape) -> sparse.csr_matrix:
+        """Assemble collected entries into a CSR block."""
+        if rows:
+            rows, cols, values = (np.concatenate(a) for a in (rows, cols, values))
+        else:
+            rows = cols = np.empty(0, np.int64)
+            values = np.empty(0, np.float32)
+        return sparse.csr_matrix((values, (rows, cols)), shape=shape)
+
+    def read_cells(self, start: int, stop: int) -> ExpressionMatrix:
+        rows, cols, values = [], [], []
+        for r, c, v in self._iter_entries():
+            keep = (c >= start) & (c < stop)
+            rows.append(r[keep])
+            cols.append(c[keep] - start)
+            values.append(v[keep])
+        block = self._block(rows, cols, values, (self._n_rows, stop - start))
+        return ExpressionMatrix(block, self.genes, self.cells[start:stop])
+
+    def read_genes(self, start: int, stop: int) -> ExpressionMatrix:
+        rows, cols, values = [], [], []
+        for r, c, v in self._iter_entries():
+            keep = (r >= start) & (r < stop)
+            rows.append(r[keep] - start)
+            cols.append(c[keep])
+            values.append(v[keep])
+        block = self._block(rows, cols, values, (stop - start, self._n_cols))
+        return ExpressionMatrix(block, self.genes[start:stop], self.cells)
+
+    def iter_cell_chunks(
+        self, chunk_size: Optional[int] = None
+    ) -> Iterator[Tuple[int, ExpressionMatrix]]:
+        chunk_size = _default_chunk(chunk_size)
+        n_chunks = -(-self._n_cols // chunk_size)
+        current = 0
+        last_col = -1
+        rows: List[np.ndarray] = []
+        cols: List[np.ndarray] = []
+        values: List[np.ndarray] = []
+
+        def emit(index: int) -> Tuple[int, ExpressionMatrix]:
+            start = index * chunk_size
+            stop = min(start + chunk_size, self._n_cols)
+            block = self._block(rows, cols, values, (self._n_rows, stop - start))
+            rows.clear()
+            cols.clear()
+            values.clear()
+            return start, ExpressionMatrix(block, self.genes, self.cells[start:stop])
+
+        for r, c, v in self._iter_entries():
+            if len(c) == 0:
+                continue
+            if c[0] < last_col or (np.diff(c) < 0).any():
+                raise ValueError(
+                    f"{self.matrix_file} is not sorted by barcode; "
+                    f"use read_cells or to_matrix instead"
+                )
+            last_col = c[-1]
+
+            chunk_ids = c // chunk_size
+            while chunk_ids[-1] > current:
+                split = np.searchsorted(chunk_ids, current, side="right")
+                rows.append(r[:split])
+                cols.append(c[:split] - current * chunk_size)
+                values.append(v[:split])
+                yield emit(current)
+                current += 1
+                r, c, v, chunk_ids = r[split:], c[split:], v[split:], chunk_ids[split:]
+
+            rows.append(r)
+            cols.append(c - current * chunk_size)
+            values.append(v)
+
+        while current < n_chunks:
+            yield emit(current)
+            current += 1
+
+    def iter_gene_chunks(
+        self, chunk_size: Optional[int] = None
+    ) -> Iterator[Tuple[int, ExpressionMatrix]]:
+        # No gene range is complete before the end of a barcode-sorted file
+        chunk_size = _default_chunk(chunk_size)
+        matrix = self.to_matrix().values
+        for start in range(0, self._n_rows, chunk_size):
+            stop = min(start + chunk_size, self._n_rows)
+            yield start, ExpressionMatrix(
+                matrix[start:stop], self.genes[start:stop], self.cells
+            )
+
+
+def open_dataset(
+    file_path: Union[str, Path],
+    use_cache: Optional[bool] = None,
+) -> DatasetReader:
+    """
+    Open an expression dataset lazily, choosing a reader by format.
+
+    Raises:
+        ValueError: If the format is not recognized.
+        ImportError: If the reader's optional dependency is missing.
+    """
+    path = Path(file_path)
+    name = path.name.lower()
+
+    if path.is_dir():
+        if _find_file(path, _MTX_NAMES) is not None:
+            return MtxReader(path)
+        if (path / ".zgroup").exists():
+            return ZarrReader(path)
+        raise ValueError(f"Unrecognized dataset directory: {path}")
+
+    if name.endswith(".csv") or name.endswith(".tsv"):
+        if use_cache is None:
+            use_cache = settings.DATASET_CACHE_ENABLED
+        sep = "\t" if name.endswith(".tsv") else ","
+        if use_cache:
+            from app.services.dataset_cache import dataset_cache
+
+            frame = dataset_cache.load_delimited(path, sep=sep)
+        else:
+            frame = pd.read_csv(path, sep=sep, index_col=0)
+        return ArrayReader(ExpressionMatrix.from_frame(frame))
+    if name.endswith(".h5ad"):
+        return H5adReader(path)
+    if name.endswith(".loom"):
+        return LoomReader(path)
+    if name.endswith(".zarr"):
+        return ZarrReader(path)
+    if name.endswith(".mtx") or name.endswith(".mtx.gz"):
+        return MtxReader(path)
+
+    raise ValueError(f"Unknown file format: {file_path}")
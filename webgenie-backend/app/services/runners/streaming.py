@@ -0,0 +1,171 @@
+"""
+Accumulating kernels over streamed cell chunks.
+
+These kernels see a dataset only through ``DatasetReader.iter_cell_chunks``
+and keep per-gene or per-gene-pair running sums, so their memory depends on
+the number of genes rather than the number of cells. Correlation is built
+from Gram sums over bands of regulator genes, one pass over the cells per
+band.
+"""
+
+from typing import Any, Dict, Iterator, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from app.services.runners.edges import EdgeAccumulator
+from app.services.runners.readers import DatasetReader
+
+logger = logging.getLogger(__name__)
+
+
+def accumulate_moments(
+    reader: DatasetReader,
+    chunk_cells: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Per-gene sums, sums of squares and non-zero counts in one pass."""
+    n_genes = reader.shape[0]
+    sums = np.zeros(n_genes, dtype=np.float64)
+    sq_sums = np.zeros(n_genes, dtype=np.float64)
+    nnz = np.zeros(n_genes, dtype=np.int64)
+
+    for _, chunk in reader.iter_cell_chunks(chunk_cells):
+        values = chunk.values
+        if chunk.is_sparse:
+            values = values.astype(np.float64)
+            sums += np.asarray(values.sum(axis=1)).ravel()
+            sq_sums += np.asarray(values.multiply(values).sum(axis=1)).ravel()
+            nnz += np.diff(values.indptr)
+        else:
+            x = np.asarray(values, dtype=np.float64)
+            sums += x.sum(axis=1)
+            sq_sums += np.einsum("ij,ij->i", x, x)
+            nnz += np.count_nonzero(x, axis=1)
+
+    return {"sums": sums, "sq_sums": sq_sums, "nnz": nnz, "n_cells": reader.shape[1]}
+
+
+def streaming_gene_statistics(
+    reader: DatasetReader,
+    chunk_cells: Optional[int] = None,
+) -> pd.DataFrame:
+    """``gene_statistics`` computed without loading the dataset."""
+    moments = accumulate_moments(reader, chunk_cells)
+    n_cells = moments["n_cells"]
+    mean = moments["sums"] / n_cells
+    ddof = n_cells - 1 if n_cells > 1 else 1
+    var = np.maximum(moments["sq_sums"] - n_cells * mean**2, 0.0) / ddof
+
+    return pd.DataFrame(
+        {
+            "mean": mean,
+            "variance": var,
+            "nnz": moments["nnz"],
+            "dropout": 1.0 - moments["nnz"] / n_cells,
+        },
+        index=reader.genes,
+    )
+
+
+def accumulate_gram(
+    reader: DatasetReader,
+    rows: slice,
+    cols: slice,
+    chunk_cells: Optional[int] = None,
+) -> np.ndarray:
+    """Sum over cells of x_i * x_j for genes ``rows`` x ``cols`` (float64)."""
+    n_genes = reader.shape[0]
+    n_rows = len(range(*rows.indices(n_genes)))
+    n_cols = len(range(*cols.indices(n_genes)))
+    gram = np.zeros((n_rows, n_cols), dtype=np.float64)
+
+    for _, chunk in reader.iter_cell_chunks(chunk_cells):
+        values = chunk.values
+        if chunk.is_sparse:
+            values = values.astype(np.float64)
+            gram += (values[rows] @ values[cols].T).toarray()
+        else:
+            x = np.asarray(values, dtype=np.float64)
+            gram += x[rows] @ x[cols].T
+
+    return gram
+
+
+def plan_band_rows(n_genes: int, memory_budget: int) -> int:
+    """Regulator genes per pass so the Gram band uses half the budget."""
+    per_row = max(n_genes, 1) * 8
+    return max(1, min(n_genes, (memory_budget // 2) // per_row))
+
+
+def iter_streaming_correlation_blocks(
+    reader: DatasetReader,
+    band_rows: Optional[int] = None,
+    chunk_cells: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    Yield (row_start, col_start, block) correlation bands.
+
+    Each band covers regulators ``row_start:row_start + band_rows`` against
+    every gene from ``row_start`` on, i.e. the upper block triangle. One
+    moments pass is followed by one pass over the cells per band.
+    """
+    from app.services.runners.correlation import default_memory_budget
+
+    n_genes = reader.shape[0]
+    if band_rows is None:
+        band_rows = plan_band_rows(n_genes, memory_budget or default_memory_budget())
+
+    moments = accumulate_moments(reader, chunk_cells)
+    n_cells = moments["n_cells"]
+    means = moments["sums"] / n_cells
+    centered = np.maximum(moments["sq_sums"] - n_cells * means**2, 0.0)
+    with np.errstate(divide="ignore"):
+        inv_norms = np.where(centered > 0, 1.0 / np.sqrt(centered), np.nan)
+
+    n_bands = -(-n_genes // band_rows)
+    logger.info(
+        f"Streaming correlation for {n_genes} genes over {n_cells} cells "
+        f"({n_bands} bands of {band_rows} genes)"
+    )
+
+    for i0 in range(0, n_genes, band_rows):
+        i1 = min(i0 + band_rows, n_genes)
+        gram = accumulate_gram(reader, slice(i0, i1), slice(i0, n_genes), chunk_cells)
+        cov = gram - n_cells * np.outer(means[i0:i1], means[i0:])
+        corr = cov * inv_norms[i0:i1, None] * inv_norms[None, i0:]
+        yield i0, i0, np.clip(corr, -1.0, 1.0).astype(np.float32)
+
+
+def stream_dataset_correlation_edges(
+    reader: DatasetReader,
+    threshold: Optional[float] = None,
+    top_k: Optional[int] = None,
+    per_target_top_k: Optional[int] = None,
+    absolute: bool = True,
+    band_rows: Optional[int] = None,
+    chunk_cells: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Correlation edges for a dataset that need not fit in memory.
+
+    Selection semantics match ``stream_correlation_edges``.
+    """
+    accumulator = EdgeAccumulator(
+        reader.shape[0],
+        threshold=threshold,
+        top_k=top_k,
+        per_target_top_k=per_target_top_k,
+        absolute=absolute,
+    )
+    for i0, j0, block in iter_streaming_correlation_blocks(
+        reader, band_rows, chunk_cells, memory_budget
+    ):
+        accumulator.add_block(block, i0, j0)
+        if per_target_top_k is not None and block.shape[1] > block.shape[0]:
+            # The band's off-diagonal part also scores targets below it
+            accumulator.add_block(block[:, block.shape[0] :].T, j0 + block.shape[0], i0)
+
+    return accumulator.to_table(reader.genes)
@@ -3,10 +3,13 @@ Generic runner template and utilities for algorithm execution.
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 from pathlib import Path
 import pandas as pd
 
+from app.services.runners.expression import ExpressionMatrix, as_expression_matrix
+from app.services.runners.readers import DatasetReader, open_dataset
+
 
 logger = logging.getLogger(__name__)
 
@@ -29,36 +32,82 @@ class BaseRunner:
         """Run algorithm. Must be implemented by subclasses."""
         raise NotImplementedError
 
-    def validate_input(self, input_file: str) -> bool:
-        """Validate input file."""
+    def load_input(self, input_file: str) -> Optional[DatasetReader]:
+        """
+        Validate and open the input file in a single pass.
+
+        Only the header and shape are checked; the returned reader is what
+        the runner computes on, so the file is never parsed twice.
+        Returns None if validation fails.
+        """
         try:
             if not Path(input_file).exists():
                 self.logger.error(f"Input file not found: {input_file}")
-                return False
+                return None
+
+            if input_file.endswith(".csv") or input_file.endswith(".tsv"):
+                sep = "\t" if input_file.endswith(".tsv") else ","
+                header = pd.read_csv(input_file, sep=sep, index_col=0, nrows=1)
+                if header.empty:
+                    self.logger.error("Input file is empty")
+                    return None
 
-            df = pd.read_csv(input_file)
-            if df.empty:
+            reader = open_dataset(input_file)
+            n_genes, n_cells = reader.shape
+            if n_genes == 0 or n_cells == 0:
                 self.logger.error("Input file is empty")
-                return False
+                reader.close()
+                return None
 
-            self.logger.info(f"Input validation passed: {input_file}")
-            return True
+            self.logger.info(
+                f"Input validation passed: {input_file} "
+                f"({n_genes} genes x {n_cells} cells)"
+            )
+            return reader
 
         except Exception as e:
             self.logger.error(f"Input validation failed: {str(e)}")
+            return None
+
+    def validate_input(self, input_file: str) -> bool:
+        """Validate input file."""
+        reader = self.load_input(input_file)
+        if reader is None:
             return False
+        reader.close()
+        return True
 
-    def validate_output(self, output_file: str) -> bool:
-        """Validate output file."""
+    def validate_output(
+        self,
+        output_file: str,
+        network: Optional[pd.DataFrame] = None,
+    ) -> bool:
+        """
+        Validate output file.
+
+        When the in-memory ``network`` that was saved is given, it is
+        checked instead of re-reading the file.
+        """
         try:
-            if not Path(output_file).exists():
+            output_path = Path(output_file)
+            if not output_path.exists():
                 self.logger.error(f"Output file not found: {output_file}")
                 return False
 
-            df = pd.read_csv(output_file, sep="\t", header=None)
-            if df.empty:
-                self.logger.error("Output file is empty")
-                return False
+            if network is not None:
+                if network.empty or output_path.stat().st_size == 0:
+                    self.logger.error("Output file is empty")
+                    return False
+                if network.shape[1] < 3:
+                    self.logger.error(
+                        f"Output network has {network.shape[1]} columns, expected 3"
+                    )
+                    return False
+            else:
+                df = pd.read_csv(output_file, sep="\t", header=None)
+                if df.empty:
+                    self.logger.error("Output file is empty")
+                    return False
 
             self.logger.info(f"Output validation passed: {output_file}")
             return True
@@ -76,33 +125,43 @@ class BaseRunner:
         return {}
 
 
-def load_expression_data(file_path: str) -> Optional[pd.DataFrame]:
-    """Load expression data from file."""
+def load_expression_matrix(
+    file_path: str,
+    use_cache: Optional[bool] = None,
+) -> Optional[ExpressionMatrix]:
+    """
+    Load expression data as a genes x cells ``ExpressionMatrix``.
+
+    Files are opened through ``readers.open_dataset``: CSV/TSV files are
+    served as memory-mapped matrices from the dataset cache (see
+    ``app.services.dataset_cache``), and h5ad, loom, zarr and 10x MTX
+    matrices stay sparse where they are stored sparse.
+    """
     try:
-        if file_path.endswith(".csv"):
-            return pd.read_csv(file_path, index_col=0)
-        elif file_path.endswith(".tsv"):
-            return pd.read_csv(file_path, sep="\t", index_col=0)
-        elif file_path.endswith(".h5ad"):
-            try:
-                import anndata
-                adata = anndata.read_h5ad(file_path)
-                return pd.DataFrame(
-                    adata.X.T,
-                    index=adata.var_names,
-                    columns=adata.obs_names,
-                )
-            except ImportError:
-                logger.error("anndata not installed, cannot read h5ad files")
-                return None
-        else:
-            logger.warning(f"Unknown file format: {file_path}")
-            return None
+        with open_dataset(file_path, use_cache=use_cache) as reader:
+            return reader.to_matrix()
+    except ImportError as e:
+        logger.error(f"Missing dependency for {file_path}: {str(e)}")
+        return None
     except Exception as e:
         logger.error(f"Failed to load expression data: {str(e)}")
         return None
 
 
+def load_expression_data(
+    file_path: str,
+    use_cache: Optional[bool] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Load expression data from file as a dense DataFrame.
+
+    Prefer ``load_expression_matrix`` for single-cell data; this densifies
+    sparse matrices.
+    """
+    matrix = load_expression_matrix(file_path, use_cache=use_cache)
+    return matrix.to_frame() if matrix is not None else None
+
+
 def save_network(
     network_df: pd.DataFrame,
     output_file: str,
@@ -139,41 +198,76 @@ def save_network(
         return False
 
 
-def compute_correlation(data: pd.DataFrame) -> pd.DataFrame:
-    """Compute Pearson correlation matrix."""
-    return data.T.corr()
-
-
-def compute_mutual_information(data: pd.DataFrame) -> pd.DataFrame:
-    """Compute mutual information matrix."""
-    from sklearn.preprocessing import scale
-    from scipy.stats import entropy
-    import numpy as np
-
-    n_genes = data.shape[0]
-    mi_matrix = np.zeros((n_genes, n_genes))
-
-    scaled_data = scale(data.T, axis=0).T
-
-    for i in range(n_genes):
-        for j in range(i + 1, n_genes):
-            gene_i = scaled_data[i]
-            gene_j = scaled_data[j]
-
-            # Digitize to 10 bins
-            digitized_i = np.digitize(gene_i, np.linspace(-3, 3, 10))
-            digitized_j = np.digitize(gene_j, np.linspace(-3, 3, 10))
-
-            # Compute MI
-            pxy = np.histogram2d(digitized_i, digitized_j, bins=10)[0] / len(gene_i)
-            px = np.histogram(digitized_i, bins=10)[0] / len(gene_i)
-            py = np.histogram(digitized_j, bins=10)[0] / len(gene_j)
-
-            px_py = np.outer(px, py)
-            nz = pxy > 0
-
-            mi = np.sum(pxy[nz] * np.log(pxy[nz] / (px_py[nz] + 1e-10)))
-            mi_matrix[i, j] = mi
-            mi_matrix[j, i] = mi
-
-    return pd.DataFrame(mi_matrix)
+def compute_correlation(
+    data: Union[pd.DataFrame, ExpressionMatrix],
+    tile_size: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+    n_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Compute Pearson correlation matrix (float32).
+
+    The matrix is computed in tiles, in parallel across ``n_workers``
+    processes; sparse inputs are never densified. When the result does not
+    fit the memory budget it is backed by a memory-mapped file under
+    TEMP_DIR instead of RAM, unlinked once mapped so it is freed with the
+    result.
+    """
+    import uuid
+    from app.core.config import settings
+    from app.services.runners.correlation import (
+        correlation_memmap,
+        default_memory_budget,
+        plan_tile_size,
+        prepare_correlation,
+    )
+    from app.services.runners.parallel import pairwise_matrix, resolve_workers
+
+    n_genes, n_cells = data.shape
+    memory_budget = memory_budget or default_memory_budget()
+    n_workers = resolve_workers(n_workers)
+    dense_bytes = n_genes * n_genes * 4
+
+    if dense_bytes > memory_budget // 2:
+        path = settings.TEMP_DIR / f"correlation-{uuid.uuid4().hex}.npy"
+        logger.info(f"Correlation matrix exceeds memory budget, using memmap: {path}")
+        try:
+            matrix = correlation_memmap(data, path, tile_size, memory_budget, n_workers)
+        finally:
+            # The open mapping keeps the data; the file goes with the DataFrame
+            path.unlink(missing_ok=True)
+        genes = as_expression_matrix(data).genes
+    else:
+        values, kernel, context, genes, resident = prepare_correlation(data)
+        tile = plan_tile_size(
+            n_genes,
+            n_cells,
+            tile_size,
+            memory_budget - dense_bytes,
+            n_workers,
+            resident,
+        )
+        matrix = pairwise_matrix(values, kernel, tile, n_workers, context)
+
+    return pd.DataFrame(matrix, index=genes, columns=genes, copy=False)
+
+
+def compute_mutual_information(
+    data: Union[pd.DataFrame, ExpressionMatrix],
+    n_bins: int = 10,
+    tile_size: Optional[int] = None,
+    n_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Compute mutual information matrix.
+
+    Genes are discretized once into ``n_bins`` z-score bins and joint
+    histograms are built for whole tiles of gene pairs at a time.
+    """
+    from app.services.runners.mutual_info import mutual_information_matrix
+
+    genes = as_expression_matrix(data).genes
+    mi_matrix = mutual_information_matrix(
+        data, n_bins=n_bins, tile_size=tile_size, n_workers=n_workers
+    )
+    return pd.DataFrame(mi_matrix, index=genes, columns=genes, copy=False)
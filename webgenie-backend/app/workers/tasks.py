@@ -5,12 +5,24 @@ Celery task definitions for asynchronous job execution.
 import os
 import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from pathlib import Path
 
 from app.core.tasks import celery_app
+from app.models.job import JobStatusEnum
 from app.services.inference_service import inference_service
+from app.services.job_events import publish_job_event
+from app.services.job_repository import job_repository
+from app.services.job_scheduler import job_scheduler
+from app.services.network_compare import compare_stores
+from app.services.network_evaluation import write_evaluation
+from app.services.network_export import export_network
+from app.services.network_sketch import compare_job_networks
+from app.services.network_store import load_job_network, load_network
+from app.services.process_supervisor import execution_loop
+from app.services.result_cache import finish_job, settle_attached
+from app.services.network_summary import load_summary
 
 logger = logging.getLogger(__name__)
 
@@ -31,20 +43,47 @@ def run_inference_job(
             extra={"job_id": job_id, "algorithm": algorithm},
         )
 
+        task_id = self.request.id
+
+        def report(percent: float, message: str) -> None:
+            # Called from the execution loop's threads, outside the task context
+            self.update_state(
+                task_id=task_id,
+                state="PROGRESS",
+                meta={"current": percent, "total": 100, "status": message},
+            )
+            publish_job_event(
+                job_id, JobStatusEnum.RUNNING, progress=percent, message=message
+            )
+
         # Update task state to running
         self.update_state(
             state="PROGRESS",
             meta={"current": 0, "total": 100, "status": "Initializing algorithm"},
         )
+        publish_job_event(
+            job_id,
+            JobStatusEnum.RUNNING,
+            progress=0,
+            message="Initializing algorithm",
+            started=True,
+        )
 
-        # Run algorithm
-        result = inference_service.run_algorithm(
-            job_id=job_id,
-            dataset_id=dataset_id,
-            algorithm=algorithm,
-            dataset_path=dataset_path,
-            parameters=parameters,
+        # Run algorithm on the pool process's event loop and wait for it
+        result = execution_loop.run(
+            inference_service.run_algorithm(
+                job_id=job_id,
+                dataset_id=dataset_id,
+                algorithm=algorithm,
+                dataset_path=dataset_path,
+                parameters=parameters,
+                on_progress=report,
+            )
         )
+        publish_job_event(job_id, JobStatusEnum.COMPLETED, progress=100)
+
+        # Cache the outputs and complete jobs waiting on them
+        finish_job(job_id, succeeded=True)
 
         logger.info(
             f"Inference task completed",
@@ -54,10 +93,21 @@ def run_inference_job(
         return result
 
     except Exception as e:
+        job = job_repository.get(job_id)
+        if job is not None and job["status"] == JobStatusEnum.CANCELLED.value:
+            # Revoked by cancel_job; the run has already been stopped
+            logger.info(
+                f"Inference task stopped after cancellation",
+                extra={"job_id": job_id, "algorithm": algorithm},
+            )
+            raise
+
         logger.error(
             f"Inference task failed: {str(e)}",
             extra={"job_id": job_id, "algorithm": algorithm},
         )
+        publish_job_event(job_id, JobStatusEnum.FAILED, error_message=str(e))
+        finish_job(job_id, succeeded=False, error_message=str(e))
         self.update_state(
             state="FAILURE",
             meta={
@@ -67,6 +117,23 @@ def run_inference_job(
         )
         raise
 
+    finally:
+        # Free the job's admission lease and start whatever now fits
+        job_scheduler.release(job_id)
+
+
+@celery_app.task(name="app.workers.tasks.schedule_pending_jobs")
+def schedule_pending_jobs() -> Dict[str, Any]:
+    """Release stale leases, settle orphaned attached jobs, admit what fits."""
+    try:
+        released = job_scheduler.reconcile()
+        settled = settle_attached()
+        admitted = job_scheduler.admit_pending()
+        return {"released": released, "settled": settled, "admitted": admitted}
+    except Exception as e:
+        logger.error(f"Scheduling pass failed: {str(e)}")
+        raise
+
 
 @celery_app.task(bind=True, name="app.workers.tasks.compare_networks")
 def compare_networks(
@@ -76,31 +143,12 @@ def compare_networks(
 ) -> Dict[str, Any]:
     """Compare two GRN networks."""
     try:
-        import pandas as pd
-
         logger.info("Starting network comparison")
 
-        # Load networks
-        net1 = pd.read_csv(network_file_1, sep="\t", header=None)
-        net2 = pd.read_csv(network_file_2, sep="\t", header=None)
-
-        # Convert to edge sets
-        edges1 = set(zip(net1[0], net1[1]))
-        edges2 = set(zip(net2[0], net2[1]))
-
-        # Compute metrics
-        intersection = edges1 & edges2
-        union = edges1 | edges2
-        jaccard_index = len(intersection) / len(union) if len(union) > 0 else 0
-
-        result = {
-            "jaccard_index": float(jaccard_index),
-            "overlap_edges": len(intersection),
-            "edges_only_in_1": len(edges1 - edges2),
-            "edges_only_in_2": len(edges2 - edges1),
-            "total_edges_1": len(edges1),
-            "total_edges_2": len(edges2),
-        }
+        # Integer-encoded set and rank comparison
+        result = compare_stores(
+            load_network(network_file_1), load_network(network_file_2)
+        )
 
         logger.info(f"Network comparison completed: {result}")
         return result
@@ -110,6 +158,57 @@ def compare_networks(
         raise
 
 
+@celery_app.task(bind=True, name="app.workers.tasks.compare_many_networks")
+def compare_many_networks(self, job_ids: List[str]) -> Dict[str, Any]:
+    """All-pairs similarity matrix across the networks of several jobs."""
+    try:
+        logger.info(f"Starting batch comparison of {len(job_ids)} networks")
+
+        def report(done: int, total: int) -> None:
+            self.update_state(
+                state="PROGRESS",
+                meta={"current": done, "total": total, "status": "Comparing networks"},
+            )
+
+        result = compare_job_networks(job_ids, progress=report)
+
+        logger.info(
+            f"Batch comparison completed: {len(result['job_ids'])} networks, "
+            f"{len(result['missing'])} missing"
+        )
+        return result
+
+    except Exception as e:
+        logger.error(f"Batch comparison failed: {str(e)}")
+        raise
+
+
+@celery_app.task(name="app.workers.tasks.evaluate_result")
+def evaluate_result(
+    network_file: str,
+    reference_file: str,
+    n_bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Evaluate a result network with bootstrap intervals and store the metrics."""
+    try:
+        logger.info(f"Evaluating {network_file} with {n_bootstrap} replicates")
+
+        # The replicates run in a process pool on the worker, not the API
+        return write_evaluation(
+            network_file,
+            reference_file,
+            n_bootstrap=n_bootstrap,
+            confidence=confidence,
+            seed=seed,
+        )
+
+    except Exception as e:
+        logger.error(f"Evaluation failed: {str(e)}")
+        raise
+
+
 @celery_app.task(
     name="app.workers.tasks.cleanup_old_results",
     expires=3600,
@@ -128,7 +227,7 @@ def cleanup_old_results(days: int = 7) -> Dict[str, Any]:
         deleted_size = 0
 
         for job_dir in results_dir.iterdir():
-            if not job_dir.is_dir():
+            if not job_dir.is_dir() or job_dir == settings.RESULT_CACHE_DIR:
                 continue
 
             # Check if directory is older than cutoff
@@ -136,9 +235,7 @@ def cleanup_old_results(days: int = 7) -> Dict[str, Any]:
             if mtime < cutoff_time:
                 try:
                     size = sum(
-                        f.stat().st_size
-                        for f in job_dir.rglob("*")
-                        if f.is_file()
+                        f.stat().st_size for f in job_dir.rglob("*") if f.is_file()
                     )
                     shutil.rmtree(job_dir)
                     deleted_count += 1
@@ -166,34 +263,18 @@ def cleanup_old_results(days: int = 7) -> Dict[str, Any]:
 def compute_metrics(result_file: str) -> Dict[str, Any]:
     """Compute metrics for a result network."""
     try:
-        import pandas as pd
-
         logger.info(f"Computing metrics for {result_file}")
 
-        network = pd.read_csv(result_file, sep="\t", header=None)
-
-        # Compute basic network metrics
-        num_edges = len(network)
-        nodes = set(network[0]) | set(network[1])
-        num_nodes = len(nodes)
-        density = (2 * num_edges) / (num_nodes * (num_nodes - 1))
-
-        # Degree statistics
-        degree_dict = {}
-        for _, row in network.iterrows():
-            degree_dict[row[0]] = degree_dict.get(row[0], 0) + 1
-            degree_dict[row[1]] = degree_dict.get(row[1], 0) + 1
-
-        degrees = list(degree_dict.values())
-        avg_degree = sum(degrees) / len(degrees) if degrees else 0
-        max_degree = max(degrees) if degrees else 0
-
+        summary = load_summary(result_file)
         metrics = {
-            "total_edges": int(num_edges),
-            "num_nodes": int(num_nodes),
-            "density": float(density),
-            "avg_degree": float(avg_degree),
-            "max_degree": int(max_degree),
+            key: summary[key]
+            for key in (
+                "total_edges",
+                "num_nodes",
+                "density",
+                "avg_degree",
+                "max_degree",
+            )
         }
 
         logger.info(f"Metrics computed: {metrics}")
@@ -205,7 +286,9 @@ def compute_metrics(result_file: str) -> Dict[str, Any]:
 
 
 @celery_app.task(name="app.workers.tasks.export_results")
-def export_results(job_id: str, export_format: str = "json") -> Dict[str, Any]:
+def export_results(
+    job_id: str, export_format: str = "json", compress: bool = False
+) -> Dict[str, Any]:
     """Export job results in specified format."""
     try:
         from app.core.config import settings
@@ -220,51 +303,19 @@ def export_results(job_id: str, export_format: str = "json") -> Dict[str, Any]:
         export_dir.mkdir(parents=True, exist_ok=True)
 
         # Copy and convert files based on format
-        network_file = None
-        for f in job_dir.glob("*_network.*"):
-            if f.is_file():
-                network_file = f
-                break
-
-        if network_file is None:
+        network = load_job_network(job_dir)
+        if network is None:
             raise FileNotFoundError("No network file found in job directory")
 
-        if export_format == "json":
-            import pandas as pd
-            import json
-
-            network = pd.read_csv(network_file, sep="\t", header=None)
-            export_file = export_dir / "network.json"
-
-            data = {
-                "edges": [
-                    {"source": row[0], "target": row[1], "weight": row[2] if len(row) > 2 else 1.0}
-                    for _, row in network.iterrows()
-                ]
-            }
-
-            with open(export_file, "w") as f:
-                json.dump(data, f, indent=2)
-
-        elif export_format == "graphml":
-            import pandas as pd
-            import networkx as nx
-
-            network = pd.read_csv(network_file, sep="\t", header=None)
-            G = nx.DiGraph()
-
-            for _, row in network.iterrows():
-                weight = row[2] if len(row) > 2 else 1.0
-                G.add_edge(row[0], row[1], weight=weight)
-
-            export_file = export_dir / "network.graphml"
-            nx.write_graphml(G, str(export_file))
+        # Streamed from the binary store one batch at a time
+        export_file = export_network(network, export_dir, export_format, compress)
 
         logger.info(f"Results exported to {export_file}")
 
         return {
             "export_format": export_format,
             "export_file": str(export_file),
+            "compressed": compress,
         }
 
     except Exception as e:
@@ -2,12 +2,19 @@
 Pytest configuration and fixtures.
 """
 
+import os
 import pytest
 from fastapi.testclient import TestClient
 from pathlib import Path
 import tempfile
 import json
 
+# Keep the job database out of the working tree
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{Path(tempfile.mkdtemp(prefix='webgenie-test-')) / 'webgenie.db'}",
+)
+
 from app.main import app
 from app.core.config import settings
 
@@ -0,0 +1,849 @@
+"""
+Tests for job persistence.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from celery.exceptions import SoftTimeLimitExceeded
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.core import database
+from app.core.config import settings
+from app.models.job import JobStatusEnum
+from app.services import (
+    job_events,
+    job_logs,
+    job_routing,
+    job_scheduler,
+    jobs_service,
+    process_supervisor,
+    result_cache,
+)
+from app.services.dataset_cache import DatasetCache
+from app.services.job_scheduler import ResourceLedger
+from app.services.job_repository import JobRepository
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def repository(temp_data_dir, monkeypatch):
+    """Job repository on a fresh SQLite database."""
+    engine = database.create_database_engine(f"sqlite:///{temp_data_dir / 'jobs.db'}")
+    monkeypatch.setattr(database, "_engine", engine)
+    monkeypatch.setattr(
+        database, "_session_factory", sessionmaker(bind=engine, expire_on_commit=False)
+    )
+    yield JobRepository()
+    engine.dispose()
+
+
+def _job(job_id, created_at, **fields):
+    job = {
+        "id": job_id,
+        "name": f"Job {job_id}",
+        "dataset_id": "ds-1",
+        "algorithm": "GRNBOOST2",
+        "status": "pending",
+        "parameters": {"alpha": 0.5},
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+    job.update(fields)
+    return job
+
+
+def test_job_repository_round_trip(repository):
+    """Jobs are created, updated row by row, and listed newest first."""
+    start = datetime(2024, 1, 1)
+    for i in range(5):
+        repository.create(
+            _job(f"job-{i}", start + timedelta(minutes=i), algorithm=f"ALG{i % 2}")
+        )
+
+    assert repository.get("missing") is None
+    assert repository.update("missing", status="running") is None
+
+    updated = repository.update(
+        "job-3", status="completed", ended_at=start, progress=100
+    )
+    assert updated["status"] == "completed"
+    assert updated["ended_at"] == start
+    assert updated["updated_at"] > start
+    assert repository.get("job-3")["parameters"] == {"alpha": 0.5}
+
+    page = repository.list_jobs(skip=1, limit=2)
+    assert (page["total"], page["total_is_estimate"]) == (5, False)
+    assert [j["id"] for j in page["items"]] == ["job-3", "job-2"]
+
+    page = repository.list_jobs(algorithm="ALG0")
+    assert page["total"] == 3
+    assert [j["id"] for j in page["items"]] == ["job-4", "job-2", "job-0"]
+
+    page = repository.list_jobs(status="completed")
+    assert (page["total"], page["items"][0]["id"]) == (1, "job-3")
+
+
+def test_job_repository_keyset_pages(repository, monkeypatch):
+    """Cursor pages cover every job once, including created_at ties."""
+    monkeypatch.setattr(settings, "JOB_COUNT_LIMIT", 4)
+    start = datetime(2024, 1, 1)
+    for i in range(7):
+        # Pairs of jobs share a timestamp; the id breaks the tie
+        repository.create(_job(f"job-{i}", start + timedelta(minutes=i // 2)))
+
+    seen, cursor = [], None
+    while True:
+        page = repository.list_jobs(limit=3, cursor=cursor, summary=True)
+        seen.extend(j["id"] for j in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"job-{i}" for i in reversed(range(7))]
+    # Past the count cap the total is flagged as an estimate
+    assert (page["total"], page["total_is_estimate"]) == (5, True)
+    assert set(page["items"][0]) == {
+        "id",
+        "name",
+        "dataset_id",
+        "algorithm",
+        "status",
+        "progress",
+        "created_at",
+        "started_at",
+        "ended_at",
+    }
+
+    with pytest.raises(ValueError):
+        repository.list_jobs(cursor="not-a-cursor")
+
+
+def test_job_repository_imports_legacy_metadata(repository, temp_data_dir):
+    """The old JSON metadata file is imported once and then set aside."""
+    repository.create(_job("job-a", datetime(2024, 1, 1), status="completed"))
+    metadata_file = temp_data_dir / "jobs_metadata.json"
+    legacy = {
+        "job-a": _job("job-a", "2023-01-01T00:00:00"),
+        "job-b": _job("job-b", "2023-01-02T00:00:00", ended_at="2023-01-02T01:00:00"),
+    }
+    metadata_file.write_text(json.dumps(legacy))
+
+    assert repository.import_json(metadata_file) == 1
+    assert not metadata_file.exists()
+    assert (temp_data_dir / "jobs_metadata.json.imported").exists()
+    assert repository.import_json(metadata_file) == 0
+
+    assert repository.get("job-a")["status"] == "completed"
+    assert repository.get("job-b")["ended_at"] == datetime(2023, 1, 2, 1)
+
+    # A process that read the file before another imported it skips those rows
+    legacy["job-c"] = _job("job-c", "2023-01-03T00:00:00")
+    metadata_file.write_text(json.dumps(legacy))
+    assert repository.import_json(metadata_file) == 1
+    assert repository.get("job-c") is not None
+
+
+def test_list_jobs_summary_view(client, repository):
+    """The listing endpoint pages with cursors and returns summaries."""
+    for i in range(3):
+        repository.create(_job(f"job-{i}", datetime(2024, 1, 1, i)))
+
+    response = client.get("/api/v1/jobs", params={"view": "summary", "limit": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert [j["id"] for j in data["items"]] == ["job-2", "job-1"]
+    assert "parameters" not in data["items"][0]
+    assert data["page"] == 1
+
+    response = client.get(
+        "/api/v1/jobs", params={"view": "summary", "cursor": data["next_cursor"]}
+    )
+    data = response.json()
+    assert [j["id"] for j in data["items"]] == ["job-0"]
+    assert data["next_cursor"] is None and data["page"] is None
+
+    response = client.get("/api/v1/jobs", params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+
+class _FakeRedis:
+    """Records published messages."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+def test_job_events_update_store_and_stream(client, repository, monkeypatch):
+    """Events update the job row, are published, and reach stream clients."""
+    fake = _FakeRedis()
+    monkeypatch.setattr(job_events, "_get_publisher", lambda: fake)
+    repository.create(_job("job-1", datetime(2024, 1, 1), status="submitted"))
+    repository.create(_job("job-2", datetime(2024, 1, 2), status="completed"))
+
+    job = job_events.publish_job_event(
+        "job-1", JobStatusEnum.RUNNING, progress=150, started=True
+    )
+    assert (job["status"], job["progress"]) == ("running", 100)
+    assert job["started_at"] is not None and job["ended_at"] is None
+    assert fake.published[0][0] == job_events.JOB_EVENTS_CHANNEL
+    assert fake.published[0][1]["job_id"] == "job-1"
+    assert job_events.publish_job_event("missing", JobStatusEnum.FAILED) is None
+    # A late event cannot move a finished job out of its final status
+    late = job_events.publish_job_event("job-2", JobStatusEnum.RUNNING, progress=50)
+    assert late is None
+    assert repository.get("job-2")["status"] == "completed"
+    assert len(fake.published) == 1
+
+    async def replay(self):
+        # Stand-in for the Redis subscription: one event for each job
+        for job_id in ("job-2", "job-1"):
+            self.dispatch({"job_id": job_id, "status": "completed", "progress": 100.0})
+
+    monkeypatch.setattr(job_events.JobEventBroker, "_listen", replay)
+    with client.stream(
+        "GET", "/api/v1/jobs/stream", params={"job_id": ["job-1", "job-2"]}
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [
+        (block.split("\n")[0][len("event: ") :], json.loads(block.split("\n")[1][6:]))
+        for block in body.strip().split("\n\n")
+    ]
+    assert [(name, data["id"]) for name, data in events[:2]] == [
+        ("snapshot", "job-1"),
+        ("snapshot", "job-2"),
+    ]
+    # The stream closes once every watched job has finished
+    assert [(name, data["job_id"]) for name, data in events[2:]] == [
+        ("job", "job-2"),
+        ("job", "job-1"),
+    ]
+
+
+def test_log_range_and_tail_reads(temp_data_dir, monkeypatch):
+    """Range and tail reads seek instead of loading the whole log."""
+    monkeypatch.setattr(job_logs, "LOG_BLOCK_SIZE", 7)
+    log_file = temp_data_dir / "execution.log"
+    lines = [f"line {i}\n" for i in range(100)]
+    log_file.write_text("".join(lines))
+    size = log_file.stat().st_size
+
+    page = job_logs.read_log_range(log_file, offset=7, max_bytes=14)
+    assert page["content"] == "line 1\nline 2\n"
+    assert (page["offset"], page["next_offset"], page["size"]) == (7, 21, size)
+    assert job_logs.read_log_range(log_file, offset=size + 5)["content"] == ""
+
+    tail = job_logs.read_log_tail(log_file, lines=3)
+    assert tail["content"] == "".join(lines[-3:])
+    assert tail["offset"] == size - len("".join(lines[-3:]))
+    assert tail["next_offset"] == size
+    assert job_logs.read_log_tail(log_file, lines=0)["content"] == ""
+    # max_bytes bounds the tail even when fewer lines were found
+    assert job_logs.read_log_tail(log_file, lines=50, max_bytes=16)["content"] == (
+        "line 98\nline 99\n"
+    )
+    assert job_logs.read_log_tail(log_file)["content"] == "".join(lines)
+
+
+def test_follow_log_yields_appended_lines(temp_data_dir):
+    """Follow mode yields whole appended lines and drains on finish."""
+    log_file = temp_data_dir / "execution.log"
+    log_file.write_text("first\npart")
+    state = {"polls": 0, "finished": False}
+
+    def is_finished():
+        # Runs in a worker thread, off the event loop
+        assert threading.current_thread() is not threading.main_thread()
+        state["polls"] += 1
+        if state["polls"] == 3:
+            with open(log_file, "a") as f:
+                f.write("ial\nlast")
+        if state["polls"] == 5:
+            state["finished"] = True
+        return state["finished"]
+
+    async def collect():
+        return [
+            chunk
+            async for chunk in job_logs.follow_log(log_file, 0, is_finished, interval=0)
+        ]
+
+    chunks = asyncio.run(collect())
+    assert [c["content"] for c in chunks] == ["first\n", "partial\n", "last"]
+    assert [c["offset"] for c in chunks] == [0, 6, 14]
+    assert chunks[-1]["next_offset"] == log_file.stat().st_size
+
+
+def test_job_logs_endpoint(client, repository, temp_data_dir):
+    """The logs endpoint returns bounded slices and streams to the end."""
+    log_file = temp_data_dir / "execution.log"
+    log_file.write_text("".join(f"line {i}\n" for i in range(10)))
+    repository.create(
+        _job("job-1", datetime(2024, 1, 1), status="completed", log_file=str(log_file))
+    )
+
+    data = client.get("/api/v1/jobs/job-1/logs", params={"tail": 2}).json()
+    assert data["logs"] == "line 8\nline 9\n"
+    assert data["timestamp"].startswith("2024-01-01")
+
+    data = client.get("/api/v1/jobs/job-1/logs", params={"offset": 63}).json()
+    assert (data["logs"], data["next_offset"], data["size"]) == ("line 9\n", 70, 70)
+
+    with client.stream(
+        "GET", "/api/v1/jobs/job-1/logs/stream", headers={"Last-Event-ID": "56"}
+    ) as response:
+        body = "".join(response.iter_text())
+    assert body.startswith("id: 70\nevent: log\n")
+    assert json.loads(body.split("data: ")[1])["content"] == "line 8\nline 9\n"
+
+
+def test_supervised_process_logs_output_and_exit_code(temp_data_dir):
+    """A run appends stdout and stderr to its log and returns the exit code."""
+    log = temp_data_dir / "run.log"
+    log.write_text("queued\n")
+    for code in (0, 2):
+        assert (
+            process_supervisor.execution_loop.run(
+                process_supervisor.run_process(
+                    ["sh", "-c", f"echo out{code}; echo err{code} >&2; exit {code}"],
+                    log,
+                )
+            )
+            == code
+        )
+    assert log.read_text() == "queued\nout0\nerr0\nout2\nerr2\n"
+
+
+def test_supervised_process_timeout_stops_group(temp_data_dir):
+    """A timeout runs the stop hook and kills the whole process group."""
+    marker = temp_data_dir / "survived"
+    stopped = []
+
+    async def on_stop():
+        stopped.append(True)
+
+    async def run():
+        await process_supervisor.run_process(
+            ["sh", "-c", f"(sleep 1; touch {marker}) & sleep 5"],
+            temp_data_dir / "run.log",
+            timeout=0.2,
+            on_stop=on_stop,
+        )
+
+    with pytest.raises(process_supervisor.ProcessTimeout):
+        process_supervisor.execution_loop.run(run())
+    time.sleep(1.2)
+    assert stopped == [True]
+    assert not marker.exists()
+
+
+def test_revoked_run_stops_process_group(temp_data_dir):
+    """A revoke with SIGUSR1 stops the run's container hook and process group."""
+    log = temp_data_dir / "run.log"
+    marker = temp_data_dir / "survived"
+    stopped = []
+
+    async def on_stop():
+        stopped.append(True)
+
+    def soft_timeout(signum, frame):
+        # What billiard's pool process does on SIGUSR1
+        raise SoftTimeLimitExceeded()
+
+    def revoke():
+        while not log.exists() or not log.read_text():
+            time.sleep(0.02)
+        os.kill(os.getpid(), signal.SIGUSR1)
+
+    previous = signal.signal(signal.SIGUSR1, soft_timeout)
+    threading.Thread(target=revoke, daemon=True).start()
+    try:
+        with pytest.raises(SoftTimeLimitExceeded):
+            process_supervisor.execution_loop.run(
+                process_supervisor.run_process(
+                    ["sh", "-c", f"echo started; (sleep 1; touch {marker}) & sleep 30"],
+                    log,
+                    on_stop=on_stop,
+                )
+            )
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+    # The exception propagates only after the run was stopped
+    assert stopped == [True]
+    time.sleep(1.2)
+    assert not marker.exists()
+
+
+class _MemoryLedger:
+    """In-process stand-in for the Redis resource ledger."""
+
+    def __init__(self):
+        self.held = {}
+
+    def acquire(self, job_id, request, capacity, queue="default", lane_slots=0):
+        if job_id in self.held:
+            return ResourceLedger.ALREADY_HELD
+        in_lane = [lease for lease in self.held.values() if lease.queue == queue]
+        if lane_slots and len(in_lane) + 1 > lane_slots:
+            return ResourceLedger.LANE_FULL
+        if self.held:
+            if len(self.held) + 1 > capacity["jobs"]:
+                return ResourceLedger.FULL
+            if sum(
+                lease.request.memory for lease in self.held.values()
+            ) + request.memory > (capacity["memory"]):
+                return ResourceLedger.FULL
+        self.held[job_id] = job_scheduler.Lease(request, time.time(), queue)
+        return ResourceLedger.ADMITTED
+
+    def release(self, job_id):
+        return self.held.pop(job_id, None) is not None
+
+    def leases(self):
+        return dict(self.held)
+
+
+def test_resource_estimates(temp_data_dir, monkeypatch):
+    """Estimates scale with dataset shape and algorithm, capped by the limit."""
+    monkeypatch.setattr(settings, "ALGORITHM_MEMORY_LIMIT", "1g")
+    dataset = temp_data_dir / "data.csv"
+    dataset.write_text("gene,c1,c2,c3\ng1,1,2,3\ng2,4,5,6\n")
+    assert job_scheduler.dataset_shape(dataset) == (2, 3)
+
+    genie3 = job_scheduler.estimate_resources("GENIE3", 2000, 1000)
+    scode = job_scheduler.estimate_resources("scode", 2000, 1000)
+    assert genie3.cpus > scode.cpus
+    assert scode.memory == job_scheduler.BASE_MEMORY_BYTES + 2 * 2000 * 1000 * 8
+    assert genie3.memory > scode.memory
+    assert job_scheduler.estimate_resources("PIDC", 50_000, 1000).memory == 1024**3
+    assert job_scheduler.read_dataset_shape(temp_data_dir / "missing.csv") == (0, 0)
+
+
+def test_scheduler_capacity_defaults_to_node(monkeypatch):
+    """Unset CPU and memory capacities come from the node, less the headroom."""
+    monkeypatch.setattr(settings, "SCHEDULER_CPU_CAPACITY", None)
+    monkeypatch.setattr(settings, "SCHEDULER_MEMORY_CAPACITY", None)
+    monkeypatch.setattr(settings, "SCHEDULER_MEMORY_HEADROOM", "2g")
+    monkeypatch.setattr(job_scheduler.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(job_scheduler, "node_memory", lambda: 64 * 1024**3)
+    capacity = job_scheduler.JobScheduler(ledger=_MemoryLedger()).capacity()
+    assert (capacity["cpus"], capacity["memory"]) == (16, 62 * 1024**3)
+
+    monkeypatch.setattr(settings, "SCHEDULER_CPU_CAPACITY", 0)
+    monkeypatch.setattr(settings, "SCHEDULER_MEMORY_CAPACITY", "3g")
+    capacity = job_scheduler.JobScheduler(ledger=_MemoryLedger()).capacity()
+    assert (capacity["cpus"], capacity["memory"]) == (0, 3 * 1024**3)
+
+
+def test_scheduler_admits_within_capacity(repository, monkeypatch):
+    """Jobs start only when they fit; finished jobs hand over capacity."""
+    sent = []
+    monkeypatch.setattr(
+        job_scheduler.celery_app,
+        "send_task",
+        lambda name, kwargs, task_id, queue: sent.append((kwargs["job_id"], task_id)),
+    )
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_JOBS", 2)
+    monkeypatch.setattr(settings, "SCHEDULER_MEMORY_CAPACITY", "3g")
+    scheduler = job_scheduler.JobScheduler(ledger=_MemoryLedger())
+
+    now = datetime.utcnow()
+    sizes = {"job-0": 2, "job-1": 2, "job-2": 1, "job-3": 1}
+    for i, (job_id, gib) in enumerate(sizes.items()):
+        repository.create(
+            _job(
+                job_id,
+                now + timedelta(seconds=i),
+                memory_request=gib * 1024**3,
+                cpu_request=1,
+            )
+        )
+
+    # job-1 does not fit next to job-0, so job-2 backfills the free memory
+    assert scheduler.admit_pending() == ["job-0", "job-2"]
+    assert [job_id for job_id, _ in sent] == ["job-0", "job-2"]
+    job = repository.get("job-0")
+    assert (job["status"], job["celery_task_id"]) == ("submitted", sent[0][1])
+    assert repository.get("job-1")["status"] == "pending"
+
+    repository.update("job-0", status="completed")
+    scheduler.release("job-0")
+    assert repository.get("job-1")["status"] == "submitted"
+    assert repository.get("job-3")["status"] == "pending"
+
+    # Once the queue head has waited past the window, nothing overtakes it
+    scheduler.ledger.held["big"] = job_scheduler.Lease(
+        job_scheduler.ResourceRequest(1, 0), time.time()
+    )
+    repository.update("job-2", status="failed")
+    assert sorted(scheduler.reconcile()) == ["big", "job-2"]
+    repository.create(
+        _job("job-4", now - timedelta(hours=1), memory_request=3 * 1024**3)
+    )
+    monkeypatch.setattr(settings, "SCHEDULER_BACKFILL_WINDOW", 60)
+    assert scheduler.admit_pending() == []
+    assert repository.get("job-3")["status"] == "pending"
+
+
+def test_admission_respects_lane_slots(repository, monkeypatch):
+    """Large jobs beyond their lane's workers wait without blocking other lanes."""
+    sent = []
+    monkeypatch.setattr(
+        job_scheduler.celery_app,
+        "send_task",
+        lambda name, kwargs, task_id, queue: sent.append((kwargs["job_id"], queue)),
+    )
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_JOBS", 4)
+    monkeypatch.setattr(settings, "SCHEDULER_MEMORY_CAPACITY", "8g")
+    monkeypatch.setattr(settings, "QUEUE_CONCURRENCY", {"inference": 1, "priority": 4})
+    scheduler = job_scheduler.JobScheduler(ledger=_MemoryLedger())
+
+    now = datetime.utcnow()
+    for i in range(4):
+        repository.create(
+            _job(f"big-{i}", now + timedelta(seconds=i), queue="inference")
+        )
+    for i in range(2):
+        repository.create(
+            _job(f"small-{i}", now + timedelta(seconds=10 + i), queue="priority")
+        )
+
+    assert scheduler.admit_pending() == ["big-0", "small-0", "small-1"]
+    assert sent[0] == ("big-0", "inference")
+    assert repository.get("big-1")["status"] == "pending"
+
+    # The lane's next job starts when its worker frees up
+    repository.update("big-0", status="completed")
+    scheduler.release("big-0")
+    assert repository.get("big-1")["status"] == "submitted"
+    assert repository.get("big-2")["status"] == "pending"
+
+
+def test_admission_skips_jobs_cancelled_before_launch(repository, monkeypatch):
+    """A job cancelled after the pending scan is not sent and holds no lease."""
+    sent = []
+    monkeypatch.setattr(
+        job_scheduler.celery_app,
+        "send_task",
+        lambda name, kwargs, task_id, queue: sent.append(kwargs["job_id"]),
+    )
+    scheduler = job_scheduler.JobScheduler(ledger=_MemoryLedger())
+    repository.create(_job("job-0", datetime.utcnow()))
+    scan = scheduler.repository.pending_jobs
+
+    def scan_then_cancel(limit):
+        jobs = scan(limit)
+        repository.update("job-0", status="cancelled")
+        return jobs
+
+    monkeypatch.setattr(scheduler.repository, "pending_jobs", scan_then_cancel)
+    assert scheduler.admit_pending() == []
+    assert sent == []
+    assert repository.get("job-0")["status"] == "cancelled"
+    assert scheduler.ledger.leases() == {}
+
+
+def test_reconcile_times_launch_grace_from_lease(repository):
+    """A long-pending job's fresh lease survives reconcile; an abandoned one does not."""
+    scheduler = job_scheduler.JobScheduler(ledger=_MemoryLedger())
+    waited = datetime.utcnow() - timedelta(hours=1)
+    repository.create(_job("job-0", waited))
+    repository.create(_job("job-1", waited))
+    request = job_scheduler.ResourceRequest(1, 0)
+    # job-0 was just admitted and is about to launch; job-1's launcher died
+    scheduler.ledger.held["job-0"] = job_scheduler.Lease(request, time.time())
+    scheduler.ledger.held["job-1"] = job_scheduler.Lease(
+        request, time.time() - 2 * job_scheduler.LAUNCH_GRACE_SECONDS
+    )
+    assert scheduler.reconcile() == ["job-1"]
+    assert list(scheduler.ledger.leases()) == ["job-0"]
+
+
+def test_size_aware_routing(client, repository, monkeypatch):
+    """Jobs are routed by cost and lanes report depth and expected wait."""
+    assert job_routing.select_queue("PPCOR", 500, 1000) == "priority"
+    assert job_routing.select_queue("GENIE3", 2000, 2000) == "default"
+    assert job_routing.select_queue("GENIE3", 20000, 5000) == "inference"
+    assert job_routing.select_queue("PPCOR", 0, 0) == "default"
+
+    assert job_routing.expected_wait(0, 1, 4, 60.0) == 0.0
+    assert job_routing.expected_wait(5, 4, 4, 60.0) == 6 * 60.0 / 4
+    assert job_routing.expected_wait(5, 4, 4, None) is None
+
+    monkeypatch.setattr(job_routing, "broker_depth", lambda queue: 3)
+    monkeypatch.setattr(settings, "QUEUE_CONCURRENCY", {"priority": 2})
+    start = datetime(2024, 1, 1)
+    for i, status in enumerate(["pending", "running", "running", "completed"]):
+        repository.create(
+            _job(
+                f"job-{i}",
+                start + timedelta(minutes=i),
+                status=status,
+                queue="priority",
+                started_at=start,
+                ended_at=start + timedelta(seconds=90),
+            )
+        )
+
+    response = client.get("/api/v1/jobs/queues")
+    assert response.status_code == 200
+    lanes = {lane["queue"]: lane for lane in response.json()["queues"]}
+    assert set(lanes) == {"priority", "default", "inference"}
+    priority = lanes["priority"]
+    assert (priority["pending"], priority["running"]) == (1, 2)
+    assert (priority["broker_depth"], priority["workers"]) == (3, 2)
+    assert priority["avg_runtime_seconds"] == 90.0
+    # Both running jobs must finish (one slot for job-0, one for the new
+    # job): 2 x 90 s / 2 workers
+    assert priority["expected_wait_seconds"] == 90
+    assert lanes["default"]["expected_wait_seconds"] is None
+
+
+def _write_result(job_dir, content="g1\tg2\t0.9\n"):
+    job_dir.mkdir(parents=True, exist_ok=True)
+    (job_dir / "GRNBOOST2_network.tsv").write_text(content)
+    (job_dir / "GRNBOOST2_network.store").mkdir(exist_ok=True)
+    (job_dir / "GRNBOOST2_network.store" / "meta.json").write_text("{}")
+    (job_dir / "execution.log").write_text("run log\n")
+
+
+def test_result_cache_keys_links_and_evicts(temp_data_dir, monkeypatch):
+    """Keys follow content and parameters; entries are hard-linked and evicted LRU."""
+    monkeypatch.setattr(settings, "USE_DOCKER", False)
+    monkeypatch.setattr(
+        result_cache, "dataset_cache", DatasetCache(temp_data_dir / "datasets")
+    )
+    cache = result_cache.ResultCache(temp_data_dir / "cache", max_size="600")
+    dataset = temp_data_dir / "data.csv"
+    dataset.write_text("gene,c1,c2\ng1,1,2\n")
+
+    key = cache.job_key(dataset, "grnboost2", {"a": 1, "b": "x"})
+    assert key == cache.job_key(dataset, "GRNBOOST2", {"b": "x", "a": "1"})
+    assert key != cache.job_key(dataset, "GRNBOOST2", {"a": 2, "b": "x"})
+    assert cache.job_key(temp_data_dir / "missing.csv", "GRNBOOST2", {}) is None
+    dataset.write_text("gene,c1,c2\ng1,1,3.5\n")
+    assert key != cache.job_key(dataset, "grnboost2", {"a": 1, "b": "x"})
+
+    _write_result(temp_data_dir / "job-1")
+    (temp_data_dir / "job-1" / "export_json").mkdir()
+    (temp_data_dir / "job-1" / "export_json" / "network.json").write_text("[]")
+    assert cache.link_into(key, temp_data_dir / "job-2") is None
+    assert cache.store(key, temp_data_dir / "job-1", "job-1")
+    assert not cache.store("empty", temp_data_dir / "job-3", "job-3")
+
+    meta = cache.link_into(key, temp_data_dir / "job-2")
+    assert meta["job_id"] == "job-1"
+    source = temp_data_dir / "job-1" / "GRNBOOST2_network.tsv"
+    linked = temp_data_dir / "job-2" / "GRNBOOST2_network.tsv"
+    assert linked.stat().st_ino == source.stat().st_ino
+    assert (temp_data_dir / "job-2" / "GRNBOOST2_network.store" / "meta.json").exists()
+    assert not (temp_data_dir / "job-2" / "execution.log").exists()
+    assert not (temp_data_dir / "job-2" / "export_json").exists()
+    assert not (temp_data_dir / "job-2" / "meta.json").exists()
+
+    # Over budget, the least recently used entry goes first
+    for name in ("other", "newest"):
+        _write_result(temp_data_dir / name, "x" * 400)
+    cache.store("other", temp_data_dir / "other", "other")
+    cache.link_into(key, temp_data_dir / "job-4")
+    cache.store("newest", temp_data_dir / "newest", "newest")
+    assert [meta["key"] for meta in cache.entries()] == [key, "newest"]
+    assert linked.read_text() == "g1\tg2\t0.9\n"
+
+    # An entry evicted while it is linked leaves no links behind, so the
+    # job that then runs itself cannot write into another job's files
+    link = os.link
+
+    def link_then_evict(source, target):
+        if list((temp_data_dir / "job-5").rglob("*.tsv")):
+            shutil.rmtree(temp_data_dir / "cache" / key)
+        link(source, target)
+
+    (temp_data_dir / "job-5").mkdir()
+    monkeypatch.setattr(result_cache.os, "link", link_then_evict)
+    assert cache.link_into(key, temp_data_dir / "job-5") is None
+    monkeypatch.setattr(result_cache.os, "link", link)
+    assert list((temp_data_dir / "job-5").iterdir()) == []
+
+
+def test_identical_jobs_reuse_results(repository, temp_data_dir, monkeypatch):
+    """Identical submissions attach to the running job or reuse its result."""
+    monkeypatch.setattr(job_events, "_get_publisher", lambda: _FakeRedis())
+    monkeypatch.setattr(settings, "USE_DOCKER", False)
+    monkeypatch.setattr(settings, "DATASETS_DIR", temp_data_dir / "datasets")
+    monkeypatch.setattr(
+        result_cache, "dataset_cache", DatasetCache(temp_data_dir / "hashes")
+    )
+    cache = result_cache.ResultCache(temp_data_dir / "cache")
+    monkeypatch.setattr(result_cache, "result_cache", cache)
+    monkeypatch.setattr(result_cache, "job_repository", repository)
+    monkeypatch.setattr(job_events, "job_repository", repository)
+    monkeypatch.setattr(jobs_service, "result_cache", cache)
+    admitted = []
+    scheduler = job_scheduler.job_scheduler
+    monkeypatch.setattr(scheduler, "admit_pending", lambda: admitted.append(1))
+    monkeypatch.setattr(scheduler, "release", lambda job_id: None)
+    service = jobs_service.JobService()
+    service.jobs_dir = temp_data_dir / "results"
+    service._imported = True
+    service.repository = repository
+
+    dataset = settings.DATASETS_DIR / "ds-1" / "data.csv"
+    dataset.parent.mkdir(parents=True)
+    dataset.write_text("gene,c1,c2\ng1,1,2\n")
+
+    def submit(**parameters):
+        return asyncio.run(service.submit_job("ds-1", "GRNBOOST2", parameters))
+
+    first = submit(alpha=0.5)
+    assert (first.status, first.attached_to) == ("pending", None)
+    assert first.cache_key is not None
+    second = submit(alpha=0.5)
+    assert (second.status, second.attached_to) == ("pending", first.id)
+    assert len(admitted) == 1
+    assert [job["id"] for job in repository.pending_jobs()] == [first.id]
+
+    # The first run completes: its outputs are cached and shared
+    _write_result(service.jobs_dir / first.id)
+    repository.update(first.id, status="completed")
+    result_cache.finish_job(first.id, succeeded=True)
+    follower = repository.get(second.id)
+    assert (follower["status"], follower["progress"]) == ("completed", 100)
+    assert (service.jobs_dir / second.id / "GRNBOOST2_network.tsv").exists()
+    assert cache.contains(first.cache_key)
+
+    third = submit(alpha=0.5)
+    assert (third.status, third.attached_to) == ("completed", None)
+    assert (
+        "reused from job" in (service.jobs_dir / third.id / "execution.log").read_text()
+    )
+    assert len(admitted) == 1
+
+    # Cancelling a run hands its attached jobs to the oldest of them
+    primary = submit(alpha=0.7)
+    waiting = [submit(alpha=0.7) for _ in range(2)]
+    assert asyncio.run(service.cancel_job(primary.id))
+    assert repository.get(waiting[0].id)["attached_to"] is None
+    assert repository.get(waiting[1].id)["attached_to"] == waiting[0].id
+
+    # A failed run fails the jobs waiting on it
+    repository.update(waiting[0].id, status="failed", error_message="boom")
+    assert result_cache.settle_attached() == [waiting[0].id]
+    failed = repository.get(waiting[1].id)
+    assert failed["status"] == "failed" and "boom" in failed["error_message"]
+
+
+def test_cancel_marks_job_before_revoking(repository, monkeypatch):
+    """The revoked task already finds its job cancelled, not running."""
+    from celery import current_app
+
+    monkeypatch.setattr(job_events, "_get_publisher", lambda: _FakeRedis())
+    monkeypatch.setattr(job_events, "job_repository", repository)
+    monkeypatch.setattr(result_cache, "job_repository", repository)
+    monkeypatch.setattr(job_scheduler.job_scheduler, "release", lambda job_id: None)
+    revoked = []
+    monkeypatch.setattr(
+        current_app.control,
+        "revoke",
+        lambda task_id, **kwargs: revoked.append(
+            (task_id, repository.get("job-0")["status"])
+        ),
+    )
+    service = jobs_service.JobService()
+    service._imported = True
+    service.repository = repository
+    repository.create(
+        _job("job-0", datetime.utcnow(), status="running", celery_task_id="task-0")
+    )
+
+    assert asyncio.run(service.cancel_job("job-0"))
+    assert revoked == [("task-0", "cancelled")]
+    # A finished job is not revoked again
+    assert not asyncio.run(service.cancel_job("job-0"))
+    assert len(revoked) == 1
+
+
+def test_identical_submissions_race_to_one_primary(repository, monkeypatch):
+    """A submission that loses the race for a cache key attaches to the winner."""
+    start = datetime(2024, 1, 1)
+    repository.create(_job("job-0", start, cache_key="k"))
+    with pytest.raises(IntegrityError):
+        repository.create(_job("dup", start, cache_key="k"))
+
+    # The loser looked up the key before the winner's row existed
+    lookup = repository.find_active
+    misses = iter([None])
+    monkeypatch.setattr(
+        repository, "find_active", lambda key: next(misses, None) or lookup(key)
+    )
+    job = repository.create_deduplicated(
+        _job("job-1", start + timedelta(minutes=1), cache_key="k")
+    )
+    assert job["attached_to"] == "job-0"
+    assert [j["id"] for j in repository.pending_jobs()] == ["job-0"]
+
+    # Handing over waiting jobs defers to a primary submitted meanwhile
+    repository.create(_job("job-2", start, cache_key="k", attached_to="job-0"))
+    repository.update("job-0", status="cancelled")
+    repository.create(_job("job-3", start + timedelta(minutes=2), cache_key="k"))
+    assert repository.hand_over(["job-1", "job-2"]) == "job-3"
+    assert [j["attached_to"] for j in repository.attached_jobs()] == ["job-3"] * 2
+
+
+def test_migration_upgrades_existing_job_store(temp_data_dir, monkeypatch):
+    """The Alembic revision brings an older jobs table up to the current schema."""
+    url = f"sqlite:///{temp_data_dir / 'old.db'}"
+    engine = database.create_database_engine(url)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE jobs (id VARCHAR(64) PRIMARY KEY, name VARCHAR(255) NOT NULL,"
+            " description TEXT, dataset_id VARCHAR(255) NOT NULL,"
+            " algorithm VARCHAR(255) NOT NULL, status VARCHAR(50), parameters JSON,"
+            " progress FLOAT, created_at DATETIME, started_at DATETIME,"
+            " completed_at DATETIME, updated_at DATETIME, error_message TEXT,"
+            " celery_task_id VARCHAR(255))"
+        )
+        connection.exec_driver_sql("CREATE INDEX idx_jobs_status ON jobs (status)")
+        connection.exec_driver_sql(
+            "INSERT INTO jobs (id, name, dataset_id, algorithm, status)"
+            " VALUES ('job-0', 'old', 'ds-1', 'PPCOR', 'COMPLETED')"
+        )
+
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    config = Config()
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    command.upgrade(config, "head")
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("jobs")}
+    assert {"queue", "cache_key", "attached_to"} <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("jobs")}
+    assert "uq_jobs_active_cache_key" in indexes and "idx_jobs_status" not in indexes
+    with engine.connect() as connection:
+        status = connection.exec_driver_sql("SELECT status FROM jobs").scalar()
+    assert status == "completed"
+
+    # Applying it again changes nothing
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
+    assert {index["name"] for index in inspect(engine).get_indexes("jobs")} == indexes
+    engine.dispose()
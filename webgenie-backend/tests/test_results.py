@@ -0,0 +1,537 @@
+"""
+Result storage and result endpoint tests.
+"""
+
+import errno
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services import network_store
+from app.services.network_store import (
+    build_network_store,
+    find_network_file,
+    load_network,
+    store_path,
+)
+from app.services.network_summary import compute_summary, read_summary, summary_path
+
+
+@pytest.fixture
+def results_dir(temp_data_dir, monkeypatch):
+    """Point RESULTS_DIR at a temporary directory."""
+    monkeypatch.setattr(settings, "RESULTS_DIR", temp_data_dir)
+    return temp_data_dir
+
+
+def write_network(job_dir, edges, name="generic_network.tsv"):
+    """Write a headerless TF/Target/Score TSV into a job directory."""
+    job_dir.mkdir(parents=True, exist_ok=True)
+    network_file = job_dir / name
+    pd.DataFrame(edges).to_csv(network_file, sep="\t", index=False, header=False)
+    return network_file
+
+
+def test_network_store_round_trip(temp_data_dir, monkeypatch):
+    """The binary store holds the TSV edges sorted by score."""
+    network_file = write_network(
+        temp_data_dir / "job-1",
+        [["A", "B", 0.2], ["B", "C", 0.9], ["C", "A", 0.5], ["A", "C", 0.9]],
+    )
+    assert find_network_file(temp_data_dir / "job-1") == network_file
+
+    network = load_network(network_file)
+    assert store_path(network_file).is_dir()
+    assert network.source.dtype == np.int32 and network.score.dtype == np.float32
+    assert not network.score.flags.writeable
+
+    frame = network.to_frame()
+    assert list(frame["Score"]) == pytest.approx([0.9, 0.9, 0.5, 0.2])
+    assert list(zip(frame["TF"], frame["Target"]))[:2] == [("B", "C"), ("A", "C")]
+    assert set(zip(frame["TF"], frame["Target"])) == {
+        ("A", "B"),
+        ("B", "C"),
+        ("C", "A"),
+        ("A", "C"),
+    }
+    np.testing.assert_array_equal(network.degrees(), [3, 2, 3])
+
+    # A rewritten TSV invalidates the store
+    write_network(temp_data_dir / "job-1", [["X", "Y", 1.0]])
+    assert len(load_network(network_file)) == 1
+
+    # Concurrent rebuilds all succeed; a store opened before keeps working
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = list(pool.map(build_network_store, [network_file] * 16))
+    assert set(paths) == {store_path(network_file)}
+    assert list(network.to_frame()["Score"])[0] == pytest.approx(0.9)
+    assert len(load_network(network_file)) == 1
+
+    # A directory in the way that is not a store is replaced
+    shutil.rmtree(store_path(network_file))
+    (store_path(network_file) / "stray").mkdir(parents=True)
+    assert len(load_network(network_file)) == 1
+    assert not (store_path(network_file) / "stray").exists()
+    assert [p.name for p in (temp_data_dir / "job-1").iterdir() if p.is_dir()] == [
+        store_path(network_file).name
+    ]
+
+    # A path that stays occupied fails after a few attempts instead of spinning
+    def occupied(source, target):
+        raise OSError(errno.ENOTEMPTY, "Directory not empty", str(target))
+
+    monkeypatch.setattr(network_store, "_move_aside", lambda path: None)
+    monkeypatch.setattr(network_store.os, "rename", occupied)
+    shutil.rmtree(store_path(network_file))
+    store_path(network_file).mkdir()
+    with pytest.raises(OSError):
+        build_network_store(network_file)
+    monkeypatch.undo()
+    assert [p.name for p in (temp_data_dir / "job-1").iterdir() if p.is_dir()] == [
+        store_path(network_file).name
+    ]
+
+
+def test_result_summary_uses_network_store(client, results_dir):
+    """Summary and comparison endpoints read the binary store."""
+    build_network_store(
+        write_network(results_dir / "job-1", [["A", "B", 0.8], ["B", "C", 0.6]])
+    )
+    write_network(results_dir / "job-2", [["A", "B", 0.5], ["C", "D", 0.4]])
+
+    response = client.get("/api/v1/results/job/job-1/summary")
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["total_edges"] == 2
+    assert summary["num_nodes"] == 3
+    assert summary["max_degree"] == 2
+    assert summary["num_regulators"] == 2
+    assert summary["score_quantiles"]["0.5"] == pytest.approx(0.7)
+    assert summary_path(results_dir / "job-1" / "generic_network.tsv").exists()
+
+    response = client.post(
+        "/api/v1/results/compare", params={"job_id_1": "job-1", "job_id_2": "job-2"}
+    )
+    assert response.status_code == 200
+    assert response.json()["overlap_edges"] == 1
+
+
+def test_network_summary_statistics(temp_data_dir):
+    """Summary statistics match a direct computation on the edge list."""
+    rng = np.random.default_rng(0)
+    genes = np.array([f"G{i}" for i in range(40)])
+    edges = pd.DataFrame(
+        {
+            0: genes[rng.integers(0, 40, 300)],
+            1: genes[rng.integers(0, 40, 300)],
+            2: rng.random(300),
+        }
+    )
+    network_file = write_network(temp_data_dir / "job-1", edges)
+    summary = compute_summary(load_network(network_file))
+
+    degrees = pd.concat([edges[0], edges[1]]).value_counts()
+    assert summary["num_nodes"] == len(degrees)
+    assert summary["max_degree"] == degrees.max()
+    assert summary["avg_degree"] == pytest.approx(degrees.mean())
+    assert sum(summary["degree_histogram"]["counts"]) == len(degrees)
+    assert sum(summary["score_histogram"]["counts"]) == 300
+    for q, value in summary["score_quantiles"].items():
+        assert value == pytest.approx(np.quantile(edges[2], float(q)), rel=1e-5)
+
+    assert read_summary(network_file) is None
+
+
+def test_compare_stores_matches_set_reference(temp_data_dir):
+    """Integer-encoded comparison agrees with string-set algebra."""
+    from scipy.stats import spearmanr
+
+    from app.services.network_compare import compare_stores
+
+    rng = np.random.default_rng(1)
+    genes = np.array([f"G{i}" for i in range(30)])
+
+    def random_network(name, n_genes):
+        edges = pd.DataFrame(
+            {
+                0: genes[rng.integers(0, n_genes, 400)],
+                1: genes[rng.integers(0, n_genes, 400)],
+                2: rng.random(400).round(2),
+            }
+        )
+        edges = edges.sort_values(2, ascending=False, kind="stable")
+        return edges, load_network(write_network(temp_data_dir / name, edges))
+
+    edges1, network1 = random_network("job-1", 25)
+    edges2, network2 = random_network("job-2", 30)
+    result = compare_stores(network1, network2, k_values=[10, 50, 1000])
+
+    set1 = set(zip(edges1[0], edges1[1]))
+    set2 = set(zip(edges2[0], edges2[1]))
+    assert result["overlap_edges"] == len(set1 & set2)
+    assert result["edges_only_in_1"] == len(set1 - set2)
+    assert result["edges_only_in_2"] == len(set2 - set1)
+    assert result["jaccard_index"] == pytest.approx(len(set1 & set2) / len(set1 | set2))
+
+    # Best-scored occurrence of each edge, in rank order
+    best1 = edges1.drop_duplicates([0, 1]).set_index([0, 1])[2]
+    best2 = edges2.drop_duplicates([0, 1]).set_index([0, 1])[2]
+    for entry in result["overlap_at_k"]:
+        k = entry["k"]
+        top1 = set(best1.index[:k])
+        top2 = set(best2.index[:k])
+        assert entry["overlap"] == len(top1 & top2)
+
+    shared = best1.index.intersection(best2.index)
+    expected = spearmanr(best1[shared], best2[shared]).correlation
+    assert result["spearman_correlation"] == pytest.approx(expected)
+
+
+def test_batch_similarity_exact_and_sketched(results_dir, monkeypatch):
+    """Exact bitset counts match set algebra; MinHash estimates are close."""
+    from app.services.network_sketch import compare_job_networks, sketch_path
+
+    rng = np.random.default_rng(2)
+    genes = np.array([f"G{i}" for i in range(60)])
+    edge_sets = []
+    for n, job_id in enumerate(["job-1", "job-2", "job-3"]):
+        size = 1500 + 500 * n
+        edges = pd.DataFrame(
+            {
+                0: genes[rng.integers(0, 40 + 10 * n, size)],
+                1: genes[rng.integers(0, 40, size)],
+                2: rng.random(size),
+            }
+        )
+        write_network(results_dir / job_id, edges)
+        edge_sets.append(set(zip(edges[0], edges[1])))
+
+    progress = []
+    result = compare_job_networks(
+        ["job-1", "job-2", "job-3", "job-404"],
+        progress=lambda done, total: progress.append((done, total)),
+    )
+    assert result["job_ids"] == ["job-1", "job-2", "job-3"]
+    assert result["missing"] == ["job-404"]
+    assert progress[-1] == (3, 3)
+    assert sketch_path(results_dir / "job-1" / "generic_network.tsv").exists()
+    for i, a in enumerate(edge_sets):
+        assert result["total_edges"][i] == len(a)
+        for j, b in enumerate(edge_sets):
+            assert result["exact"][i][j]
+            assert result["overlap_edges"][i][j] == len(a & b)
+            assert result["jaccard"][i][j] == pytest.approx(len(a & b) / len(a | b))
+
+    # Force bottom-k sketches for every network
+    monkeypatch.setattr(settings, "SKETCH_SIZE", 512)
+    monkeypatch.setattr(settings, "SKETCH_EXACT_MAX_EDGES", 0)
+    for job_id in ["job-1", "job-2", "job-3"]:
+        sketch_path(results_dir / job_id / "generic_network.tsv").unlink()
+
+    estimated = compare_job_networks(["job-1", "job-2", "job-3"])
+    assert not estimated["exact"][0][1]
+    for i in range(3):
+        for j in range(3):
+            assert estimated["jaccard"][i][j] == pytest.approx(
+                result["jaccard"][i][j], abs=0.08
+            )
+
+
+def test_json_download_streams_batches(client, results_dir, monkeypatch):
+    """JSON download is valid in one piece and chunked per batch."""
+    import json
+
+    from app.services import network_export
+
+    edges = [["A", "B", 0.5], ["B", "C", 0.25], ["C", "A", 0.75]]
+    network_file = write_network(results_dir / "job-1", edges)
+
+    response = client.get(
+        "/api/v1/results/job/job-1/network/download", params={"format": "json"}
+    )
+    assert response.status_code == 200
+    assert response.json()["edges"][0] == {"source": "C", "target": "A", "weight": 0.75}
+
+    network = load_network(network_file)
+    chunks = list(network_export.iter_json(network, chunk_size=2))
+    assert len(chunks) == 4
+    expected = json.loads(b"".join(chunks))
+
+    monkeypatch.setattr(network_export, "orjson", None)
+    assert json.loads(b"".join(network_export.iter_json(network))) == expected
+    assert len(expected["edges"]) == 3
+
+
+def test_edge_query_pages_and_filters(client, results_dir):
+    """Paged, filtered edge queries match a pandas reference."""
+    rng = np.random.default_rng(3)
+    genes = np.array([f"G{i}" for i in range(15)])
+    edges = pd.DataFrame(
+        {
+            0: genes[rng.integers(0, 15, 500)],
+            1: genes[rng.integers(0, 15, 500)],
+            2: rng.random(500).round(3),
+        }
+    )
+    write_network(results_dir / "job-1", edges)
+    ranked = edges.sort_values(2, ascending=False, kind="stable")
+
+    def fetch_all(**params):
+        rows, cursor = [], 0
+        while cursor is not None:
+            response = client.get(
+                "/api/v1/results/job/job-1/edges",
+                params={"cursor": cursor, "limit": 37, **params},
+            )
+            assert response.status_code == 200
+            page = response.json()
+            rows += [(e["source"], e["target"], e["score"]) for e in page["edges"]]
+            cursor = page["next_cursor"]
+        assert page["total"] == len(rows)
+        return rows
+
+    def reference(frame):
+        return [(s, t, pytest.approx(w, abs=1e-6)) for s, t, w in frame.values]
+
+    assert fetch_all() == reference(ranked)
+    assert fetch_all(min_score=0.5) == reference(ranked[ranked[2] >= 0.5])
+    assert fetch_all(top_k=60) == reference(ranked.head(60))
+    assert fetch_all(source="G3") == reference(ranked[ranked[0] == "G3"])
+    assert fetch_all(gene="G4", top_k=5) == reference(
+        ranked[(ranked[0] == "G4") | (ranked[1] == "G4")].head(5)
+    )
+    assert fetch_all(source="G1", target="G2", min_score=0.2) == reference(
+        ranked[(ranked[0] == "G1") & (ranked[1] == "G2") & (ranked[2] >= 0.2)]
+    )
+    assert fetch_all(gene="missing") == []
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_streaming_exporters(results_dir, compress):
+    """Every export format round-trips the edges, in batches."""
+    import gzip
+    import json
+    import xml.etree.ElementTree as ET
+
+    from app.workers.tasks import export_results
+
+    odd = 'X,"&<y>'
+    edges = [["A", "B", 0.5], [odd, "A", 0.25], ["B", odd, 0.75]]
+    write_network(results_dir / "job-1", edges)
+    expected = sorted((s, t, w) for s, t, w in edges)
+
+    def read(path):
+        opener = gzip.open if compress else open
+        with opener(path, "rt") as f:
+            return f.read()
+
+    exported = {}
+    for export_format in ["json", "csv", "graphml", "gml"]:
+        result = export_results(
+            job_id="job-1", export_format=export_format, compress=compress
+        )
+        assert result["export_file"].endswith(".gz") == compress
+        exported[export_format] = read(result["export_file"])
+
+    rows = json.loads(exported["json"])["edges"]
+    assert sorted((e["source"], e["target"], e["weight"]) for e in rows) == expected
+
+    from io import StringIO
+
+    frame = pd.read_csv(StringIO(exported["csv"]), keep_default_na=False)
+    assert sorted(map(tuple, frame.values.tolist())) == expected
+
+    ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+    graph = ET.fromstring(exported["graphml"]).find("g:graph", ns)
+    assert {n.get("id") for n in graph.findall("g:node", ns)} == {"A", "B", odd}
+    assert (
+        sorted(
+            (e.get("source"), e.get("target"), float(e.find("g:data", ns).text))
+            for e in graph.findall("g:edge", ns)
+        )
+        == expected
+    )
+
+    assert exported["gml"].count("edge [") == 3
+    assert 'label "X,&quot;&amp;&lt;y&gt;"' in exported["gml"]
+
+
+def test_non_finite_scores_have_no_weight(client, results_dir, monkeypatch):
+    """NaN and infinite scores are null in JSON and omitted in text formats."""
+    import json
+
+    from app.services import network_export
+
+    network_file = write_network(
+        results_dir / "job-1", [["A", "B", 0.5], ["B", "C", "nan"], ["C", "A", "inf"]]
+    )
+    network = load_network(network_file)
+
+    def export(writer):
+        return b"".join(writer(network, 2)).decode()
+
+    weights = [None, 0.5, None]
+    rows = json.loads(export(network_export.iter_json))["edges"]
+    assert [e["weight"] for e in rows] == weights
+    monkeypatch.setattr(network_export, "orjson", None)
+    rows = json.loads(export(network_export.iter_json))["edges"]
+    assert [e["weight"] for e in rows] == weights
+
+    assert export(network_export.iter_csv).splitlines()[1:] == [
+        "C,A,",
+        "A,B,0.5",
+        "B,C,",
+    ]
+    graphml = export(network_export.iter_graphml)
+    assert graphml.count("<data ") == 1 and "inf" not in graphml
+    gml = export(network_export.iter_gml)
+    assert gml.count("weight") == 1 and "nan" not in gml and "inf" not in gml
+
+    response = client.get("/api/v1/results/job/job-1/edges")
+    assert [e["score"] for e in response.json()["edges"]] == weights
+
+
+def test_evaluation_matches_sklearn(client, results_dir, monkeypatch):
+    """AUROC/AUPRC over the implicit candidate set match scikit-learn."""
+    from sklearn.metrics import average_precision_score, roc_auc_score
+
+    from app.services.network_evaluation import evaluation_path
+
+    rng = np.random.default_rng(4)
+    genes = [f"G{i}" for i in range(25)]
+    reference = pd.DataFrame(
+        {"Gene1": rng.choice(genes, 60), "Gene2": rng.choice(genes, 60)}
+    )
+    datasets_dir = results_dir / "datasets"
+    (datasets_dir / "ds-1").mkdir(parents=True)
+    reference.to_csv(datasets_dir / "ds-1" / "refNetwork.csv", index=False)
+    monkeypatch.setattr(settings, "DATASETS_DIR", datasets_dir)
+
+    # Rounded scores create ties; "X" is outside the reference vocabulary
+    edges = pd.DataFrame(
+        {
+            0: rng.choice(genes + ["X"], 300),
+            1: rng.choice(genes, 300),
+            2: rng.random(300).round(1),
+        }
+    )
+    network_file = write_network(results_dir / "job-1", edges)
+
+    response = client.post(
+        "/api/v1/results/job/job-1/evaluate", params={"dataset_id": "ds-1"}
+    )
+    assert response.status_code == 200
+    metrics = response.json()
+    assert evaluation_path(network_file).exists()
+
+    truth = {(a, b) for a, b in reference.values if a != b}
+    vocabulary = sorted(set(reference["Gene1"]) | set(reference["Gene2"]))
+    best = (
+        edges[edges[0].isin(vocabulary) & (edges[0] != edges[1])]
+        .groupby([0, 1])[2]
+        .max()
+    )
+    labels, scores = [], []
+    for a in vocabulary:
+        for b in vocabulary:
+            if a != b:
+                labels.append((a, b) in truth)
+                scores.append(best.get((a, b), -1.0))
+
+    assert metrics["auc_roc"] == pytest.approx(roc_auc_score(labels, scores))
+    assert metrics["auc_pr"] == pytest.approx(average_precision_score(labels, scores))
+
+    # Early precision over the top-|truth| edges, ties at the cutoff included
+    ranked = best.sort_values(ascending=False)
+    cutoff = ranked.iloc[len(truth) - 1]
+    top = ranked[ranked >= cutoff]
+    expected = sum(edge in truth for edge in top.index) / len(top)
+    assert metrics["early_precision"] == pytest.approx(expected)
+
+    response = client.get("/api/v1/results/job/job-1")
+    assert response.json()["metrics"]["auc_pr"] == pytest.approx(metrics["auc_pr"])
+
+    # Bootstrap evaluations run on a worker; the API only starts them
+    from app.api import results as results_api
+
+    started = []
+    monkeypatch.setattr(
+        results_api.evaluate_result,
+        "delay",
+        lambda **kwargs: started.append(kwargs) or SimpleNamespace(id="task-1"),
+    )
+    response = client.post(
+        "/api/v1/results/job/job-1/evaluate",
+        params={"dataset_id": "ds-1", "bootstrap": 200},
+    )
+    assert response.status_code == 202
+    assert response.json()["task_id"] == "task-1"
+    assert (started[0]["network_file"], started[0]["n_bootstrap"]) == (
+        str(network_file),
+        200,
+    )
+
+    monkeypatch.setattr(
+        results_api.celery_app,
+        "AsyncResult",
+        lambda task_id: SimpleNamespace(state="SUCCESS", result=metrics, info=None),
+    )
+    response = client.get("/api/v1/results/evaluate/task-1")
+    assert response.json()["status"] == "SUCCESS"
+    assert response.json()["result"]["auc_pr"] == pytest.approx(metrics["auc_pr"])
+
+
+def test_bootstrap_intervals_are_deterministic(temp_data_dir):
+    """Intervals bracket the estimate and do not depend on worker count."""
+    from app.services.network_evaluation import (
+        _block_counts,
+        bootstrap_intervals,
+        evaluate_network,
+        ranking_metrics,
+    )
+
+    rng = np.random.default_rng(5)
+    genes = np.array([f"G{i}" for i in range(30)])
+    reference = (genes[rng.integers(0, 30, 80)], genes[rng.integers(0, 30, 80)])
+    edges = pd.DataFrame(
+        {
+            0: genes[rng.integers(0, 30, 400)],
+            1: genes[rng.integers(0, 30, 400)],
+            2: rng.random(400).round(2),
+        }
+    )
+    network = load_network(write_network(temp_data_dir / "job-1", edges))
+
+    metrics = evaluate_network(network, *reference, n_bootstrap=200, seed=7)
+    assert metrics["bootstrap_replicates"] == 200
+    for name in ["auc_roc", "auc_pr", "early_precision"]:
+        low, high = metrics[f"{name}_ci"]
+        assert low <= metrics[name] <= high
+
+    # Per-block counts reproduce the point estimates
+    pos = np.array([3, 0, 2, 5])
+    neg = np.array([1, 4, 2, 40])
+    point = ranking_metrics(pos, neg, 3)
+    labels = [1] * 3 + [0] * 1 + [0] * 4 + [1] * 2 + [0] * 2 + [1] * 5 + [0] * 40
+    scores = [3] * 4 + [2] * 4 + [1] * 4 + [0] * 45
+    from sklearn.metrics import average_precision_score, roc_auc_score
+
+    assert point["auc_roc"][0] == pytest.approx(roc_auc_score(labels, scores))
+    assert point["auc_pr"][0] == pytest.approx(average_precision_score(labels, scores))
+    assert point["early_precision"][0] == pytest.approx(5 / 12)
+
+    # The counts come from the predicted edges' scores and labels
+    predicted = np.array(scores[:12], dtype=np.float32)
+    counts = _block_counts(predicted, np.array(labels[:12]), pos.sum(), neg.sum())
+    np.testing.assert_array_equal(counts[0], pos)
+    np.testing.assert_array_equal(counts[1], neg)
+    assert counts[2] == 3
+
+    serial = bootstrap_intervals(pos, neg, 3, n_bootstrap=150, seed=1, n_workers=1)
+    parallel = bootstrap_intervals(pos, neg, 3, n_bootstrap=150, seed=1, n_workers=2)
+    assert serial == parallel
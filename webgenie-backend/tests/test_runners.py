@@ -0,0 +1,336 @@
+"""
+Runner kernel tests.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.runners.edges import extract_edges
+from app.services.runners.generic_runner import GenericGRNRunner
+
+
+@pytest.fixture
+def expression_frame():
+    """Random genes x cells expression matrix."""
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(30, 50))
+    values[1] = values[0] * 2 + rng.normal(scale=0.1, size=50)
+    return pd.DataFrame(
+        values,
+        index=[f"G{i}" for i in range(30)],
+        columns=[f"C{j}" for j in range(50)],
+    )
+
+
+def test_extract_edges_matches_pairwise_loop(expression_frame):
+    """Threshold extraction matches the reference double loop."""
+    corr = expression_frame.T.corr()
+    expected = {
+        (corr.index[i], corr.columns[j])
+        for i in range(len(corr))
+        for j in range(i + 1, len(corr))
+        if abs(corr.iloc[i, j]) >= 0.2
+    }
+
+    edges = extract_edges(corr, threshold=0.2, block_cells=64)
+
+    assert set(zip(edges["TF"], edges["Target"])) == expected
+    assert edges["Score"].dtype == np.float32
+    assert edges["Score"].is_monotonic_decreasing
+
+
+def test_extract_edges_top_k(expression_frame):
+    """Global top-k keeps the strongest pairs only."""
+    corr = expression_frame.T.corr()
+    edges = extract_edges(corr, top_k=5, block_cells=64)
+
+    upper = np.abs(corr.to_numpy()[np.triu_indices(len(corr), k=1)])
+    assert len(edges) == 5
+    assert (edges["TF"].iloc[0], edges["Target"].iloc[0]) == ("G0", "G1")
+    np.testing.assert_allclose(edges["Score"], np.sort(upper)[::-1][:5], rtol=1e-6)
+
+
+def test_extract_edges_per_target_top_k(expression_frame):
+    """Every target receives exactly k regulators, never itself."""
+    corr = expression_frame.T.corr()
+    edges = extract_edges(corr, per_target_top_k=3, block_cells=64)
+
+    assert len(edges) == 30 * 3
+    assert edges.groupby("Target", observed=True).size().eq(3).all()
+    assert not (edges["TF"].astype(str) == edges["Target"].astype(str)).any()
+
+
+def test_generic_runner_infer_network(expression_frame):
+    """Generic runner returns a typed edge table."""
+    network = GenericGRNRunner()._infer_network(expression_frame, {"top_k": "10"})
+    assert list(network.columns) == ["TF", "Target", "Score"]
+    assert len(network) == 10
+
+
+def test_compute_correlation_matches_pandas(
+    expression_frame, temp_data_dir, monkeypatch
+):
+    """Tiled correlation matches DataFrame.corr, in memory and memmapped."""
+    from app.core.config import settings
+    from app.services.runners.utils import compute_correlation
+
+    monkeypatch.setattr(settings, "TEMP_DIR", temp_data_dir)
+
+    expected = expression_frame.T.corr().to_numpy()
+
+    in_memory = compute_correlation(expression_frame, tile_size=7)
+    np.testing.assert_allclose(in_memory.to_numpy(), expected, atol=1e-5)
+
+    memmapped = compute_correlation(expression_frame, tile_size=7, memory_budget=1024)
+    # The backing file is unlinked once mapped and stays readable
+    assert not list(temp_data_dir.glob("correlation-*.npy"))
+    np.testing.assert_allclose(memmapped.to_numpy(), expected, atol=1e-5)
+
+
+def test_stream_correlation_edges_matches_dense(expression_frame):
+    """Streaming tiles selects the same edges as the dense matrix."""
+    from app.services.runners.correlation import stream_correlation_edges
+
+    corr = expression_frame.T.corr()
+    for options in ({"threshold": 0.3}, {"top_k": 7}, {"per_target_top_k": 2}):
+        dense = extract_edges(corr, **options)
+        streamed = stream_correlation_edges(expression_frame, tile_size=4, **options)
+        assert set(zip(dense["TF"], dense["Target"])) == set(
+            zip(streamed["TF"], streamed["Target"])
+        )
+
+
+def test_compute_mutual_information_matches_histogram(expression_frame):
+    """Batched MI matches a per-pair histogram2d computation."""
+    from app.services.runners.mutual_info import discretize
+    from app.services.runners.utils import compute_mutual_information
+
+    mi = compute_mutual_information(expression_frame, n_bins=8, tile_size=7)
+
+    codes = discretize(expression_frame.to_numpy(), 8)
+    n = codes.shape[1]
+    for i, j in [(0, 1), (3, 17), (29, 2)]:
+        pxy = np.histogram2d(codes[i], codes[j], bins=8, range=[[0, 8], [0, 8]])[0] / n
+        px_py = np.outer(pxy.sum(axis=1), pxy.sum(axis=0))
+        nz = pxy > 0
+        expected = np.sum(pxy[nz] * np.log(pxy[nz] / px_py[nz]))
+        assert mi.iloc[i, j] == pytest.approx(expected, abs=1e-5)
+        assert mi.iloc[j, i] == mi.iloc[i, j]
+
+    assert (np.diag(mi.to_numpy()) == 0).all()
+    assert mi.loc["G0", "G1"] == mi.to_numpy().max()
+
+
+def test_parallel_pairwise_kernels_match_serial(expression_frame):
+    """Process-pool execution over shared memory matches in-process results."""
+    from app.services.runners.mutual_info import mutual_information_matrix
+    from app.services.runners.utils import compute_correlation
+
+    serial = compute_correlation(expression_frame, tile_size=4, n_workers=1)
+    parallel = compute_correlation(expression_frame, tile_size=4, n_workers=2)
+    np.testing.assert_allclose(parallel.to_numpy(), serial.to_numpy(), atol=1e-6)
+
+    mi_serial = mutual_information_matrix(expression_frame, tile_size=4, n_workers=1)
+    mi_parallel = mutual_information_matrix(expression_frame, tile_size=4, n_workers=2)
+    np.testing.assert_allclose(mi_parallel, mi_serial, atol=1e-6)
+
+
+def test_shared_matrix_round_trip():
+    """Attached views see the owner's data read-only."""
+    from app.services.runners.parallel import SharedMatrix
+
+    data = np.arange(12, dtype=np.float32).reshape(3, 4)
+    with SharedMatrix.create(data) as owner:
+        view = SharedMatrix.attach(owner.name, owner.shape, owner.dtype)
+        np.testing.assert_array_equal(view.array, data)
+        assert not view.array.flags.writeable
+        view.close()
+
+
+def test_dataset_cache_serves_memmap(expression_frame, temp_data_dir):
+    """A dataset is parsed once, then opened from the binary cache."""
+    from app.services.dataset_cache import DatasetCache, compute_file_hash
+
+    csv_path = temp_data_dir / "data.csv"
+    expression_frame.to_csv(csv_path)
+    cache = DatasetCache(temp_data_dir / "cache")
+    parses = []
+
+    def reader(path):
+        parses.append(path)
+        return pd.read_csv(path, index_col=0)
+
+    first = cache.load(csv_path, reader)
+    second = cache.load(csv_path, reader)
+
+    assert len(parses) == 1
+    # Served straight from the read-only memory map
+    assert not second.to_numpy().flags.writeable
+    pd.testing.assert_frame_equal(first, expression_frame, check_freq=False)
+    pd.testing.assert_frame_equal(second, expression_frame, check_freq=False)
+    assert cache.contains(compute_file_hash(csv_path))
+
+
+def test_sparse_kernels_match_dense(expression_frame):
+    """Sparse correlation, MI and statistics agree with the dense path."""
+    from scipy import sparse
+
+    from app.services.runners.expression import ExpressionMatrix, gene_statistics
+    from app.services.runners.utils import (
+        compute_correlation,
+        compute_mutual_information,
+    )
+
+    dense = expression_frame.clip(lower=0)
+    matrix = ExpressionMatrix(
+        sparse.csr_matrix(dense.to_numpy()), dense.index, dense.columns
+    )
+    assert matrix.is_sparse and matrix.density < 1
+
+    np.testing.assert_allclose(
+        compute_correlation(matrix, tile_size=8).to_numpy(),
+        dense.T.corr().to_numpy(),
+        atol=1e-5,
+    )
+    np.testing.assert_allclose(
+        compute_mutual_information(matrix, tile_size=8).to_numpy(),
+        compute_mutual_information(dense, tile_size=8).to_numpy(),
+        atol=1e-6,
+    )
+
+    stats = gene_statistics(matrix)
+    np.testing.assert_allclose(stats["mean"], dense.mean(axis=1))
+    np.testing.assert_allclose(stats["variance"], dense.var(axis=1))
+    np.testing.assert_array_equal(stats["nnz"], (dense > 0).sum(axis=1))
+
+
+def test_lazy_readers_round_trip(expression_frame, temp_data_dir):
+    """Backed h5ad, 10x MTX and chunked CSV readers return the same data."""
+    import anndata
+    import scipy.io
+    from scipy import sparse
+
+    from app.services.dataset_cache import DatasetCache
+    from app.services.runners.readers import ArrayReader, MtxReader, open_dataset
+    from app.services.runners.expression import ExpressionMatrix
+
+    counts = expression_frame.clip(lower=0).round(1)
+    adata = anndata.AnnData(
+        sparse.csr_matrix(counts.T.to_numpy()),
+        obs=pd.DataFrame(index=counts.columns),
+        var=pd.DataFrame(index=counts.index),
+    )
+    adata.write_h5ad(temp_data_dir / "data.h5ad")
+
+    mtx_dir = temp_data_dir / "tenx"
+    mtx_dir.mkdir()
+    scipy.io.mmwrite(mtx_dir / "matrix.mtx", sparse.csc_matrix(counts.to_numpy()))
+    pd.Series(counts.index).to_csv(mtx_dir / "genes.tsv", index=False, header=False)
+    pd.Series(counts.columns).to_csv(
+        mtx_dir / "barcodes.tsv", index=False, header=False
+    )
+
+    csv_path = temp_data_dir / "data.csv"
+    counts.to_csv(csv_path)
+    frame = DatasetCache(temp_data_dir / "cache").load_delimited(csv_path, chunk_rows=7)
+    csv_reader = ArrayReader(ExpressionMatrix.from_frame(frame))
+
+    for reader in (
+        open_dataset(temp_data_dir / "data.h5ad"),
+        MtxReader(mtx_dir),
+        csv_reader,
+    ):
+        with reader:
+            assert list(reader.genes) == list(counts.index)
+            chunks = [
+                chunk.values.toarray() if chunk.is_sparse else chunk.values
+                for _, chunk in reader.iter_cell_chunks(16)
+            ]
+            np.testing.assert_allclose(np.hstack(chunks), counts.to_numpy(), atol=1e-6)
+            genes = reader.read_genes(3, 9)
+            values = genes.values.toarray() if genes.is_sparse else genes.values
+            np.testing.assert_allclose(values, counts.to_numpy()[3:9], atol=1e-6)
+            chunks = [
+                chunk.values.toarray() if chunk.is_sparse else chunk.values
+                for _, chunk in reader.iter_gene_chunks(4)
+            ]
+            np.testing.assert_allclose(np.vstack(chunks), counts.to_numpy(), atol=1e-6)
+
+    # Gene chunks of an MTX file come from a single scan
+    reader = MtxReader(mtx_dir)
+    scans = []
+    iter_entries = reader._iter_entries
+    reader._iter_entries = lambda: scans.append(1) or iter_entries()
+    assert len(list(reader.iter_gene_chunks(4))) == -(-len(counts) // 4)
+    assert len(scans) == 1
+
+
+def test_streaming_kernels_match_in_memory(expression_frame):
+    """Chunk-accumulated statistics and correlation edges match in-memory ones."""
+    from app.services.runners.correlation import stream_correlation_edges
+    from app.services.runners.expression import ExpressionMatrix, gene_statistics
+    from app.services.runners.readers import ArrayReader
+    from app.services.runners.streaming import (
+        stream_dataset_correlation_edges,
+        streaming_gene_statistics,
+    )
+
+    reader = ArrayReader(ExpressionMatrix.from_frame(expression_frame))
+
+    pd.testing.assert_frame_equal(
+        streaming_gene_statistics(reader, chunk_cells=12),
+        gene_statistics(expression_frame),
+    )
+
+    for selection in ({"threshold": 0.3}, {"per_target_top_k": 3}):
+        expected = stream_correlation_edges(expression_frame, **selection)
+        actual = stream_dataset_correlation_edges(
+            reader, band_rows=7, chunk_cells=12, **selection
+        )
+        assert len(actual) == len(expected)
+        np.testing.assert_allclose(
+            np.sort(actual["Score"].to_numpy()),
+            np.sort(expected["Score"].to_numpy()),
+            atol=1e-5,
+        )
+
+
+def test_generic_runner_single_pass(expression_frame, temp_data_dir, monkeypatch):
+    """Inputs are validated while loading and outputs from the saved frame."""
+    import anndata
+
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "DATASET_CACHE_ENABLED", False)
+    csv_path = temp_data_dir / "data.csv"
+    expression_frame.to_csv(csv_path)
+    h5ad_path = temp_data_dir / "data.h5ad"
+    anndata.AnnData(
+        expression_frame.T.to_numpy(),
+        obs=pd.DataFrame(index=expression_frame.columns),
+        var=pd.DataFrame(index=expression_frame.index),
+    ).write_h5ad(h5ad_path)
+
+    full_parses = []
+    read_csv = pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        if kwargs.get("nrows") is None:
+            full_parses.append(str(args[0]))
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", counting_read_csv)
+
+    runner = GenericGRNRunner()
+    for input_file in (csv_path, h5ad_path):
+        output_file = temp_data_dir / f"{input_file.suffix[1:]}_network.tsv"
+        result = runner.run(str(input_file), str(output_file), {"top_k": 5})
+        assert result["metrics"]["num_edges"] == 5
+
+    # One parse of the CSV input, none of the outputs
+    assert full_parses == [str(csv_path)]
+
+    empty = pd.DataFrame(columns=["TF", "Target", "Score"])
+    assert not runner.validate_output(str(output_file), empty)
+    assert runner.load_input(str(temp_data_dir / "missing.csv")) is None